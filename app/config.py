@@ -2,57 +2,249 @@
 Application configuration management module
 """
 import json
+import os
+import tempfile
+import threading
 from pathlib import Path
 
+# LINGUAGPT_CONFIG points tools and benchmarks at another settings file
+DEFAULT_CONFIG_FILE = Path(
+    os.environ.get("LINGUAGPT_CONFIG") or Path.home() / ".gpt_translator_config.json"
+)
+
+DEFAULTS = {
+    "api_key": "",
+    # Additional keys: [{"key": "...", "organization": "..."}]
+    "api_keys": [],
+    "model": "gpt-4o-mini",
+    "ui_language": "en",
+    "api_base_url": "https://api.openai.com/v1",
+    # Performance settings
+    "request_timeout": 30,
+    "max_concurrent_requests": 4,
+    # Concurrent requests start at max_concurrent_requests and adapt between
+    # 1 and max_concurrent_ceiling to latency and throttling
+    "adaptive_concurrency": True,
+    "max_concurrent_ceiling": 16,
+    "queue_requests_per_minute": 60,
+    "stream_max_resumes": 3,
+    # Large documents are chunked and pre-processed in a process pool
+    "large_document_chars": 20000,
+    "document_chunk_chars": 6000,
+    "process_pool_threshold": 200000,
+    "processing_workers": 0,
+    # Plain text with at least this share of repeated sentences or cells is
+    # translated segment by segment, each unique segment once
+    "dedup_min_ratio": 0.2,
+    "dedup_min_segments": 8,
+    # Subtitle cues are translated in batches with neighbouring cues as context
+    "subtitle_batch_chars": 3000,
+    "subtitle_context_cues": 2,
+    # Seconds hidden in the tray before memory is released, 0 disables
+    "idle_release_after": 300,
+    # Translate while typing, after this pause; only changed sentences are sent
+    "live_translation": False,
+    "live_debounce_ms": 600,
+    # Target languages of "translate to selected languages", empty for all
+    "fan_out_targets": [],
+    # Exact-match translation memory (TMX/CSV imports and learned results)
+    "use_translation_memory": True,
+    # Translations and alternatives cached by request, compacted past this size
+    "result_cache": True,
+    "result_cache_mb": 64,
+    # Local HTTP service started with --serve
+    "service_port": 8766,
+    # Term translations enforced in document chunks: {"term": "translation"}
+    "glossary": {},
+    # Folders translated by --watch: ["path"] into watch_targets, or
+    # [{"path": "...", "targets": ["English"], "source": "Auto"}]
+    "watch_folders": [],
+    "watch_targets": ["English"],
+    "watch_interval": 2,
+    "watch_workers": 2,
+}
+
 
 class Config:
-    """Class for managing application configuration"""
-    
-    def __init__(self):
-        self.config_file = Path.home() / ".gpt_translator_config.json"
-        self.api_key = ""
-        self.model = "gpt-4o-mini"
-        self.ui_language = "en"
-        self.load()
-    
-    def load(self):
-        """Load configuration from file"""
-        if self.config_file.exists():
-            with open(self.config_file, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                self.api_key = data.get("api_key", "")
-                self.model = data.get("model", "gpt-4o-mini")
-                self.ui_language = data.get("ui_language", "en")
-        else:
-            self.api_key = ""
-            self.model = "gpt-4o-mini"
-            self.ui_language = "en"
-    
-    def save(self, api_key=None, model=None, ui_language=None):
+    """Cached settings service for the application
+
+    Values are parsed once and served from memory. Writes go to a temporary
+    file that is renamed over the config file, so a crash never leaves a
+    half-written JSON behind. Subscribers are called with the set of changed
+    keys whenever values change, either through save() or on disk.
+    """
+
+    def __init__(self, config_file=None):
+        self.config_file = Path(config_file) if config_file else DEFAULT_CONFIG_FILE
+        self._values = dict(DEFAULTS)
+        self._subscribers = []
+        self._lock = threading.RLock()
+        self._file_signature = None
+        self.load(force=True)
+
+    def __getattr__(self, name):
+        values = self.__dict__.get("_values")
+        if values is not None and name in values:
+            return values[name]
+        raise AttributeError(
+            f"'{type(self).__name__}' object has no attribute '{name}'"
+        )
+
+    def get(self, key, default=None):
+        """Get cached setting value"""
+        with self._lock:
+            return self._values.get(key, default)
+
+    def as_dict(self):
+        """Get a copy of all cached settings"""
+        with self._lock:
+            return dict(self._values)
+
+    def key_entries(self):
+        """Get the primary API key followed by the additional pool keys"""
+        entries = []
+        seen = set()
+        with self._lock:
+            candidates = [{"key": self._values.get("api_key", "")}]
+            candidates.extend(self._values.get("api_keys") or [])
+        for entry in candidates:
+            if isinstance(entry, str):
+                entry = {"key": entry}
+            key = (entry.get("key") or "").strip()
+            if key and key not in seen:
+                seen.add(key)
+                entries.append(
+                    {"key": key, "organization": entry.get("organization", "")}
+                )
+        return entries
+
+    def subscribe(self, callback):
+        """Register callback(changed_keys) for settings changes"""
+        with self._lock:
+            if callback not in self._subscribers:
+                self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Remove previously registered callback"""
+        with self._lock:
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+    def _signature(self):
+        try:
+            stat = self.config_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def load(self, force=False):
+        """Load configuration from file if it changed since the last read
+
+        Returns True when cached values were refreshed.
+        """
+        with self._lock:
+            signature = self._signature()
+            if not force and signature == self._file_signature:
+                return False
+
+            values = dict(DEFAULTS)
+            if signature is not None:
+                try:
+                    with open(self.config_file, "r", encoding="utf-8") as f:
+                        data = json.load(f)
+                except (OSError, ValueError) as e:
+                    # Keep serving cached values if the file is unreadable
+                    print(f"Error reading config: {e}")
+                    return False
+                if isinstance(data, dict):
+                    values.update(data)
+
+            self._file_signature = signature
+            changed = self._apply(values)
+
+        self._notify(changed)
+        return True
+
+    def reload_if_changed(self):
+        """Refresh cached values after an external change of the file"""
+        return self.load()
+
+    def save(self, api_key=None, model=None, ui_language=None, **values):
         """Save configuration to file"""
         if api_key is not None:
-            self.api_key = api_key
+            values["api_key"] = api_key
         if model is not None:
-            self.model = model
+            values["model"] = model
         if ui_language is not None:
-            self.ui_language = ui_language
-        
-        with open(self.config_file, "w", encoding="utf-8") as f:
-            json.dump(
-                {
-                    "api_key": self.api_key,
-                    "model": self.model,
-                    "ui_language": self.ui_language,
-                },
-                f,
-                ensure_ascii=False,
-                indent=2,
-            )
-    
+            values["ui_language"] = ui_language
+
+        with self._lock:
+            new_values = dict(self._values)
+            new_values.update(values)
+            self._write(new_values)
+            changed = self._apply(new_values)
+
+        self._notify(changed)
+
+    def _write(self, values):
+        """Write values atomically via a temporary file and rename"""
+        directory = self.config_file.parent
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=f".{self.config_file.name}.", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(values, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.config_file)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+        self._file_signature = self._signature()
+
+    def _apply(self, values):
+        changed = {
+            key
+            for key in set(self._values) | set(values)
+            if self._values.get(key) != values.get(key)
+        }
+        self._values = values
+        return changed
+
+    def _notify(self, changed):
+        if not changed:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"Error in config subscriber: {e}")
+
     def delete(self):
-        """Delete configuration file"""
-        if self.config_file.exists():
-            self.config_file.unlink()
-        self.api_key = ""
-        self.model = "gpt-4o-mini"
-        self.ui_language = "en"
+        """Delete configuration file, resetting every setting to its default"""
+        with self._lock:
+            if self.config_file.exists():
+                self.config_file.unlink()
+            self._file_signature = None
+            changed = self._apply(dict(DEFAULTS))
+
+        self._notify(changed)
+
+
+_config = None
+_config_lock = threading.Lock()
+
+
+def get_config():
+    """Get the shared in-process settings service"""
+    global _config
+    with _config_lock:
+        if _config is None:
+            _config = Config()
+        return _config
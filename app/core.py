@@ -0,0 +1,175 @@
+"""
+Plain Python translation API
+
+    from app.core import translate, translate_stream, translate_many
+
+    translate("Hallo Welt", "English")
+    for delta in translate_stream(text, "Russian"):
+        print(delta, end="", flush=True)
+    for result in translate_many(lines, "French", concurrency=8):
+        print(result.index, result.translation)
+
+Uses the app's config, API key pool, pooled connections, stream resuming
+and translation memory, so services, scripts and worker processes can
+embed the engine.
+"""
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+
+from .config import get_config
+from .openai_client import build_prompt, build_translation_payload, iter_translation
+from .scheduler import BACKGROUND, INTERACTIVE, get_scheduler
+from .translation_memory import recall, remember
+
+DEFAULT_SOURCE = "Auto"
+
+
+class Rewind(int):
+    """Yielded by translate_stream: drop this many trailing characters
+
+    A resumed stream drops its unfinished sentence and translates it again,
+    so text that was already yielded can be taken back once.
+    """
+
+
+class TranslationResult:
+    """Outcome of one text of translate_many"""
+
+    __slots__ = ("index", "text", "translation", "error")
+
+    def __init__(self, index, text, translation=None, error=None):
+        self.index = index
+        self.text = text
+        self.translation = translation
+        self.error = error
+
+    @property
+    def ok(self):
+        return self.error is None
+
+    def __repr__(self):
+        if self.error is not None:
+            return f"TranslationResult({self.index}, error={self.error!r})"
+        return f"TranslationResult({self.index}, {self.translation!r})"
+
+
+def common_prefix_length(a, b):
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
+
+
+def translate_stream(
+    text,
+    target,
+    source=DEFAULT_SOURCE,
+    model=None,
+    timeout=None,
+    priority=INTERACTIVE,
+):
+    """Yield the translation of text as it streams in
+
+    Yields str deltas, and a Rewind when a resumed stream takes back its
+    unfinished sentence. A translation memory hit is yielded as one delta;
+    a finished translation is remembered. The request holds a scheduler
+    slot of the given priority; closing the generator cancels it.
+    """
+    if not text.strip():
+        return
+    remembered = recall(text, source, target)
+    if remembered is not None:
+        yield remembered
+        return
+
+    model = model or get_config().model
+    payload = build_translation_payload(model, build_prompt(text, source, target))
+    sent = ""
+    with get_scheduler().slot(priority):
+        translations = iter_translation(payload, timeout=timeout)
+        try:
+            for snapshot in translations:
+                keep = common_prefix_length(sent, snapshot)
+                if keep < len(sent):
+                    yield Rewind(len(sent) - keep)
+                if len(snapshot) > keep:
+                    yield snapshot[keep:]
+                sent = snapshot
+        finally:
+            translations.close()
+    remember(text, sent.strip(), source, target)
+
+
+def translate(
+    text,
+    target,
+    source=DEFAULT_SOURCE,
+    model=None,
+    timeout=None,
+    priority=INTERACTIVE,
+):
+    """Translate text, returns the translation"""
+    translation = ""
+    for delta in translate_stream(text, target, source, model, timeout, priority):
+        if isinstance(delta, Rewind):
+            translation = translation[: len(translation) - delta]
+        else:
+            translation += delta
+    return translation.strip()
+
+
+def translate_many(
+    texts,
+    target,
+    source=DEFAULT_SOURCE,
+    model=None,
+    concurrency=None,
+    timeout=None,
+    priority=BACKGROUND,
+):
+    """Translate an iterable of texts, yielding results as they complete
+
+    At most concurrency requests (max_concurrent_requests by default) are in
+    flight, and texts are only taken from the iterable as slots free up, so
+    it may be a lazy stream of any length. Identical texts in flight share
+    one request. A failed text yields a result with its error set instead
+    of stopping the others. Empty or whitespace-only texts yield "" without
+    a request. Bulk work is queued as BACKGROUND by default.
+    """
+    concurrency = max(concurrency or get_config().max_concurrent_requests, 1)
+    model = model or get_config().model
+    texts = enumerate(texts)
+    pending = {}
+    waiting = {}
+
+    def submit(executor, count):
+        for index, text in islice(texts, count):
+            future = waiting.get(text)
+            if future is None:
+                if text.strip():
+                    future = executor.submit(
+                        translate, text, target, source, model, timeout, priority
+                    )
+                else:
+                    # Nothing to translate, don't spend a request on it
+                    future = Future()
+                    future.set_result("")
+                waiting[text] = future
+                pending[future] = (text, [])
+            pending[future][1].append(index)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        submit(executor, concurrency)
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                text, indexes = pending.pop(future)
+                del waiting[text]
+                try:
+                    translation, error = future.result(), None
+                except Exception as e:
+                    translation, error = None, e
+                for index in indexes:
+                    yield TranslationResult(index, text, translation, error)
+            submit(executor, concurrency - len(pending))
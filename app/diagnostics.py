@@ -0,0 +1,222 @@
+"""
+Event-loop stall watchdog and translate pipeline profiling
+
+Enabled from the command line or the environment:
+
+    --watchdog [MS]      LINGUAGPT_WATCHDOG_MS=200
+    --profile-cpu        LINGUAGPT_PROFILE=cpu
+    --profile-memory     LINGUAGPT_PROFILE=memory   (or "cpu,memory")
+
+Stalls are logged to stderr with a stack sample of the GUI thread. Profile
+reports of each translation go to DIAGNOSTICS_DIR (LINGUAGPT_DIAGNOSTICS_DIR
+overrides it).
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+import tracemalloc
+from pathlib import Path
+
+from PyQt6.QtCore import QObject, QTimer
+
+DIAGNOSTICS_DIR = Path.home() / ".cache" / "linguagpt" / "diagnostics"
+DEFAULT_STALL_MS = 200
+# How often the GUI thread reports that it is alive
+HEARTBEAT_MS = 20
+TOP_ENTRIES = 30
+
+
+def diagnostics_dir():
+    path = Path(os.environ.get("LINGUAGPT_DIAGNOSTICS_DIR") or DIAGNOSTICS_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p / 100 + 0.5))]
+
+
+class StallWatchdog(QObject):
+    """Measures event-loop latency and logs stalls with a stack sample
+
+    A timer on the GUI thread records heartbeats; its lateness is the
+    event-loop latency. A monitor thread samples the GUI thread's stack as
+    soon as a heartbeat is overdue by the threshold, so the sample shows
+    what is blocking while it still blocks.
+    """
+
+    def __init__(self, threshold_ms=DEFAULT_STALL_MS, parent=None, stream=None):
+        super().__init__(parent)
+        self.threshold = threshold_ms / 1000
+        self.stream = stream or sys.stderr
+        self.thread_id = threading.get_ident()
+        self.latencies = []
+        self.stalls = 0
+        self.last_beat = time.perf_counter()
+        self.sampled = False
+        self.stopped = threading.Event()
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(HEARTBEAT_MS)
+        self.timer.timeout.connect(self._beat)
+        self.monitor = threading.Thread(
+            target=self._monitor, name="stall-watchdog", daemon=True
+        )
+
+    def start(self):
+        self.last_beat = time.perf_counter()
+        self.timer.start()
+        self.monitor.start()
+
+    def stop(self):
+        self.timer.stop()
+        self.stopped.set()
+
+    def _beat(self):
+        now = time.perf_counter()
+        latency = max(now - self.last_beat - HEARTBEAT_MS / 1000, 0.0)
+        self.last_beat = now
+        self.latencies.append(latency)
+        if len(self.latencies) > 10000:
+            del self.latencies[:5000]
+        if latency >= self.threshold:
+            self.stalls += 1
+            print(f"Event loop stalled for {latency * 1000:.0f} ms", file=self.stream)
+        self.sampled = False
+
+    def _monitor(self):
+        interval = self.threshold / 2
+        while not self.stopped.wait(interval):
+            overdue = time.perf_counter() - self.last_beat - HEARTBEAT_MS / 1000
+            if overdue < self.threshold or self.sampled:
+                continue
+            # One sample per stall, taken while the GUI thread is blocked
+            self.sampled = True
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame))
+            print(
+                f"Event loop blocked for {overdue * 1000:.0f} ms so far, "
+                f"GUI thread stack:\n{stack}",
+                file=self.stream,
+            )
+
+    def report(self):
+        """Event-loop latency percentiles and stall count"""
+        if not self.latencies:
+            return "Event loop latency: no samples"
+        ordered = sorted(self.latencies)
+        return (
+            "Event loop latency (ms): "
+            f"p50 {_percentile(ordered, 50) * 1000:.1f}  "
+            f"p99 {_percentile(ordered, 99) * 1000:.1f}  "
+            f"max {ordered[-1] * 1000:.1f}  stalls {self.stalls}"
+        )
+
+
+class PipelineProfiler:
+    """cProfile and/or tracemalloc around each translation
+
+    start() is called when a translation begins and stop() when it ends;
+    every run writes a report next to the previous ones. Only the GUI
+    thread is profiled, preparation in worker threads shows as waiting.
+    """
+
+    def __init__(self, cpu=False, memory=False):
+        self.cpu = cpu
+        self.memory = memory
+        self.profile = None
+        self.label = None
+        self.started = None
+
+    def start(self, label):
+        if self.started is not None:
+            # A new translation supersedes the one being profiled
+            self.stop()
+        self.label = label
+        self.started = time.perf_counter()
+        if self.memory:
+            tracemalloc.start(25)
+        if self.cpu:
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+    def stop(self):
+        if self.started is None:
+            return None
+        elapsed = time.perf_counter() - self.started
+        self.started = None
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = diagnostics_dir() / f"{stamp}-{self.label}"
+        lines = [f"{self.label}: {elapsed:.3f} s"]
+
+        profile, self.profile = self.profile, None
+        if profile is not None:
+            profile.disable()
+
+        # Snapshot before building the CPU report, which allocates a lot
+        if self.memory and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            lines.append(
+                f"Traced memory: current {current / 2**20:.1f} MB, "
+                f"peak {peak / 2**20:.1f} MB\nTop allocation sites:"
+            )
+            for stat in snapshot.statistics("lineno")[:TOP_ENTRIES]:
+                lines.append(f"  {stat}")
+
+        if profile is not None:
+            profile.dump_stats(f"{base}.prof")
+            output = io.StringIO()
+            stats = pstats.Stats(profile, stream=output)
+            stats.sort_stats("cumulative").print_stats(TOP_ENTRIES)
+            stats.sort_stats("tottime").print_stats(TOP_ENTRIES)
+            lines.append(output.getvalue())
+
+        report = Path(f"{base}.txt")
+        report.write_text("\n".join(lines) + "\n", encoding="utf-8")
+        print(f"Profile of {self.label} written to {report}", file=sys.stderr)
+        return report
+
+
+_profiler = None
+
+
+def configure(watchdog_ms=None, cpu=False, memory=False, parent=None):
+    """Set up diagnostics from CLI options and the environment
+
+    Returns the started StallWatchdog or None.
+    """
+    global _profiler
+    modes = {
+        mode.strip().lower()
+        for mode in os.environ.get("LINGUAGPT_PROFILE", "").split(",")
+        if mode.strip()
+    }
+    cpu = cpu or "cpu" in modes
+    memory = memory or "memory" in modes
+    if cpu or memory:
+        _profiler = PipelineProfiler(cpu, memory)
+
+    if watchdog_ms is None and os.environ.get("LINGUAGPT_WATCHDOG_MS"):
+        try:
+            watchdog_ms = int(os.environ["LINGUAGPT_WATCHDOG_MS"])
+        except ValueError:
+            print("Error: LINGUAGPT_WATCHDOG_MS must be milliseconds")
+    if not watchdog_ms:
+        return None
+    watchdog = StallWatchdog(watchdog_ms, parent)
+    watchdog.start()
+    return watchdog
+
+
+def get_profiler():
+    """Translate pipeline profiler, None unless profiling is enabled"""
+    return _profiler
@@ -0,0 +1,86 @@
+"""
+Process memory footprint helpers
+
+Resident set size and returning freed heap memory to the OS, used by the
+tray idle mode. Platform calls go through ctypes; anything unsupported is
+a no-op.
+"""
+import ctypes
+import ctypes.util
+import gc
+import os
+import sys
+
+
+def current_rss():
+    """Resident set size in bytes, None if it cannot be read"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/statm") as statm:
+                return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        except (OSError, ValueError, IndexError):
+            return None
+    if sys.platform == "win32":
+        return _windows_working_set()
+    return None
+
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    _fields_ = [
+        ("cb", ctypes.c_ulong),
+        ("PageFaultCount", ctypes.c_ulong),
+        ("PeakWorkingSetSize", ctypes.c_size_t),
+        ("WorkingSetSize", ctypes.c_size_t),
+        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+        ("PagefileUsage", ctypes.c_size_t),
+        ("PeakPagefileUsage", ctypes.c_size_t),
+    ]
+
+
+def _windows_process():
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+    return ctypes.c_void_p(kernel32.GetCurrentProcess())
+
+
+def _windows_working_set():
+    counters = _ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    try:
+        process = _windows_process()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(
+            process, ctypes.byref(counters), counters.cb
+        ):
+            return counters.WorkingSetSize
+    except (AttributeError, OSError):
+        pass
+    return None
+
+
+def release_memory():
+    """Collect garbage and ask the allocator to give free pages back"""
+    gc.collect()
+    try:
+        if sys.platform.startswith("linux"):
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6")
+            # glibc only, other C libraries have no malloc_trim
+            if hasattr(libc, "malloc_trim"):
+                libc.malloc_trim(0)
+        elif sys.platform == "win32":
+            # (-1, -1) trims the working set, pages come back on demand
+            ctypes.windll.kernel32.SetProcessWorkingSetSize(
+                _windows_process(), ctypes.c_size_t(-1), ctypes.c_size_t(-1)
+            )
+        elif sys.platform == "darwin":
+            libc = ctypes.CDLL(ctypes.util.find_library("c"))
+            libc.malloc_zone_pressure_relief(None, ctypes.c_size_t(0))
+    except (AttributeError, OSError) as e:
+        print(f"Error releasing memory: {e}")
+
+
+def format_mb(size):
+    """Bytes as "12.3 MB", "?" if unknown"""
+    return "?" if size is None else f"{size / 2**20:.1f} MB"
@@ -0,0 +1,202 @@
+"""
+Application icon rendering and cache
+"""
+import sys
+from pathlib import Path
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtGui import (
+    QBrush,
+    QColor,
+    QFont,
+    QIcon,
+    QLinearGradient,
+    QPainter,
+    QPainterPath,
+    QPen,
+    QPixmap,
+)
+
+from . import __version__
+
+ICON_SIZES = (32, 64, 128, 256)
+
+# Pre-rendered icons shipped with the app (bundled next to the frozen binary)
+BUNDLED_ICON_DIR = (
+    Path(getattr(sys, "_MEIPASS", Path(__file__).resolve().parent.parent))
+    / "resources"
+    / "icons"
+)
+CACHE_ICON_DIR = Path.home() / ".cache" / "linguagpt" / "icons" / __version__
+
+
+def _paint_icon(size=256):
+    """Paint the high-resolution application icon"""
+    pixmap = QPixmap(size, size)
+    pixmap.fill(Qt.GlobalColor.transparent)
+
+    painter = QPainter(pixmap)
+    painter.setRenderHint(QPainter.RenderHint.Antialiasing)
+    painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+    painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
+
+    # Gradient circular background with shadow
+    gradient = QLinearGradient(0, 0, size, size)
+    gradient.setColorAt(0, QColor("#e94560"))
+    gradient.setColorAt(0.5, QColor("#a83f5a"))
+    gradient.setColorAt(1, QColor("#0f3460"))
+
+    # Shadow
+    painter.setBrush(QBrush(QColor(0, 0, 0, 40)))
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.drawEllipse(12, 12, size - 20, size - 20)
+
+    # Main circle
+    painter.setBrush(QBrush(gradient))
+    painter.drawEllipse(8, 8, size - 16, size - 16)
+
+    # Inner light highlight
+    inner_gradient = QLinearGradient(size * 0.3, size * 0.2, size * 0.7, size * 0.5)
+    inner_gradient.setColorAt(0, QColor(255, 255, 255, 30))
+    inner_gradient.setColorAt(1, QColor(255, 255, 255, 0))
+    painter.setBrush(QBrush(inner_gradient))
+    painter.drawEllipse(
+        int(size * 0.15), int(size * 0.1), int(size * 0.6), int(size * 0.4)
+    )
+
+    # Letter "A" (left) with shadow
+    font = QFont("Arial", int(size * 0.32), QFont.Weight.Bold)
+    painter.setFont(font)
+
+    # Shadow for "A"
+    painter.setPen(QColor(0, 0, 0, 80))
+    painter.drawText(int(size * 0.18), int(size * 0.62), "A")
+
+    # Letter "A"
+    painter.setPen(QColor("white"))
+    painter.drawText(int(size * 0.17), int(size * 0.61), "A")
+
+    # Shadow for "Я"
+    painter.setPen(QColor(0, 0, 0, 80))
+    painter.drawText(int(size * 0.67), int(size * 0.62), "Я")
+
+    # Letter "Я" (right)
+    painter.setPen(QColor("white"))
+    painter.drawText(int(size * 0.66), int(size * 0.61), "Я")
+
+    # Translation arrows
+    pen = QPen(QColor("#4CC9F0"), int(size * 0.03))
+    pen.setCapStyle(Qt.PenCapStyle.RoundCap)
+    pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
+    painter.setPen(pen)
+
+    # Arrow down-right
+    arrow_path1 = QPainterPath()
+    arrow_path1.moveTo(size * 0.52, size * 0.42)
+    arrow_path1.lineTo(size * 0.62, size * 0.48)
+    arrow_path1.lineTo(size * 0.52, size * 0.54)
+    painter.drawPath(arrow_path1)
+
+    # Arrow up-left
+    arrow_path2 = QPainterPath()
+    arrow_path2.moveTo(size * 0.48, size * 0.28)
+    arrow_path2.lineTo(size * 0.38, size * 0.22)
+    arrow_path2.lineTo(size * 0.48, size * 0.16)
+    painter.drawPath(arrow_path2)
+
+    # AI sparks
+    painter.setPen(Qt.PenStyle.NoPen)
+
+    spark_gradient = QLinearGradient(0, 0, size * 0.1, size * 0.1)
+    spark_gradient.setColorAt(0, QColor("#FFD60A"))
+    spark_gradient.setColorAt(1, QColor("#FFA500"))
+    painter.setBrush(QBrush(spark_gradient))
+
+    painter.drawEllipse(
+        int(size * 0.18), int(size * 0.18), int(size * 0.06), int(size * 0.06)
+    )
+    painter.drawEllipse(
+        int(size * 0.76), int(size * 0.18), int(size * 0.06), int(size * 0.06)
+    )
+    painter.drawEllipse(
+        int(size * 0.46), int(size * 0.10), int(size * 0.05), int(size * 0.05)
+    )
+
+    # AI neural network
+    painter.setBrush(QColor("#4CC9F0"))
+    painter.setOpacity(0.8)
+
+    node_size = int(size * 0.04)
+    node1_x, node1_y = int(size * 0.28), int(size * 0.80)
+    node2_x, node2_y = int(size * 0.48), int(size * 0.83)
+    node3_x, node3_y = int(size * 0.68), int(size * 0.80)
+
+    # Lines between nodes
+    pen = QPen(QColor("#4CC9F0"), int(size * 0.01))
+    painter.setPen(pen)
+    painter.setOpacity(0.5)
+    painter.drawLine(
+        node1_x + node_size // 2,
+        node1_y + node_size // 2,
+        node2_x + node_size // 2,
+        node2_y + node_size // 2,
+    )
+    painter.drawLine(
+        node2_x + node_size // 2,
+        node2_y + node_size // 2,
+        node3_x + node_size // 2,
+        node3_y + node_size // 2,
+    )
+
+    # Nodes
+    painter.setOpacity(0.9)
+    painter.setPen(Qt.PenStyle.NoPen)
+    painter.drawEllipse(node1_x, node1_y, node_size, node_size)
+    painter.drawEllipse(node2_x, node2_y, node_size, node_size)
+    painter.drawEllipse(node3_x, node3_y, node_size, node_size)
+
+    painter.end()
+
+    return pixmap
+
+
+def render_icon_pixmap(size):
+    """Render the icon, painted at 256px and scaled like the original"""
+    pixmap = _paint_icon()
+    if size == pixmap.width():
+        return pixmap
+    return pixmap.scaled(
+        size,
+        size,
+        Qt.AspectRatioMode.KeepAspectRatio,
+        Qt.TransformationMode.SmoothTransformation,
+    )
+
+
+def icon_file_name(size):
+    return f"linguagpt-{size}.png"
+
+
+def load_app_icon():
+    """Load the app icon from pre-rendered assets
+
+    Falls back to the per-user cache and renders missing sizes into it once,
+    so regular launches never paint the icon.
+    """
+    icon = QIcon()
+    for size in ICON_SIZES:
+        name = icon_file_name(size)
+        for directory in (BUNDLED_ICON_DIR, CACHE_ICON_DIR):
+            path = directory / name
+            if path.exists():
+                icon.addFile(str(path))
+                break
+        else:
+            pixmap = render_icon_pixmap(size)
+            try:
+                CACHE_ICON_DIR.mkdir(parents=True, exist_ok=True)
+                pixmap.save(str(CACHE_ICON_DIR / name), "PNG")
+            except OSError as e:
+                print(f"Error caching icon: {e}")
+            icon.addPixmap(pixmap)
+    return icon
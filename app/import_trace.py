@@ -0,0 +1,118 @@
+"""
+Import trace of a session, used by build.py to prune frozen builds
+
+main.py --record-imports FILE writes the Python modules and the Qt plugins
+the process loaded when it quits. Traces of several sessions recorded into
+the same file are merged, so a build can cover everything that was used in
+any of them.
+"""
+import json
+import os
+import sys
+from pathlib import Path
+
+
+def loaded_libraries():
+    """Paths of the shared libraries loaded into this process, None if unknown"""
+    if sys.platform.startswith("linux"):
+        try:
+            with open("/proc/self/maps") as maps:
+                fields = (line.split(None, 5) for line in maps)
+                return sorted(
+                    {
+                        parts[5].strip()
+                        for parts in fields
+                        if len(parts) == 6 and parts[5].startswith("/")
+                    }
+                )
+        except OSError:
+            return None
+    if sys.platform == "win32":
+        import ctypes
+        from ctypes import wintypes
+
+        psapi = ctypes.WinDLL("psapi")
+        kernel32 = ctypes.WinDLL("kernel32")
+        kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        kernel32.GetModuleFileNameW.argtypes = (
+            wintypes.HMODULE,
+            wintypes.LPWSTR,
+            wintypes.DWORD,
+        )
+        psapi.EnumProcessModules.argtypes = (
+            wintypes.HANDLE,
+            ctypes.POINTER(wintypes.HMODULE),
+            wintypes.DWORD,
+            ctypes.POINTER(wintypes.DWORD),
+        )
+        modules = (wintypes.HMODULE * 4096)()
+        needed = wintypes.DWORD()
+        if not psapi.EnumProcessModules(
+            kernel32.GetCurrentProcess(),
+            modules,
+            ctypes.sizeof(modules),
+            ctypes.byref(needed),
+        ):
+            return None
+        buffer = ctypes.create_unicode_buffer(32768)
+        paths = []
+        for module in modules[:needed.value // ctypes.sizeof(wintypes.HMODULE)]:
+            if kernel32.GetModuleFileNameW(module, buffer, len(buffer)):
+                paths.append(buffer.value)
+        return sorted(paths)
+    return None
+
+
+def qt_plugins(libraries):
+    """Loaded Qt plugins as "category/file" names, None if unknown"""
+    if libraries is None:
+        return None
+    plugins = set()
+    for library in libraries:
+        parts = Path(library).parts
+        if len(parts) > 2 and parts[-3].lower() == "plugins":
+            plugins.add(f"{parts[-2]}/{parts[-1]}")
+    return sorted(plugins)
+
+
+def merge(trace, other):
+    """Union of two traces; plugins stay unknown only if both are"""
+    plugins = [trace.get("qt_plugins"), other.get("qt_plugins")]
+    known = [names for names in plugins if names is not None]
+    return {
+        "sessions": trace.get("sessions", 0) + other.get("sessions", 0),
+        "modules": sorted(
+            set(trace.get("modules", [])) | set(other.get("modules", []))
+        ),
+        "qt_plugins": sorted(set().union(*known)) if known else None,
+    }
+
+
+def load(path):
+    """A trace file, empty if it does not exist"""
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return {"sessions": 0, "modules": [], "qt_plugins": None}
+
+
+def record(path):
+    """Merge this session's modules and Qt plugins into the trace file"""
+    session = {
+        "sessions": 1,
+        "modules": sorted(name for name in list(sys.modules) if name),
+        "qt_plugins": qt_plugins(loaded_libraries()),
+    }
+    try:
+        trace = merge(load(path), session)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as file:
+            json.dump(trace, file, indent=1)
+        os.replace(tmp, path)
+        print(
+            f"Import trace: {len(trace['modules'])} modules from "
+            f"{trace['sessions']} sessions in {path}",
+            file=sys.stderr,
+        )
+    except (OSError, ValueError) as e:
+        print(f"Error writing import trace: {e}")
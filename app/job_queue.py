@@ -0,0 +1,244 @@
+"""
+Persistent translation job queue backed by SQLite
+"""
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+DEFAULT_QUEUE_FILE = Path.home() / ".gpt_translator_jobs.sqlite3"
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+PRIORITY_LOW = -10
+PRIORITY_NORMAL = 0
+PRIORITY_HIGH = 10
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    priority INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS jobs_ready
+    ON jobs (state, priority DESC, created_at);
+"""
+
+
+class Job:
+    """Translation job loaded from the queue"""
+
+    __slots__ = (
+        "id",
+        "priority",
+        "state",
+        "payload",
+        "result",
+        "error",
+        "attempts",
+        "not_before",
+        "created_at",
+        "updated_at",
+    )
+
+    def __init__(self, row):
+        (
+            self.id,
+            self.priority,
+            self.state,
+            payload,
+            self.result,
+            self.error,
+            self.attempts,
+            self.not_before,
+            self.created_at,
+            self.updated_at,
+        ) = row
+        self.payload = json.loads(payload)
+
+
+_COLUMNS = ", ".join(Job.__slots__)
+
+
+def make_job_id(payload):
+    """Idempotent job ID derived from the job payload"""
+    canonical = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32]
+
+
+class JobQueue:
+    """Durable priority queue of translation jobs
+
+    Jobs survive restarts and crashes: anything left RUNNING by a previous
+    process goes back to QUEUED when the queue is opened. Submitting the
+    same payload twice returns the existing job instead of adding a copy.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_QUEUE_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._recover()
+
+    def _recover(self):
+        """Requeue jobs interrupted by a crash or quit"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+                (QUEUED, time.time(), RUNNING),
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def submit(self, payload, priority=PRIORITY_NORMAL, job_id=None):
+        """Add a job, returns its ID (existing jobs are left untouched)"""
+        job_id = job_id or make_job_id(payload)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO jobs "
+                "(id, priority, state, payload, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    job_id,
+                    priority,
+                    QUEUED,
+                    json.dumps(payload, ensure_ascii=False),
+                    now,
+                    now,
+                ),
+            )
+        return job_id
+
+    def retry(self, job_id):
+        """Move a failed job back to the queue"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, error = NULL, not_before = 0, "
+                "updated_at = ? WHERE id = ? AND state = ?",
+                (QUEUED, time.time(), job_id, FAILED),
+            )
+
+    def claim_next(self):
+        """Atomically take the highest priority ready job, or None"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {_COLUMNS} FROM jobs "
+                    "WHERE state = ? AND not_before <= ? "
+                    "ORDER BY priority DESC, created_at LIMIT 1",
+                    (QUEUED, now),
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        "UPDATE jobs SET state = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE id = ?",
+                        (RUNNING, now, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        job = Job(row)
+        job.state = RUNNING
+        job.attempts += 1
+        return job
+
+    def complete(self, job_id, result):
+        """Mark job as done and store its result"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (DONE, result, time.time(), job_id),
+            )
+
+    def fail(self, job_id, error, retry_in=None):
+        """Mark job as failed, or requeue it after retry_in seconds"""
+        now = time.time()
+        with self._lock:
+            if retry_in is None:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, updated_at = ? "
+                    "WHERE id = ?",
+                    (FAILED, error, now, job_id),
+                )
+            else:
+                self._conn.execute(
+                    "UPDATE jobs SET state = ?, error = ?, not_before = ?, "
+                    "updated_at = ? WHERE id = ?",
+                    (QUEUED, error, now + retry_in, now, job_id),
+                )
+
+    def get(self, job_id):
+        """Get job by ID, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {_COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return Job(row) if row else None
+
+    def jobs(self, state=None, limit=100):
+        """List jobs, most recently updated first"""
+        query = f"SELECT {_COLUMNS} FROM jobs"
+        params = []
+        if state:
+            query += " WHERE state = ?"
+            params.append(state)
+        query += " ORDER BY updated_at DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [Job(row) for row in rows]
+
+    def counts(self):
+        """Number of jobs per state"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs GROUP BY state"
+            ).fetchall()
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        counts.update(dict(rows))
+        return counts
+
+    def next_ready_in(self):
+        """Seconds until the next queued job becomes ready, None if empty"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MIN(not_before) FROM jobs WHERE state = ?", (QUEUED,)
+            ).fetchone()
+        if row[0] is None:
+            return None
+        return max(row[0] - time.time(), 0)
+
+    def purge(self, older_than_days=30):
+        """Delete finished jobs older than the given age"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM jobs WHERE state IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, cutoff),
+            )
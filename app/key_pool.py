@@ -0,0 +1,267 @@
+"""
+API key pool with per-key rate limit accounting
+"""
+import re
+import threading
+import time
+
+from .config import get_config
+
+# Cooldown used when a throttled response carries no reset hint
+DEFAULT_THROTTLE_SECONDS = 20
+# Revoked keys are retried after this period in case they were restored
+REVOKED_COOLDOWN_SECONDS = 15 * 60
+
+_DURATION_RE = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+
+
+def parse_duration(value):
+    """Parse OpenAI reset durations like '20ms', '1s' or '6m0s' to seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    units = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    total = 0.0
+    matched = False
+    for number, unit in _DURATION_RE.findall(value):
+        total += float(number) * units[unit]
+        matched = True
+    return total if matched else None
+
+
+def _parse_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class KeyState:
+    """Rate accounting for a single API key"""
+
+    def __init__(self, key, organization=""):
+        self.key = key
+        self.organization = organization
+        self.remaining_requests = None
+        self.remaining_tokens = None
+        self.requests_reset_at = 0.0
+        self.tokens_reset_at = 0.0
+        self.cooldown_until = 0.0
+        self.revoked = False
+        self.in_flight = 0
+        self.last_used = 0.0
+
+    @property
+    def label(self):
+        """Short identifier safe to show in logs"""
+        return f"...{self.key[-4:]}" if len(self.key) > 4 else "..."
+
+    def is_available(self, now):
+        return self.cooldown_until <= now
+
+    def budget(self, now, estimated_tokens):
+        """Estimate how many more requests this key can take right now
+
+        Requests in flight are already taken off the remaining counts when
+        they are reserved, so they are not subtracted again here.
+        """
+        requests_left = self.remaining_requests
+        if requests_left is None or now >= self.requests_reset_at:
+            requests_left = float("inf")
+        tokens_left = self.remaining_tokens
+        if tokens_left is None or now >= self.tokens_reset_at:
+            tokens_left = float("inf")
+        by_tokens = tokens_left / max(estimated_tokens, 1)
+        return min(requests_left, by_tokens)
+
+    def ready_at(self):
+        """Time the cooldown and any exhausted rate limit window end"""
+        ready = self.cooldown_until
+        if self.remaining_requests is not None and self.remaining_requests <= 0:
+            ready = max(ready, self.requests_reset_at)
+        if self.remaining_tokens is not None and self.remaining_tokens <= 0:
+            ready = max(ready, self.tokens_reset_at)
+        return ready
+
+
+class KeyPool:
+    """Dispatcher that spreads requests across several API keys
+
+    Each response's x-ratelimit-* headers update the remaining budget of the
+    key that served it; the key with the largest budget gets the next
+    request. Throttled keys cool down until their reset time and revoked
+    keys leave the rotation for a while.
+    """
+
+    def __init__(self, entries=()):
+        self._lock = threading.Condition()
+        self.keys = []
+        for entry in entries:
+            if isinstance(entry, KeyState):
+                self.keys.append(entry)
+            elif isinstance(entry, dict):
+                key = entry.get("key", "").strip()
+                if key:
+                    self.keys.append(KeyState(key, entry.get("organization", "")))
+            elif entry:
+                self.keys.append(KeyState(str(entry)))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _pick(self, now, estimated_tokens, exclude):
+        best = None
+        best_score = None
+        for state in self.keys:
+            if state.key in exclude or not state.is_available(now):
+                continue
+            budget = state.budget(now, estimated_tokens)
+            if budget <= 0:
+                continue
+            # Largest budget wins, ties go to the least recently used key
+            score = (budget, -state.in_flight, -state.last_used)
+            if best_score is None or score > best_score:
+                best, best_score = state, score
+        return best
+
+    def _reserve(self, state, now, estimated_tokens):
+        state.in_flight += 1
+        state.last_used = now
+        if state.remaining_requests is not None:
+            state.remaining_requests -= 1
+        if state.remaining_tokens is not None:
+            state.remaining_tokens -= estimated_tokens
+
+    def _next_ready_in(self, now, exclude):
+        waits = [
+            state.ready_at() - now
+            for state in self.keys
+            if state.key not in exclude and not state.revoked
+        ]
+        return max(min(waits), 0.05) if waits else None
+
+    def acquire(self, estimated_tokens=0, timeout=None, exclude=()):
+        """Reserve the key with the most remaining budget
+
+        Blocks until a key is available or the timeout expires. Returns None
+        when no usable key exists.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            while True:
+                now = time.monotonic()
+                state = self._pick(now, estimated_tokens, exclude)
+                if state is not None:
+                    self._reserve(state, now, estimated_tokens)
+                    return state
+
+                wait = self._next_ready_in(now, exclude)
+                if wait is None:
+                    return None
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                    if wait <= 0:
+                        return None
+                self._lock.wait(wait)
+
+    def try_acquire(self, estimated_tokens=0, exclude=()):
+        """Reserve a key without blocking, returns (state, retry_in)"""
+        with self._lock:
+            now = time.monotonic()
+            state = self._pick(now, estimated_tokens, exclude)
+            if state is None:
+                return None, self._next_ready_in(now, exclude)
+            self._reserve(state, now, estimated_tokens)
+            return state, 0
+
+    def release(self, state):
+        """Return a key reserved by acquire()"""
+        with self._lock:
+            state.in_flight = max(state.in_flight - 1, 0)
+            self._lock.notify_all()
+
+    def update_from_headers(self, state, headers):
+        """Update key budget from x-ratelimit-* response headers"""
+        now = time.monotonic()
+        with self._lock:
+            remaining_requests = _parse_int(
+                headers.get("x-ratelimit-remaining-requests")
+            )
+            if remaining_requests is not None:
+                state.remaining_requests = remaining_requests
+                reset = parse_duration(headers.get("x-ratelimit-reset-requests"))
+                state.requests_reset_at = now + (reset or 60)
+            remaining_tokens = _parse_int(headers.get("x-ratelimit-remaining-tokens"))
+            if remaining_tokens is not None:
+                state.remaining_tokens = remaining_tokens
+                reset = parse_duration(headers.get("x-ratelimit-reset-tokens"))
+                state.tokens_reset_at = now + (reset or 60)
+            if state.revoked:
+                state.revoked = False
+            self._lock.notify_all()
+
+    def mark_throttled(self, state, headers=None):
+        """Take a key out of rotation until its rate limit resets"""
+        headers = headers or {}
+        delay = parse_duration(headers.get("retry-after"))
+        if delay is None:
+            delay = max(
+                parse_duration(headers.get("x-ratelimit-reset-requests")) or 0,
+                parse_duration(headers.get("x-ratelimit-reset-tokens")) or 0,
+            )
+        with self._lock:
+            state.cooldown_until = time.monotonic() + (
+                delay or DEFAULT_THROTTLE_SECONDS
+            )
+            state.remaining_requests = 0
+            self._lock.notify_all()
+
+    def mark_revoked(self, state):
+        """Take an invalid or revoked key out of rotation"""
+        with self._lock:
+            state.revoked = True
+            state.cooldown_until = time.monotonic() + REVOKED_COOLDOWN_SECONDS
+            self._lock.notify_all()
+
+    def stats(self):
+        """Snapshot of per-key accounting for diagnostics"""
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "key": state.label,
+                    "organization": state.organization,
+                    "remaining_requests": state.remaining_requests,
+                    "remaining_tokens": state.remaining_tokens,
+                    "in_flight": state.in_flight,
+                    "cooling_down": max(state.cooldown_until - now, 0),
+                    "revoked": state.revoked,
+                }
+                for state in self.keys
+            ]
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_key_pool():
+    """Get the shared key pool built from the settings service"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            config = get_config()
+            _pool = KeyPool(config.key_entries())
+            config.subscribe(_on_config_changed)
+        return _pool
+
+
+def _on_config_changed(changed_keys):
+    global _pool
+    if changed_keys & {"api_key", "api_keys"}:
+        with _pool_lock:
+            _pool = KeyPool(get_config().key_entries())
@@ -0,0 +1,168 @@
+"""
+Live translation while typing
+
+Edits are debounced, then the source is split into lines and sentences.
+Only segments without a known translation are sent, one streaming request
+each, and requests for segments that were edited away are cancelled. The
+output is rebuilt from per-segment translations, so an edit costs about as
+much as the text it changed.
+"""
+import difflib
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+from .config import get_config
+from .markup import split_plain
+from .openai_client import build_prompt
+
+# Known translations kept beyond the current text, for undo and retyping
+CACHE_SLACK = 512
+
+
+class LiveTranslator(QObject):
+    """Incrementally translates a text that is being edited"""
+
+    # Full output text, to be spliced into the result editor
+    output_changed = pyqtSignal(str)
+    # Segments in the last update and how many of them had to be sent
+    segments_sent = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, engine, parent=None):
+        super().__init__(parent)
+        self.engine = engine
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.update)
+        self.pending = None
+        self.context = None
+        self.pieces = []
+        self.segments = []
+        self.outputs = []
+        self.interim = {}
+        self.translations = {}
+        self.partials = {}
+        self.requests = {}
+
+    def schedule(self, text, model, source, target):
+        """Translate text once the user pauses typing"""
+        self.pending = (text, model, source, target)
+        self.timer.start(get_config().live_debounce_ms)
+
+    def stop(self):
+        """Cancel the pending update and all running segment requests"""
+        self.timer.stop()
+        self.pending = None
+        for request in self.requests.values():
+            request.abort()
+        self.requests.clear()
+        self.partials.clear()
+
+    def update(self):
+        """Diff the pending text against the last one and send what changed"""
+        if self.pending is None:
+            return
+        text, model, source, target = self.pending
+        self.pending = None
+
+        context = (model, source, target)
+        if context != self.context:
+            # Another language or model invalidates everything known
+            self.stop()
+            self.translations.clear()
+            self.context = context
+
+        pieces = list(split_plain(text))
+        segments = [segment for raw, segment in pieces if raw is None]
+        wanted = {segment.strip() for segment in segments if segment.strip()}
+
+        for key in [key for key in self.requests if key not in wanted]:
+            self.requests.pop(key).abort()
+            self.partials.pop(key, None)
+
+        from .translation_memory import recall
+
+        sent = 0
+        for key in wanted:
+            if key in self.translations or key in self.requests:
+                continue
+            remembered = recall(key, source, target)
+            if remembered is not None:
+                self.translations[key] = remembered
+                continue
+            self._send(key, model, source, target)
+            sent += 1
+
+        if len(self.translations) > len(wanted) + CACHE_SLACK:
+            self.translations = {
+                key: value for key, value in self.translations.items() if key in wanted
+            }
+
+        # Edited segments keep showing their old output until the new arrives
+        interim = {}
+        matcher = difflib.SequenceMatcher(None, self.segments, segments, autojunk=False)
+        for tag, old_start, old_end, new_start, new_end in matcher.get_opcodes():
+            if tag == "replace" and old_end - old_start == new_end - new_start:
+                for offset in range(new_end - new_start):
+                    interim[new_start + offset] = self.outputs[old_start + offset]
+
+        self.pieces = pieces
+        self.segments = segments
+        self.interim = interim
+        self.segments_sent.emit(len(wanted), sent)
+        self._render()
+
+    def _send(self, key, model, source, target):
+        request = self.engine.translate(model, build_prompt(key, source, target))
+        request.chunk_received.connect(lambda text: self._on_chunk(key, text))
+        request.finished.connect(lambda text: self._on_finished(key, request, text))
+        request.error.connect(lambda message: self._on_error(key, request, message))
+        self.requests[key] = request
+
+    def _on_chunk(self, key, text):
+        if key in self.requests:
+            self.partials[key] = text
+            self._render()
+
+    def _on_finished(self, key, request, text):
+        if self.requests.get(key) is not request:
+            return
+        del self.requests[key]
+        self.partials.pop(key, None)
+        self.translations[key] = text.strip()
+        self._render()
+
+    def _on_error(self, key, request, message):
+        if self.requests.get(key) is not request:
+            return
+        del self.requests[key]
+        self.partials.pop(key, None)
+        self.error.emit(message)
+
+    def _output(self, index, segment):
+        key = segment.strip()
+        if not key:
+            return segment
+        translation = self.translations.get(key)
+        if translation is None:
+            translation = self.partials.get(key)
+        if translation is None:
+            return self.interim.get(index, segment)
+        # Keep the segment's own surrounding whitespace
+        leading = segment[:len(segment) - len(segment.lstrip())]
+        trailing = segment[len(segment.rstrip()):]
+        return leading + translation + trailing
+
+    def _render(self):
+        parts = []
+        self.outputs = []
+        index = 0
+        for raw, segment in self.pieces:
+            if raw is not None:
+                parts.append(raw)
+                continue
+            output = self._output(index, segment)
+            self.outputs.append(output)
+            parts.append(output)
+            index += 1
+        self.output_changed.emit("".join(parts))
@@ -0,0 +1,526 @@
+"""
+Incremental localization of key/value catalogs
+
+    python -m app.localize app/translations.py            # every UI language
+    python -m app.localize locales/en.json --languages de,fr
+    python -m app.localize po/messages.pot --languages kk --dry-run
+
+Catalogs are the TRANSLATIONS dict of a Python module (all languages in
+one file), JSON (a file per language next to en.json, or one file nested
+by language) and gettext .po files (de.po next to the .pot or en.po). A
+manifest next to the catalog (name.l10n.json) records the hash of the
+source string each translation was made from, so only keys that are
+missing or whose source changed are sent. Many strings are packed into one
+numbered batch request per language, placeholders like {count} are masked.
+Existing translations without a manifest entry are taken as up to date.
+"""
+import argparse
+import ast
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .config import get_config
+from .translation_memory import LANGUAGE_CODES
+
+DEFAULT_SOURCE = "en"
+UI_CONTEXT = (
+    "The segments are user interface strings of a desktop translation app, "
+    "keep them about as short as the originals. "
+)
+CATALOG = "catalog"
+
+_PO_FIELD_RE = re.compile(
+    r"^(msgctxt|msgid_plural|msgid|msgstr(?:\[\d+\])?)\s+(\".*\")\s*$"
+)
+_PO_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", '"': '"', "\\": "\\"}
+
+
+def text_hash(text):
+    """Short stable hash of a source string"""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def language_name(code):
+    """Name used in prompts, the UI's own name where there is one"""
+    for name, language in LANGUAGE_CODES.items():
+        if language == code:
+            return name
+    return code
+
+
+def _write_text(path, text):
+    """Write via a temporary file and rename"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class PythonCatalog:
+    """A {language: {key: text}} dict assigned in a Python module"""
+
+    def __init__(self, path, variable="TRANSLATIONS"):
+        self.path = Path(path)
+        self.variable = variable
+        self.text = self.path.read_text(encoding="utf-8")
+        for node in ast.parse(self.text).body:
+            if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == variable
+                for target in node.targets
+            ):
+                self.node = node
+                self.data = ast.literal_eval(node.value)
+                break
+        else:
+            raise ValueError(f"{variable} not found in {self.path}")
+
+    def source_strings(self, source):
+        return dict(self.data.get(source, {}))
+
+    def load(self, language):
+        return dict(self.data.get(language, {}))
+
+    def save(self, language, strings):
+        self.data[language] = strings
+        lines = self.text.splitlines(keepends=True)
+        start, end = self.node.lineno - 1, self.node.end_lineno
+        literal = [f"{self.variable} = {{\n"]
+        for code, entries in self.data.items():
+            literal.append(f"    {json.dumps(code)}: {{\n")
+            for key, value in entries.items():
+                literal.append(
+                    f"        {json.dumps(key)}: "
+                    f"{json.dumps(value, ensure_ascii=False)},\n"
+                )
+            literal.append("    },\n")
+        literal.append("}\n")
+        self.text = "".join(lines[:start] + literal + lines[end:])
+        _write_text(self.path, self.text)
+        self.node.end_lineno = start + len(literal)
+
+
+class JsonCatalog:
+    """Flat JSON files per language (en.json, de.json) or one nested file"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, encoding="utf-8") as f:
+            self.data = json.load(f)
+        # {"en": {...}, "de": {...}} keeps every language in this file
+        self.nested = bool(self.data) and all(
+            isinstance(value, dict) for value in self.data.values()
+        )
+
+    def language_path(self, language):
+        return self.path.with_name(f"{language}{self.path.suffix}")
+
+    def source_strings(self, source):
+        if self.nested:
+            return dict(self.data.get(source, {}))
+        return dict(self.data)
+
+    def load(self, language):
+        if self.nested:
+            return dict(self.data.get(language, {}))
+        path = self.language_path(language)
+        if not path.exists():
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save(self, language, strings):
+        if self.nested:
+            self.data[language] = strings
+            path, data = self.path, self.data
+        else:
+            path, data = self.language_path(language), strings
+        _write_text(path, json.dumps(data, ensure_ascii=False, indent=2) + "\n")
+
+
+class PoEntry:
+    """One gettext message with its comment lines"""
+
+    __slots__ = ("comments", "fields")
+
+    def __init__(self):
+        self.comments = []
+        # msgctxt, msgid, msgid_plural, msgstr or msgstr[n] -> text, in order
+        self.fields = {}
+
+    @property
+    def key(self):
+        msgid = self.fields.get("msgid", "")
+        if "msgctxt" in self.fields:
+            # gettext's own separator between context and message
+            return f"{self.fields['msgctxt']}\x04{msgid}"
+        return msgid
+
+    @property
+    def plural(self):
+        return "msgid_plural" in self.fields
+
+    @property
+    def fuzzy(self):
+        return any(
+            line.startswith("#,") and "fuzzy" in line for line in self.comments
+        )
+
+
+def _po_unescape(quoted):
+    return re.sub(
+        r"\\(.)", lambda m: _PO_ESCAPES.get(m.group(1), m.group(0)), quoted[1:-1]
+    )
+
+
+def _po_escape(text):
+    return (
+        text.replace("\\", "\\\\")
+        .replace('"', '\\"')
+        .replace("\t", "\\t")
+        .replace("\r", "\\r")
+        .replace("\n", "\\n")
+    )
+
+
+def parse_po(text):
+    """List of PoEntry of a .po/.pot file, the header is the first entry"""
+    entries = []
+    entry = PoEntry()
+    field = None
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            if entry.fields or entry.comments:
+                entries.append(entry)
+            entry, field = PoEntry(), None
+            continue
+        if line.startswith("#"):
+            if entry.fields:
+                entries.append(entry)
+                entry, field = PoEntry(), None
+            entry.comments.append(line)
+            continue
+        match = _PO_FIELD_RE.match(line)
+        if match:
+            field = match.group(1)
+            entry.fields[field] = _po_unescape(match.group(2))
+        elif line.startswith('"') and field is not None:
+            entry.fields[field] += _po_unescape(line)
+    if entry.fields or entry.comments:
+        entries.append(entry)
+    return entries
+
+
+def render_po(entries):
+    blocks = []
+    for entry in entries:
+        lines = list(entry.comments)
+        for field, value in entry.fields.items():
+            parts = value.splitlines(keepends=True)
+            if len(parts) > 1:
+                lines.append(f'{field} ""')
+                lines.extend(f'"{_po_escape(part)}"' for part in parts)
+            else:
+                lines.append(f'{field} "{_po_escape(value)}"')
+        blocks.append("\n".join(lines))
+    return "\n\n".join(blocks) + "\n"
+
+
+class PoCatalog:
+    """gettext files: messages.pot or en.po as source, de.po next to it
+
+    Plural messages are kept as they are and left to translators.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.template = parse_po(self.path.read_text(encoding="utf-8"))
+
+    def language_path(self, language):
+        return self.path.with_name(f"{language}.po")
+
+    @staticmethod
+    def _messages(entries):
+        return [
+            entry
+            for entry in entries
+            if "msgid" in entry.fields and entry.fields["msgid"] and not entry.plural
+        ]
+
+    def source_strings(self, source):
+        return {
+            entry.key: entry.fields["msgid"] for entry in self._messages(self.template)
+        }
+
+    def _target_entries(self, language):
+        path = self.language_path(language)
+        if not path.exists():
+            return []
+        return parse_po(path.read_text(encoding="utf-8"))
+
+    def load(self, language):
+        return {
+            entry.key: entry.fields["msgstr"]
+            for entry in self._messages(self._target_entries(language))
+            if entry.fields.get("msgstr") and not entry.fuzzy
+        }
+
+    def save(self, language, strings):
+        existing = {entry.key: entry for entry in self._target_entries(language)}
+        entries = []
+        for template in self.template:
+            entry = PoEntry()
+            entry.comments = list(template.comments)
+            entry.fields = dict(template.fields)
+            key = template.key
+            if "msgid" in template.fields and not template.fields["msgid"]:
+                # Header: the language's own, or the template's with Language set
+                header = existing.get(key)
+                if header is not None:
+                    entry = header
+                else:
+                    entry.fields["msgstr"] = re.sub(
+                        r"Language: [^\n]*", f"Language: {language}",
+                        entry.fields.get("msgstr", ""),
+                    )
+            elif template.plural:
+                entry = existing.get(key, entry)
+            elif key in strings:
+                entry.fields["msgstr"] = strings[key]
+                entry.comments = _without_fuzzy(entry.comments)
+            else:
+                # An en.po template carries English in msgstr
+                entry.fields["msgstr"] = ""
+            entries.append(entry)
+        _write_text(self.language_path(language), render_po(entries))
+
+
+def _without_fuzzy(comments):
+    result = []
+    for line in comments:
+        if line.startswith("#,"):
+            line = re.sub(r",?\s*fuzzy", "", line)
+            if line == "#,":
+                continue
+        result.append(line)
+    return result
+
+
+def open_catalog(path):
+    """Catalog reader/writer by file type"""
+    suffix = Path(path).suffix.lower()
+    if suffix == ".py":
+        return PythonCatalog(path)
+    if suffix == ".json":
+        return JsonCatalog(path)
+    if suffix in (".po", ".pot"):
+        return PoCatalog(path)
+    raise ValueError(f"Unsupported catalog type: {path}")
+
+
+def manifest_path(path):
+    return Path(path).with_suffix(".l10n.json")
+
+
+def load_manifest(path):
+    try:
+        with open(manifest_path(path), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def plan(catalog, languages, source=DEFAULT_SOURCE, manifest=None):
+    """Work per language: (current strings, recorded hashes, keys to translate)"""
+    source_strings = catalog.source_strings(source)
+    hashes = {key: text_hash(text) for key, text in source_strings.items()}
+    manifest = manifest or {}
+    plans = {}
+    for language in languages:
+        current = catalog.load(language)
+        recorded = {
+            key: value
+            for key, value in manifest.get(language, {}).items()
+            if key in hashes
+        }
+        for key in current:
+            if key in hashes and key not in recorded:
+                # Written by hand before the manifest existed
+                recorded[key] = hashes[key]
+        todo = [
+            key
+            for key, text in source_strings.items()
+            if text and (key not in current or recorded.get(key) != hashes[key])
+        ]
+        plans[language] = (current, recorded, todo)
+    return source_strings, hashes, plans
+
+
+def translate_strings(jobs, source=DEFAULT_SOURCE, model=None, workers=None):
+    """Translate {language: {key: text}} in packed batches
+
+    Returns {language: {key: translation}}; strings whose answer is missing
+    or lost a placeholder are retried once, then left out.
+    """
+    from .markup import MarkupDocument, Segment, build_batch_prompt
+    from .openai_client import build_translation_payload, complete_chat
+    from .processing import mask
+    from .scheduler import BACKGROUND
+
+    config = get_config()
+    model = model or config.model
+    documents = {}
+    for language, strings in jobs.items():
+        segments = []
+        for number, text in enumerate(strings.values(), 1):
+            masked, masks = mask(text)
+            segments.append(Segment(number, masked, masks, text))
+        documents[language] = MarkupDocument(CATALOG, "", segments)
+    answers = {language: {} for language in jobs}
+
+    workers = max(workers or config.max_concurrent_requests, 1)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for _ in range(2):
+            work = []
+            for language, document in documents.items():
+                missing = [
+                    segment
+                    for segment in document.unique_segments
+                    if segment.number not in answers[language]
+                ]
+                for batch in document.make_batches(missing):
+                    prompt = UI_CONTEXT + build_batch_prompt(
+                        batch, language_name(source), language_name(language)
+                    )
+                    payload = build_translation_payload(model, prompt, stream=False)
+                    future = executor.submit(complete_chat, payload, BACKGROUND)
+                    work.append((language, future))
+            if not work:
+                break
+            for language, future in work:
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"Error translating catalog strings into {language}: {e}")
+                    continue
+                answers[language].update(documents[language].answers([text]))
+
+    results = {}
+    for language, strings in jobs.items():
+        restored = documents[language].translated_segments((), answers[language])
+        results[language] = {
+            key: restored[number]
+            for number, key in enumerate(strings, 1)
+            if number in restored
+        }
+    return results
+
+
+def localize(
+    path, languages=None, source=DEFAULT_SOURCE, model=None, workers=None, dry_run=False
+):
+    """Bring the catalog's languages up to date, returns {language: counts}"""
+    catalog = open_catalog(path)
+    if languages is None:
+        languages = [code for code in LANGUAGE_CODES.values() if code != source]
+    manifest = load_manifest(path)
+    source_strings, hashes, plans = plan(catalog, languages, source, manifest)
+
+    jobs = {
+        language: {key: source_strings[key] for key in todo}
+        for language, (_, _, todo) in plans.items()
+        if todo
+    }
+    translated = {}
+    if jobs and not dry_run:
+        translated = translate_strings(jobs, source, model, workers)
+
+    report = {}
+    changed = False
+    for language, (current, recorded, todo) in plans.items():
+        new = translated.get(language, {})
+        strings = {}
+        for key, text in source_strings.items():
+            if key in new:
+                strings[key] = new[key]
+                recorded[key] = hashes[key]
+            elif key in current:
+                # Kept even if its source changed, retried on the next run
+                strings[key] = current[key]
+            elif not text:
+                strings[key] = text
+                recorded[key] = hashes[key]
+        removed = len(set(current) - set(source_strings))
+        report[language] = {
+            "translated": len(new),
+            "pending": len(todo) - len(new),
+            "removed": removed,
+        }
+        if dry_run:
+            continue
+        if list(strings.items()) != list(current.items()):
+            catalog.save(language, strings)
+        if manifest.get(language) != recorded:
+            manifest[language] = recorded
+            changed = True
+    if changed:
+        _write_text(
+            manifest_path(path),
+            json.dumps(manifest, ensure_ascii=False, indent=1, sort_keys=True) + "\n",
+        )
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.localize",
+        description="Translate missing and changed strings of a catalog",
+    )
+    parser.add_argument("catalog", help=".py (TRANSLATIONS), .json, .po or .pot")
+    parser.add_argument(
+        "--languages", help="comma-separated codes, default every UI language"
+    )
+    parser.add_argument("--source", default=DEFAULT_SOURCE, help="source language code")
+    parser.add_argument("--model", help="model, default from the settings")
+    parser.add_argument("--dry-run", action="store_true", help="only count the work")
+    args = parser.parse_args(argv)
+
+    languages = args.languages.split(",") if args.languages else None
+    start = time.perf_counter()
+    report = localize(
+        args.catalog, languages, args.source, args.model, dry_run=args.dry_run
+    )
+    elapsed = time.perf_counter() - start
+    for language, counts in report.items():
+        if args.dry_run:
+            print(
+                f"{language}: {counts['pending']} to translate, "
+                f"{counts['removed']} to remove"
+            )
+        else:
+            print(
+                f"{language}: {counts['translated']} translated, "
+                f"{counts['pending']} pending, {counts['removed']} removed"
+            )
+    print(f"Done in {elapsed:.2f} s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,21 +1,11 @@
 """
 Main application window module
 """
+import sys
+import zlib
 
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import (
-    QAction,
-    QBrush,
-    QColor,
-    QFont,
-    QIcon,
-    QLinearGradient,
-    QPainter,
-    QPainterPath,
-    QPalette,
-    QPen,
-    QPixmap,
-)
+from PyQt6.QtCore import QFileSystemWatcher, Qt, QTimer
+from PyQt6.QtGui import QAction, QFont
 from PyQt6.QtWidgets import (
     QApplication,
     QComboBox,
@@ -28,34 +18,97 @@ from PyQt6.QtWidgets import (
     QPushButton,
     QScrollArea,
     QSystemTrayIcon,
+    QTabWidget,
     QTextEdit,
+    QToolButton,
     QVBoxLayout,
     QWidget,
 )
 
-from .config import Config
-from .settings_dialog import SettingsDialog
-from .translate_thread import TranslateThread
+from .config import get_config
+from .icon import load_app_icon
+from .openai_client import build_prompt
+from .startup_trace import trace
 from .translations import get_translation
-from .utils import get_app_stylesheet
+from .utils import get_app_stylesheet, splice_plain_text, watch_first_paint
 
 
 class GPTTranslator(QMainWindow):
     def __init__(self):
         super().__init__()
-        self.config = Config()
+        self.config = get_config()
+        self._engine = None
+        self.current_request = None
+        self.loading_timer = QTimer(self)
+        self.idle_snapshot = None
+        self.shown_alternatives = []
+        self.idle_timer = QTimer(self)
+        self.idle_timer.setSingleShot(True)
+        self.idle_timer.timeout.connect(self.enter_idle_mode)
         self.load_config()
+        trace.mark("window: load_config")
         self.init_ui()
+        trace.mark("window: init_ui")
         self.apply_styles()
+        trace.mark("window: apply_styles")
         self.setup_tray_icon()
+        trace.mark("window: tray icon")
+        # Everything not needed for the first frame starts after it is painted
+        watch_first_paint(self, self.finish_startup)
+
+    def finish_startup(self):
+        """Deferred start-up work, runs once the window has been painted"""
+        self.setup_config_watcher()
+        self.config.subscribe(self.on_config_changed)
+        self.setup_job_queue()
+        trace.mark("window: deferred setup")
+
+    @property
+    def engine(self):
+        """Network engine, created on first translation"""
+        if self._engine is None:
+            from .network_engine import NetworkEngine
+
+            self._engine = NetworkEngine(self)
+        return self._engine
 
     def load_config(self):
-        """Load configuration"""
-        self.config.load()
+        """Load configuration from the cached settings service"""
         self.api_key = self.config.api_key
         self.model = self.config.model
         self.ui_language = self.config.ui_language
 
+    def setup_config_watcher(self):
+        """Watch the config file for changes made outside the app"""
+        self.config_watcher = QFileSystemWatcher(self)
+        self.config_watcher.fileChanged.connect(self.on_config_file_changed)
+        self.config_watcher.directoryChanged.connect(self.on_config_file_changed)
+        self.watch_config_file()
+
+    def watch_config_file(self):
+        """(Re)attach the watcher, atomic renames replace the watched file"""
+        config_path = str(self.config.config_file)
+        parent_path = str(self.config.config_file.parent)
+        if self.config.config_file.exists():
+            if self.config_watcher.directories():
+                self.config_watcher.removePaths(self.config_watcher.directories())
+            if config_path not in self.config_watcher.files():
+                self.config_watcher.addPath(config_path)
+        elif parent_path not in self.config_watcher.directories():
+            self.config_watcher.addPath(parent_path)
+
+    def on_config_file_changed(self, path):
+        """Handle config file change on disk"""
+        self.config.reload_if_changed()
+        self.watch_config_file()
+
+    def on_config_changed(self, changed_keys):
+        """Handle settings change notification"""
+        old_lang = self.ui_language
+        self.load_config()
+        if old_lang != self.ui_language:
+            self.update_ui_language()
+
     def t(self, key):
         """Get translation string"""
         return get_translation(self.ui_language, key)
@@ -221,6 +274,7 @@ class GPTTranslator(QMainWindow):
 
         # Translated text
         target_text_container = QVBoxLayout()
+        self.target_text_container = target_text_container
 
         self.translation_label = QLabel(self.t("translation"))
         self.translation_label.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
@@ -233,6 +287,10 @@ class GPTTranslator(QMainWindow):
         self.target_text.setMinimumHeight(200)
         target_text_container.addWidget(self.target_text, 1)
 
+        # Per-language result tabs of a fan-out are built on first use
+        self.fan_out_tabs = None
+        self.fan_out_editors = {}
+
         # Loading indicator
         self.loading_label = QLabel(self.t("translating") + "...")
         self.loading_label.setFont(QFont("Segoe UI", 11))
@@ -273,38 +331,105 @@ class GPTTranslator(QMainWindow):
 
         main_layout.addLayout(text_layout, 1)
 
-        # Alternative translations panel
-        alternatives_frame = QFrame()
-        alternatives_frame.setStyleSheet("""
-            QFrame {
-                background: #2a2a4a;
-                border: 2px solid #3a3a5c;
-                border-radius: 12px;
-                padding: 15px;
-            }
-        """)
-        alternatives_layout = QVBoxLayout()
-
-        self.alt_header = QLabel(self.t("alternatives"))
-        self.alt_header.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
-        alternatives_layout.addWidget(self.alt_header)
-
-        self.alternatives_container = QVBoxLayout()
-        alternatives_layout.addLayout(self.alternatives_container)
-
-        alternatives_frame.setLayout(alternatives_layout)
-        alternatives_frame.hide()
-        self.alternatives_frame = alternatives_frame
+        # Alternative translations panel is built on first use
+        self.main_layout = main_layout
+        self.alternatives_index = main_layout.count()
+        self.alternatives_frame = None
 
-        main_layout.addWidget(alternatives_frame)
+        # Translate and queue buttons
+        buttons_layout = QHBoxLayout()
+        buttons_layout.setSpacing(20)
 
-        # Translate button
         self.translate_btn = QPushButton(self.t("translate"))
         self.translate_btn.setFont(QFont("Segoe UI", 14, QFont.Weight.Bold))
         self.translate_btn.setFixedHeight(55)
         self.translate_btn.setCursor(Qt.CursorShape.PointingHandCursor)
         self.translate_btn.clicked.connect(self.translate)
-        main_layout.addWidget(self.translate_btn)
+        buttons_layout.addWidget(self.translate_btn, 1)
+
+        # Translate into several languages at once, the arrow picks them
+        self.fan_out_btn = QToolButton()
+        self.fan_out_btn.setFont(QFont("Segoe UI", 11))
+        self.fan_out_btn.setFixedHeight(55)
+        self.fan_out_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.fan_out_btn.setPopupMode(QToolButton.ToolButtonPopupMode.MenuButtonPopup)
+        self.fan_out_btn.setStyleSheet("""
+            QToolButton {
+                background: #3a3a5c;
+                color: white;
+                border: none;
+                padding: 10px 25px;
+                border-radius: 8px;
+            }
+            QToolButton:hover {
+                background: #4a4a6c;
+            }
+        """)
+        self.fan_out_menu = QMenu(self.fan_out_btn)
+        self.fan_out_actions = []
+        selected = self.config.fan_out_targets
+        for index in range(self.target_lang.count()):
+            language = self.target_lang.itemText(index)
+            action = QAction(language, self.fan_out_menu)
+            action.setCheckable(True)
+            action.setChecked(not selected or language in selected)
+            action.toggled.connect(self.on_fan_out_targets_changed)
+            self.fan_out_menu.addAction(action)
+            self.fan_out_actions.append(action)
+        self.fan_out_btn.setMenu(self.fan_out_menu)
+        self.fan_out_btn.clicked.connect(self.translate_fan_out)
+        self.update_fan_out_button()
+        buttons_layout.addWidget(self.fan_out_btn)
+
+        self.queue_btn = QPushButton(self.t("add_to_queue"))
+        self.queue_btn.setFont(QFont("Segoe UI", 11))
+        self.queue_btn.setFixedHeight(55)
+        self.queue_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.queue_btn.setStyleSheet("""
+            QPushButton {
+                background: #3a3a5c;
+                color: white;
+                border: none;
+                padding: 10px 25px;
+                border-radius: 8px;
+            }
+            QPushButton:hover {
+                background: #4a4a6c;
+            }
+        """)
+        self.queue_btn.clicked.connect(self.add_to_queue)
+        buttons_layout.addWidget(self.queue_btn)
+
+        # Live mode translates while typing
+        self.live_translator = None
+        self.live_btn = QPushButton(self.t("live"))
+        self.live_btn.setFont(QFont("Segoe UI", 11))
+        self.live_btn.setFixedHeight(55)
+        self.live_btn.setCheckable(True)
+        self.live_btn.setCursor(Qt.CursorShape.PointingHandCursor)
+        self.live_btn.setStyleSheet("""
+            QPushButton {
+                background: #3a3a5c;
+                color: white;
+                border: none;
+                padding: 10px 25px;
+                border-radius: 8px;
+            }
+            QPushButton:hover {
+                background: #4a4a6c;
+            }
+            QPushButton:checked {
+                background: #e94560;
+            }
+        """)
+        self.live_btn.setChecked(self.config.live_translation)
+        self.live_btn.toggled.connect(self.toggle_live_translation)
+        self.source_text.textChanged.connect(self.on_source_edited)
+        self.source_lang.currentTextChanged.connect(self.on_source_edited)
+        self.target_lang.currentTextChanged.connect(self.on_source_edited)
+        buttons_layout.addWidget(self.live_btn)
+
+        main_layout.addLayout(buttons_layout)
 
         # Status bar
         self.status_label = QLabel(self.t("ready"))
@@ -318,160 +443,7 @@ class GPTTranslator(QMainWindow):
         """Setup system tray icon"""
         self.tray_icon = QSystemTrayIcon(self)
 
-        # Create high-resolution icon
-        size = 256
-        pixmap = QPixmap(size, size)
-        pixmap.fill(Qt.GlobalColor.transparent)
-
-        painter = QPainter(pixmap)
-        painter.setRenderHint(QPainter.RenderHint.Antialiasing)
-        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
-        painter.setRenderHint(QPainter.RenderHint.TextAntialiasing)
-
-        # Gradient circular background with shadow
-        gradient = QLinearGradient(0, 0, size, size)
-        gradient.setColorAt(0, QColor("#e94560"))
-        gradient.setColorAt(0.5, QColor("#a83f5a"))
-        gradient.setColorAt(1, QColor("#0f3460"))
-
-        # Shadow
-        painter.setBrush(QBrush(QColor(0, 0, 0, 40)))
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawEllipse(12, 12, size - 20, size - 20)
-
-        # Main circle
-        painter.setBrush(QBrush(gradient))
-        painter.drawEllipse(8, 8, size - 16, size - 16)
-
-        # Inner light highlight
-        inner_gradient = QLinearGradient(size * 0.3, size * 0.2, size * 0.7, size * 0.5)
-        inner_gradient.setColorAt(0, QColor(255, 255, 255, 30))
-        inner_gradient.setColorAt(1, QColor(255, 255, 255, 0))
-        painter.setBrush(QBrush(inner_gradient))
-        painter.drawEllipse(
-            int(size * 0.15), int(size * 0.1), int(size * 0.6), int(size * 0.4)
-        )
-
-        # Letter "A" (left) with shadow
-        font = QFont("Arial", int(size * 0.32), QFont.Weight.Bold)
-        painter.setFont(font)
-
-        # Shadow for "A"
-        painter.setPen(QColor(0, 0, 0, 80))
-        painter.drawText(int(size * 0.18), int(size * 0.62), "A")
-
-        # Letter "A"
-        painter.setPen(QColor("white"))
-        painter.drawText(int(size * 0.17), int(size * 0.61), "A")
-
-        # Shadow for "Я"
-        painter.setPen(QColor(0, 0, 0, 80))
-        painter.drawText(int(size * 0.67), int(size * 0.62), "Я")
-
-        # Letter "Я" (right)
-        painter.setPen(QColor("white"))
-        painter.drawText(int(size * 0.66), int(size * 0.61), "Я")
-
-        # Translation arrows
-        pen = QPen(QColor("#4CC9F0"), int(size * 0.03))
-        pen.setCapStyle(Qt.PenCapStyle.RoundCap)
-        pen.setJoinStyle(Qt.PenJoinStyle.RoundJoin)
-        painter.setPen(pen)
-
-        # Arrow down-right
-        arrow_path1 = QPainterPath()
-        arrow_path1.moveTo(size * 0.52, size * 0.42)
-        arrow_path1.lineTo(size * 0.62, size * 0.48)
-        arrow_path1.lineTo(size * 0.52, size * 0.54)
-        painter.drawPath(arrow_path1)
-
-        # Arrow up-left
-        arrow_path2 = QPainterPath()
-        arrow_path2.moveTo(size * 0.48, size * 0.28)
-        arrow_path2.lineTo(size * 0.38, size * 0.22)
-        arrow_path2.lineTo(size * 0.48, size * 0.16)
-        painter.drawPath(arrow_path2)
-
-        # AI sparks
-        painter.setPen(Qt.PenStyle.NoPen)
-
-        spark_gradient = QLinearGradient(0, 0, size * 0.1, size * 0.1)
-        spark_gradient.setColorAt(0, QColor("#FFD60A"))
-        spark_gradient.setColorAt(1, QColor("#FFA500"))
-        painter.setBrush(QBrush(spark_gradient))
-
-        painter.drawEllipse(
-            int(size * 0.18), int(size * 0.18), int(size * 0.06), int(size * 0.06)
-        )
-        painter.drawEllipse(
-            int(size * 0.76), int(size * 0.18), int(size * 0.06), int(size * 0.06)
-        )
-        painter.drawEllipse(
-            int(size * 0.46), int(size * 0.10), int(size * 0.05), int(size * 0.05)
-        )
-
-        # AI neural network
-        painter.setBrush(QColor("#4CC9F0"))
-        painter.setOpacity(0.8)
-
-        node_size = int(size * 0.04)
-        node1_x, node1_y = int(size * 0.28), int(size * 0.80)
-        node2_x, node2_y = int(size * 0.48), int(size * 0.83)
-        node3_x, node3_y = int(size * 0.68), int(size * 0.80)
-
-        # Lines between nodes
-        pen = QPen(QColor("#4CC9F0"), int(size * 0.01))
-        painter.setPen(pen)
-        painter.setOpacity(0.5)
-        painter.drawLine(
-            node1_x + node_size // 2,
-            node1_y + node_size // 2,
-            node2_x + node_size // 2,
-            node2_y + node_size // 2,
-        )
-        painter.drawLine(
-            node2_x + node_size // 2,
-            node2_y + node_size // 2,
-            node3_x + node_size // 2,
-            node3_y + node_size // 2,
-        )
-
-        # Nodes
-        painter.setOpacity(0.9)
-        painter.setPen(Qt.PenStyle.NoPen)
-        painter.drawEllipse(node1_x, node1_y, node_size, node_size)
-        painter.drawEllipse(node2_x, node2_y, node_size, node_size)
-        painter.drawEllipse(node3_x, node3_y, node_size, node_size)
-
-        painter.end()
-
-        # Scale to required sizes
-        icon = QIcon(pixmap)
-        icon.addPixmap(
-            pixmap.scaled(
-                64,
-                64,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
-        )
-        icon.addPixmap(
-            pixmap.scaled(
-                32,
-                32,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
-        )
-        icon.addPixmap(
-            pixmap.scaled(
-                128,
-                128,
-                Qt.AspectRatioMode.KeepAspectRatio,
-                Qt.TransformationMode.SmoothTransformation,
-            )
-        )
-
+        icon = load_app_icon()
         self.tray_icon.setIcon(icon)
         self.setWindowIcon(icon)
 
@@ -493,6 +465,69 @@ class GPTTranslator(QMainWindow):
 
         self.tray_icon.show()
 
+    def setup_job_queue(self):
+        """Open the persistent job queue and start its worker"""
+        from .job_queue import JobQueue
+        from .queue_worker import QueueWorker
+
+        self.job_queue = JobQueue()
+        self.queue_worker = QueueWorker(self.job_queue)
+        self.queue_worker.job_finished.connect(self.on_job_finished)
+        self.queue_worker.job_failed.connect(self.on_job_failed)
+        self.queue_worker.queue_changed.connect(self.on_queue_changed)
+        self.queue_worker.start()
+
+    def add_to_queue(self):
+        """Add current text to the persistent translation queue"""
+        text = self.source_text.toPlainText().strip()
+        if not text:
+            QMessageBox.warning(self, self.t("error"), self.t("error_no_text"))
+            return
+
+        payload = {
+            "text": text,
+            "source": self.source_lang.currentText(),
+            "target": self.target_lang.currentText(),
+            "model": self.model,
+        }
+        from .job_queue import DONE
+
+        job_id = self.job_queue.submit(payload)
+        job = self.job_queue.get(job_id)
+        if job.state == DONE:
+            # Same job was already translated earlier
+            self.on_job_finished(job.id, job.result)
+            return
+
+        self.queue_worker.wake()
+        self.on_queue_changed(self.job_queue.counts())
+
+    def on_job_finished(self, job_id, translation):
+        """Handle queued job finished"""
+        job = self.job_queue.get(job_id)
+        if job and job.payload["text"] == self.source_text.toPlainText().strip():
+            self.target_text.setPlainText(translation)
+            self.status_label.setText(self.t("translation_ready"))
+        elif self.isHidden():
+            self.tray_icon.showMessage(
+                self.t("title"),
+                self.t("queue_job_done"),
+                QSystemTrayIcon.MessageIcon.Information,
+                2000,
+            )
+
+    def on_job_failed(self, job_id, error):
+        """Handle queued job failed permanently"""
+        self.status_label.setText(f"{self.t('queue_job_failed')}: {error}")
+
+    def on_queue_changed(self, counts):
+        """Update queue button with pending job count"""
+        pending = counts.get("queued", 0) + counts.get("running", 0)
+        if pending:
+            self.queue_btn.setText(f"{self.t('add_to_queue')} ({pending})")
+        else:
+            self.queue_btn.setText(self.t("add_to_queue"))
+
     def tray_icon_activated(self, reason):
         """Handle tray icon click"""
         if reason == QSystemTrayIcon.ActivationReason.DoubleClick:
@@ -500,19 +535,42 @@ class GPTTranslator(QMainWindow):
 
     def show_window(self):
         """Show window"""
+        self.idle_timer.stop()
+        self.leave_idle_mode()
         self.show()
         self.activateWindow()
         self.raise_()
 
+    def handle_instance_message(self, message):
+        """Handle a request handed over by another launch of the app"""
+        self.show_window()
+        if self.isMinimized():
+            self.showNormal()
+        action = message.get("action")
+        if action == "translate" and message.get("text"):
+            self.source_text.setPlainText(message["text"])
+            self.translate()
+        elif action == "settings":
+            # Not from inside the socket's signal handler, the dialog is modal
+            QTimer.singleShot(0, self.open_settings)
+
     def quit_application(self):
         """Quit application completely"""
         self.tray_icon.hide()
+        # Queued jobs are persisted and resume on the next start
+        self.queue_worker.stop()
+        self.queue_worker.wait(2000)
+        processing = sys.modules.get("app.processing")
+        if processing is not None:
+            processing.shutdown_process_pool()
         QApplication.quit()
 
     def closeEvent(self, event):
         """Handle window close event"""
         event.ignore()
         self.hide()
+        if self.config.idle_release_after > 0:
+            self.idle_timer.start(int(self.config.idle_release_after * 1000))
         if not hasattr(self, "_tray_notification_shown"):
             if self.ui_language == "ru":
                 self.tray_icon.showMessage(
@@ -534,17 +592,17 @@ class GPTTranslator(QMainWindow):
 
     def open_settings(self):
         """Open settings window"""
+        from .settings_dialog import SettingsDialog
+
         dialog = SettingsDialog(self)
-        if dialog.exec():
-            old_lang = self.ui_language
-            self.load_config()
-            if old_lang != self.ui_language:
-                self.update_ui_language()
-        else:
-            old_lang = self.ui_language
-            self.load_config()
-            if old_lang != self.ui_language:
-                self.update_ui_language()
+        dialog.exec()
+
+        # Saved values arrive through on_config_changed, this only reverts
+        # the language preview when the dialog was cancelled
+        old_lang = self.ui_language
+        self.load_config()
+        if old_lang != self.ui_language:
+            self.update_ui_language()
 
     def update_ui_language(self):
         """Update interface language"""
@@ -560,8 +618,12 @@ class GPTTranslator(QMainWindow):
         self.target_text.setPlaceholderText(self.t("translation_placeholder"))
         self.copy_btn.setText(self.t("copy"))
         self.translate_btn.setText(self.t("translate"))
+        self.live_btn.setText(self.t("live"))
+        self.update_fan_out_button()
+        self.on_queue_changed(self.job_queue.counts())
         self.status_label.setText(self.t("ready"))
-        self.alt_header.setText(self.t("alternatives"))
+        if self.alternatives_frame is not None:
+            self.alt_header.setText(self.t("alternatives"))
 
         self.show_action.setText(self.t("show"))
         self.quit_action.setText(self.t("quit"))
@@ -583,62 +645,247 @@ class GPTTranslator(QMainWindow):
                 self.source_text.setPlainText(target_content)
                 self.target_text.setPlainText(source_content)
 
-                self.alternatives_frame.hide()
-                self.clear_alternatives()
+                self.hide_alternatives()
 
                 self.status_label.setText(self.t("swapped"))
 
     def copy_translation(self):
         """Copy translation"""
-        text = self.target_text.toPlainText()
+        text = self.current_target_editor().toPlainText()
         if text:
             QApplication.clipboard().setText(text)
             self.status_label.setText(self.t("copied"))
             QTimer.singleShot(2000, lambda: self.status_label.setText(self.t("ready")))
 
-    def translate(self):
-        """Translate text"""
-        if not self.api_key:
+    def current_target_editor(self):
+        """Result editor shown: the current fan-out tab or the single result"""
+        if self.fan_out_tabs is not None and self.fan_out_tabs.isVisible():
+            return self.fan_out_tabs.currentWidget() or self.target_text
+        return self.target_text
+
+    def source_for_translation(self):
+        """Source text, or None after telling the user what is missing"""
+        if not self.config.key_entries():
             QMessageBox.warning(self, self.t("error"), self.t("error_no_key"))
-            return
+            return None
 
         text = self.source_text.toPlainText().strip()
         if not text:
             QMessageBox.warning(self, self.t("error"), self.t("error_no_text"))
-            return
-
-        source = self.source_lang.currentText()
-        target = self.target_lang.currentText()
+            return None
+        return text
 
-        if source == "Auto":
-            prompt = f"Translate the following text into the language '{target}'. Return only the translation without additional comments:\n\n{text}"
-        else:
-            prompt = f"Translate the following text from the language '{source}' to the language '{target}'. Return only the translation without additional comments:\n\n{text}"
+    def start_loading(self):
+        """Abort the running translation and show the loading indicator"""
+        # A new translation supersedes the one still streaming
+        if self.current_request is not None:
+            self.current_request.abort()
+            self.current_request = None
+            self.loading_timer.stop()
+            self.loading_label.hide()
 
-        self.alternatives_frame.hide()
-        self.clear_alternatives()
+        self.hide_alternatives()
 
         self.loading_label.show()
         self.status_label.setText(self.t("translating") + "...")
-        self.target_text.clear()
-        self.target_text.setPlaceholderText(self.t("translating") + "...")
 
         self.dot_count = 0
         self.loading_timer = QTimer()
         self.loading_timer.timeout.connect(self.update_loading_animation)
         self.loading_timer.start(500)
 
-        self.thread = TranslateThread(
-            self.api_key, self.model, prompt, get_alternatives=True
+    def stop_loading(self):
+        self.loading_timer.stop()
+        self.loading_label.hide()
+
+    def route_text(self, text):
+        """Pick how a text is translated, see NetworkEngine.pipeline()"""
+        from .markup import detect_markup
+        from .network_engine import DEDUPLICATED, DOCUMENT, MARKUP, SUBTITLES, TEXT
+        from .subtitles import detect_format
+
+        if detect_format(text):
+            # Only cue text is translated, numbers and timings stay intact
+            return SUBTITLES
+        if detect_markup(text):
+            # Only text segments are translated, markup is kept byte-for-byte
+            return MARKUP
+        if self.is_repetitive(text):
+            return DEDUPLICATED
+        if len(text) > self.config.large_document_chars:
+            return DOCUMENT
+        return TEXT
+
+    def translate(self):
+        """Translate text"""
+        text = self.source_for_translation()
+        if text is None:
+            return
+
+        source = self.source_lang.currentText()
+        target = self.target_lang.currentText()
+
+        profiler = self.start_profiling("translate")
+        self.start_loading()
+        self.show_single_result()
+
+        from .network_engine import DOCUMENT, TEXT
+        from .scheduler import INTERACTIVE
+        from .translation_memory import recall, remember
+
+        # Exact matches from the translation memory need no request
+        remembered = recall(text, source, target)
+        if remembered is not None:
+            self.stop_loading()
+            if profiler is not None:
+                profiler.stop()
+            self.target_text.setPlainText(remembered)
+            self.status_label.setText(self.t("memory_hit"))
+            return
+
+        self.target_text.clear()
+        self.target_text.setPlaceholderText(self.t("translating") + "...")
+
+        route = self.route_text(text)
+        if route == TEXT:
+            prompt = build_prompt(text, source, target)
+            request = self.engine.translate(
+                self.model, prompt, get_alternatives=True, priority=INTERACTIVE
+            )
+            request.finished.connect(
+                lambda translation: remember(text, translation.strip(), source, target)
+            )
+        else:
+            # The user is waiting, whatever the format
+            request = self.engine.translate_routed(
+                self.model, text, source, target, route, priority=INTERACTIVE
+            )
+        request.chunk_received.connect(self.on_chunk_received)
+        request.finished.connect(self.on_translation_finished)
+        request.alternatives_ready.connect(self.on_alternatives_ready)
+        request.error.connect(self.on_translation_error)
+        if route not in (TEXT, DOCUMENT):
+            request.finished.connect(lambda _: self.show_token_savings(request))
+        self.stop_profiling_on(profiler, request.finished, request.error)
+        self.current_request = request
+
+    def translate_fan_out(self):
+        """Translate the source into every selected target language at once"""
+        text = self.source_for_translation()
+        if text is None:
+            return
+
+        source = self.source_lang.currentText()
+        targets = self.fan_out_targets()
+        profiler = self.start_profiling("fan-out")
+        self.start_loading()
+        self.show_fan_out_tabs(targets)
+
+        from .translation_memory import recall
+
+        pending = []
+        for target in targets:
+            remembered = recall(text, source, target)
+            if remembered is not None:
+                self.on_fan_out_finished_target(target, remembered)
+            else:
+                pending.append(target)
+
+        from .scheduler import INTERACTIVE
+
+        request = self.engine.translate_fan_out(
+            self.model,
+            text,
+            source,
+            pending,
+            self.route_text(text),
+            priority=INTERACTIVE,
+        )
+        request.chunk_received.connect(self.on_fan_out_chunk)
+        request.target_finished.connect(self.on_fan_out_finished_target)
+        request.target_failed.connect(self.on_fan_out_failed_target)
+        request.finished.connect(
+            lambda wall, sequential: self.on_fan_out_finished(
+                request, len(targets), wall, sequential
+            )
+        )
+        self.stop_profiling_on(profiler, request.finished)
+        self.current_request = request
+
+    def start_profiling(self, label):
+        """Start profiling a translation, returns the profiler if enabled"""
+        # Only loaded when diagnostics were switched on at start-up
+        diagnostics = sys.modules.get("app.diagnostics")
+        profiler = diagnostics.get_profiler() if diagnostics is not None else None
+        if profiler is not None:
+            profiler.start(label)
+        return profiler
+
+    def stop_profiling_on(self, profiler, *signals):
+        """Write the profile once any of the signals fires"""
+        if profiler is None:
+            return
+        for signal in signals:
+            signal.connect(lambda *_: profiler.stop())
+
+    def is_repetitive(self, text):
+        """Check whether deduplicating plain text is worth it"""
+        from .markup import duplicate_ratio
+
+        ratio, count = duplicate_ratio(text)
+        return (
+            count >= self.config.dedup_min_segments
+            and ratio >= self.config.dedup_min_ratio
         )
-        self.thread.chunk_received.connect(self.on_chunk_received)
-        self.thread.finished.connect(self.on_translation_finished)
-        self.thread.alternatives_ready.connect(self.on_alternatives_ready)
-        self.thread.error.connect(self.on_translation_error)
-        self.thread.start()
+
+    def show_token_savings(self, request):
+        """Show deduplication and prompt token savings of a segmented translation"""
+        savings = request.prepared.token_savings() if request.prepared else None
+        if not savings:
+            return
+        if savings["unique_segments"] < savings["segments"]:
+            key = "dedup_report"
+        else:
+            key = "tokens_saved"
+        self.status_label.setText(self.t(key).format(**savings))
+
+    def setup_alternatives_panel(self):
+        """Create alternative translations panel"""
+        alternatives_frame = QFrame()
+        alternatives_frame.setStyleSheet("""
+            QFrame {
+                background: #2a2a4a;
+                border: 2px solid #3a3a5c;
+                border-radius: 12px;
+                padding: 15px;
+            }
+        """)
+        alternatives_layout = QVBoxLayout()
+
+        self.alt_header = QLabel(self.t("alternatives"))
+        self.alt_header.setFont(QFont("Segoe UI", 11, QFont.Weight.Bold))
+        alternatives_layout.addWidget(self.alt_header)
+
+        self.alternatives_container = QVBoxLayout()
+        alternatives_layout.addLayout(self.alternatives_container)
+
+        alternatives_frame.setLayout(alternatives_layout)
+        alternatives_frame.hide()
+        self.alternatives_frame = alternatives_frame
+
+        self.main_layout.insertWidget(self.alternatives_index, alternatives_frame)
+
+    def hide_alternatives(self):
+        """Hide and clear alternative translations"""
+        self.shown_alternatives = []
+        if self.alternatives_frame is not None:
+            self.alternatives_frame.hide()
+            self.clear_alternatives()
 
     def clear_alternatives(self):
         """Clear alternative translations"""
+        if self.alternatives_frame is None:
+            return
         while self.alternatives_container.count():
             child = self.alternatives_container.takeAt(0)
             if child.widget():
@@ -646,7 +893,10 @@ class GPTTranslator(QMainWindow):
 
     def on_alternatives_ready(self, alternatives):
         """Handle alternative translations received"""
+        if self.alternatives_frame is None:
+            self.setup_alternatives_panel()
         self.clear_alternatives()
+        self.shown_alternatives = list(alternatives)
 
         for i, alt in enumerate(alternatives, 1):
             alt_widget = QPushButton(f"{i}. {alt}")
@@ -706,3 +956,242 @@ class GPTTranslator(QMainWindow):
         self.target_text.setPlaceholderText(self.t("translation_placeholder"))
         QMessageBox.critical(self, self.t("error"), error)
         self.status_label.setText(self.t("error"))
+
+    def fan_out_targets(self):
+        """Target languages checked in the fan-out menu"""
+        return [action.text() for action in self.fan_out_actions if action.isChecked()]
+
+    def on_fan_out_targets_changed(self):
+        targets = self.fan_out_targets()
+        everything = len(targets) == len(self.fan_out_actions)
+        self.config.save(fan_out_targets=[] if everything else targets)
+        self.update_fan_out_button()
+
+    def update_fan_out_button(self):
+        count = len(self.fan_out_targets())
+        self.fan_out_btn.setText(self.t("translate_to_selected").format(count=count))
+        self.fan_out_btn.setEnabled(count > 0)
+
+    def show_single_result(self):
+        """Show the single result editor instead of fan-out tabs"""
+        if self.fan_out_tabs is not None:
+            self.fan_out_tabs.hide()
+        self.target_text.show()
+
+    def show_fan_out_tabs(self, targets):
+        """Replace the result editor with one empty tab per target language"""
+        if self.fan_out_tabs is None:
+            self.fan_out_tabs = QTabWidget()
+            self.fan_out_tabs.setMinimumHeight(200)
+            index = self.target_text_container.indexOf(self.target_text)
+            self.target_text_container.insertWidget(index + 1, self.fan_out_tabs, 1)
+        self.fan_out_tabs.clear()
+        self.fan_out_editors = {}
+        for target in targets:
+            editor = QTextEdit()
+            editor.setFont(QFont("Segoe UI", 12))
+            editor.setReadOnly(True)
+            editor.setPlaceholderText(self.t("translating") + "...")
+            self.fan_out_tabs.addTab(editor, f"{target} …")
+            self.fan_out_editors[target] = editor
+        self.target_text.hide()
+        self.fan_out_tabs.show()
+
+    def on_fan_out_chunk(self, target, chunk):
+        editor = self.fan_out_editors.get(target)
+        if editor is not None:
+            editor.setPlainText(chunk)
+
+    def on_fan_out_finished_target(self, target, translation):
+        translation = translation.strip()
+        if not self.set_fan_out_result(target, translation):
+            return
+
+        from .translation_memory import remember
+
+        remember(
+            self.source_text.toPlainText().strip(),
+            translation,
+            self.source_lang.currentText(),
+            target,
+        )
+
+    def set_fan_out_result(self, target, translation):
+        """Show a finished translation in its tab, False if there is none"""
+        editor = self.fan_out_editors.get(target)
+        if editor is None:
+            return False
+        editor.setPlainText(translation)
+        editor.setPlaceholderText(self.t("translation_placeholder"))
+        self.fan_out_tabs.setTabText(self.fan_out_tabs.indexOf(editor), target)
+        return True
+
+    def on_fan_out_failed_target(self, target, error):
+        editor = self.fan_out_editors.get(target)
+        if editor is None:
+            return
+        editor.setPlaceholderText(f"{self.t('error')}: {error}")
+        self.fan_out_tabs.setTabText(self.fan_out_tabs.indexOf(editor), f"{target} ⚠")
+
+    def on_fan_out_finished(self, request, count, wall, sequential):
+        """Report the fan-out's wall-clock time against running it per language"""
+        if request is not self.current_request:
+            return
+        self.stop_loading()
+        self.status_label.setText(
+            self.t("fan_out_report").format(
+                count=count, wall=f"{wall:.1f}", sequential=f"{sequential:.1f}"
+            )
+        )
+        print(
+            f"Fan-out to {count} languages: {wall:.2f} s wall-clock, "
+            f"~{sequential:.2f} s one after another"
+        )
+
+    def toggle_live_translation(self, enabled):
+        """Turn translation while typing on or off"""
+        self.config.save(live_translation=enabled)
+        if enabled:
+            self.on_source_edited()
+        elif self.live_translator is not None:
+            self.live_translator.stop()
+            self.stop_loading()
+
+    def on_source_edited(self):
+        """Queue a live update of the translation"""
+        if not self.live_btn.isChecked() or not self.config.key_entries():
+            return
+        if self.live_translator is None:
+            from .live_translation import LiveTranslator
+
+            self.live_translator = LiveTranslator(self.engine, self)
+            self.live_translator.output_changed.connect(self.on_live_output)
+            self.live_translator.segments_sent.connect(self.on_live_segments_sent)
+            self.live_translator.error.connect(
+                lambda error: self.status_label.setText(f"{self.t('error')}: {error}")
+            )
+        self.live_translator.schedule(
+            self.source_text.toPlainText(),
+            self.model,
+            self.source_lang.currentText(),
+            self.target_lang.currentText(),
+        )
+
+    def on_live_output(self, text):
+        """Splice live output into the result without resetting the view"""
+        self.show_single_result()
+        splice_plain_text(self.target_text, text)
+        if self.live_translator is not None and not self.live_translator.requests:
+            self.stop_loading()
+
+    def on_live_segments_sent(self, total, sent):
+        if sent:
+            # Live updates replace a manual translation still streaming
+            if self.current_request is not None:
+                self.current_request.abort()
+                self.current_request = None
+            self.start_loading()
+        self.status_label.setText(self.t("live_report").format(sent=sent, total=total))
+
+    def is_busy(self):
+        """Whether a translation is still running in the window"""
+        request = self.current_request
+        if request is not None and not self.loading_label.isHidden():
+            return True
+        if self.live_translator is not None and self.live_translator.requests:
+            return True
+        # The queue worker's HTTP session must not be closed mid-request
+        job_queue = getattr(self, "job_queue", None)
+        return job_queue is not None and job_queue.counts().get("running", 0) > 0
+
+    def enter_idle_mode(self):
+        """Release memory while hidden in the tray, see leave_idle_mode()"""
+        if self.isVisible() or self.idle_snapshot is not None:
+            return
+        if self.is_busy():
+            self.idle_timer.start(int(self.config.idle_release_after * 1000))
+            return
+
+        from .footprint import current_rss, format_mb, release_memory
+
+        before = current_rss()
+
+        # Texts are kept compressed, everything else is rebuilt on demand
+        self.idle_snapshot = {
+            "source": zlib.compress(self.source_text.toPlainText().encode("utf-8")),
+            "target": zlib.compress(self.target_text.toPlainText().encode("utf-8")),
+            "fan_out": {
+                target: zlib.compress(editor.toPlainText().encode("utf-8"))
+                for target, editor in self.fan_out_editors.items()
+            }
+            if self.fan_out_tabs is not None and not self.fan_out_tabs.isHidden()
+            else None,
+            "alternatives": self.shown_alternatives,
+            "status": self.status_label.text(),
+        }
+        for editor in (self.source_text, self.target_text):
+            editor.blockSignals(True)
+            editor.clear()
+            editor.document().clearUndoRedoStacks()
+            editor.blockSignals(False)
+
+        if self.alternatives_frame is not None:
+            self.main_layout.removeWidget(self.alternatives_frame)
+            self.alternatives_frame.deleteLater()
+            self.alternatives_frame = None
+        if self.fan_out_tabs is not None:
+            self.target_text_container.removeWidget(self.fan_out_tabs)
+            self.fan_out_tabs.deleteLater()
+            self.fan_out_tabs = None
+            self.fan_out_editors = {}
+
+        # Finished requests hold their response buffers
+        self.current_request = None
+        if self.live_translator is not None:
+            self.live_translator.stop()
+            self.live_translator.deleteLater()
+            self.live_translator = None
+        if self._engine is not None:
+            self._engine.manager.clearConnectionCache()
+            self._engine.manager.clearAccessCache()
+
+        from .openai_client import close_sessions
+
+        close_sessions()
+        processing = sys.modules.get("app.processing")
+        if processing is not None:
+            processing.shutdown_process_pool()
+        result_store = sys.modules.get("app.result_store")
+        if result_store is not None:
+            result_store.maintain()
+
+        # deleteLater() runs on the next event loop pass, trim after it
+        def trim():
+            release_memory()
+            print(f"Idle mode: RSS {format_mb(before)} -> {format_mb(current_rss())}")
+
+        QTimer.singleShot(0, trim)
+
+    def leave_idle_mode(self):
+        """Restore the window state saved by enter_idle_mode()"""
+        snapshot = self.idle_snapshot
+        if snapshot is None:
+            return
+        self.idle_snapshot = None
+
+        def text(data):
+            return zlib.decompress(data).decode("utf-8")
+
+        # Restoring is not an edit, live mode must not re-translate
+        self.source_text.blockSignals(True)
+        self.source_text.setPlainText(text(snapshot["source"]))
+        self.source_text.blockSignals(False)
+        if snapshot["fan_out"] is not None:
+            self.show_fan_out_tabs(list(snapshot["fan_out"]))
+            for target, data in snapshot["fan_out"].items():
+                self.set_fan_out_result(target, text(data))
+        else:
+            self.target_text.setPlainText(text(snapshot["target"]))
+        if snapshot["alternatives"]:
+            self.on_alternatives_ready(snapshot["alternatives"])
+        self.status_label.setText(snapshot["status"])
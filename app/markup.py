@@ -0,0 +1,491 @@
+"""
+Structure-aware Markdown and HTML translation
+
+The document is split into raw spans (markup, code, front matter, URLs,
+whitespace) and text segments. Inline markup inside a segment is replaced
+by ⟦n⟧ placeholders, and only the masked segments are sent, as numbered
+lines in batches. Everything outside the segments is reassembled
+byte-for-byte.
+"""
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import get_config
+from .openai_client import (
+    LINE_BREAK,
+    build_batch_prompt as build_numbered_prompt,
+    build_prompt,
+    build_translation_payload,
+    complete_chat,
+    estimate_tokens,
+    parse_numbered_lines,
+)
+from .processing import (
+    MASK_RE,
+    PLACEHOLDER_FORMAT,
+    deduplicate,
+    log_savings,
+    mask,
+    savings_report,
+    unmask,
+)
+from .scheduler import BACKGROUND
+from .segmenter import sentence_breaks
+
+MARKDOWN = "markdown"
+HTML = "html"
+PLAIN = "plain"
+
+_PLACEHOLDER_RE = re.compile(r"⟦\d+⟧")
+_LETTER_RE = re.compile(r"[^\W\d_]")
+
+# Elements whose content is never translated
+_HTML_RAW_ELEMENTS = "script|style|pre|textarea|svg|math|template"
+_HTML_TOKEN_RE = re.compile(
+    r"<!--.*?-->|<!\[CDATA\[.*?\]\]>|<![^>]*>|<\?.*?\?>"
+    rf"|<({_HTML_RAW_ELEMENTS})\b[^>]*>.*?</\1\s*>"
+    r"|</?([a-zA-Z][\w:-]*)[^>]*>",
+    re.IGNORECASE | re.DOTALL,
+)
+# Tags that stay inside a translated segment (as placeholders)
+_HTML_INLINE_TAGS = {
+    "a", "abbr", "b", "bdi", "bdo", "br", "cite", "code", "data", "dfn", "em",
+    "font", "i", "img", "kbd", "mark", "q", "s", "samp", "small", "span",
+    "strong", "sub", "sup", "time", "u", "var", "wbr",
+}
+_HTML_MASK_RE = re.compile(
+    r"(?i:<code\b[^>]*>.*?</code\s*>|</?[a-z][\w:-]*[^>]*>)"
+    r"|&(?:#\d+|#x[0-9a-fA-F]+|\w+);|" + MASK_RE.pattern,
+    re.DOTALL,
+)
+
+_MD_FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+_MD_LINK_DEFINITION_RE = re.compile(r"^ {0,3}\[[^\]]+\]:\s*\S")
+_MD_RULE_RE = re.compile(r"^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$")
+_MD_TABLE_SEPARATOR_RE = re.compile(r"^[ \t]*\|?[ \t]*:?-+:?[ \t]*(\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$")
+_MD_HEADING_RE = re.compile(r"^( {0,3}#{1,6}[ \t]+)(.*?)([ \t]+#+)?[ \t]*$")
+_MD_PREFIX_RE = re.compile(
+    r"^([ \t]*(?:>[ \t]?)*[ \t]*(?:(?:[-*+]|\d{1,9}[.)])[ \t]+(?:\[[ xX]\][ \t]+)?)?)"
+)
+_MD_MASK_RE = re.compile(
+    r"!?\]\([^)\n]*\)"  # link and image destinations
+    r"|\]\[[^\]\n]*\]"  # reference links
+    r"|<https?://[^>\s]+>"  # autolinks
+    r"|</?[a-zA-Z][\w:-]*[^>\n]*>"  # inline HTML
+    r"|\{#[\w-]+\}"  # heading IDs
+    r"|" + MASK_RE.pattern,
+    re.DOTALL,
+)
+
+
+class Segment:
+    """Translatable text with its inline markup masked"""
+
+    __slots__ = ("number", "text", "masks", "original")
+
+    def __init__(self, number, text, masks, original):
+        self.number = number
+        self.text = text
+        self.masks = masks
+        self.original = original
+
+
+def detect_markup(text):
+    """Return HTML, MARKDOWN or None by looking at the start of the text"""
+    head = text[:4000]
+    if re.search(
+        r"<(?:!doctype|html|body|div|p|h[1-6]|ul|ol|li|table|section|article)\b",
+        head,
+        re.IGNORECASE,
+    ) and len(re.findall(r"</[a-zA-Z]", head)) >= 2:
+        return HTML
+    features = [
+        r"^ {0,3}#{1,6} \S",
+        r"^ {0,3}(?:```|~~~)",
+        r"^ {0,3}(?:[-*+]|\d+\.) \S",
+        r"^ {0,3}> ",
+        r"\[[^\]\n]+\]\([^)\s]+\)",
+        r"\*\*[^*\n]+\*\*|__[^_\n]+__",
+        r"^\|.*\|[ \t]*$",
+        r"`[^`\n]+`",
+    ]
+    found = sum(1 for f in features if re.search(f, head, re.MULTILINE))
+    return MARKDOWN if found >= 2 else None
+
+
+class MarkupDocument:
+    """Document as a list of raw strings and Segments"""
+
+    def __init__(self, markup_format, source, parts):
+        self.format = markup_format
+        self.source = source
+        self.parts = parts
+        self.segments = [part for part in parts if isinstance(part, Segment)]
+        # Repeated segments are sent once, keyed by their masked text
+        self.unique_segments, positions = deduplicate(
+            self.segments, lambda segment: segment.text
+        )
+        self.representatives = {
+            segment.number: self.unique_segments[position].number
+            for segment, position in zip(self.segments, positions)
+        }
+        self.prompt_tokens = 0
+        self.wholesale_tokens = 0
+
+    def build_payloads(self, model, source, target, stream=True, segments=None):
+        """Build a chat completions payload per batch of unique segments"""
+        payloads = []
+        prompt_tokens = 0
+        if segments is not None:
+            # Retry: one request per representative of the given segments
+            numbers = {self.representatives[segment.number] for segment in segments}
+            segments = [s for s in self.unique_segments if s.number in numbers]
+        for batch in self.make_batches(segments):
+            prompt = build_batch_prompt(batch, source, target)
+            prompt_tokens += estimate_tokens(prompt)
+            payloads.append(build_translation_payload(model, prompt, stream=stream))
+        if segments is None:
+            self.prompt_tokens = prompt_tokens
+            self.wholesale_tokens = estimate_tokens(
+                build_prompt(self.source, source, target)
+            )
+        return payloads
+
+    def make_batches(self, segments=None, max_chars=None):
+        """Group segments into batches of at most max_chars"""
+        max_chars = max_chars or get_config().document_chunk_chars
+        batches = []
+        current = []
+        size = 0
+        for segment in self.unique_segments if segments is None else segments:
+            if current and size + len(segment.text) > max_chars:
+                batches.append(current)
+                current = []
+                size = 0
+            current.append(segment)
+            size += len(segment.text)
+        if current:
+            batches.append(current)
+        return batches
+
+    def answers(self, translations):
+        """Map unique segment numbers to their answers, still masked
+
+        Answers that lost or invented placeholders are dropped, so broken
+        markup is never put back into the document.
+        """
+        answers = {}
+        for text in translations:
+            if text:
+                answers.update(parse_numbered_lines(text))
+        valid = {}
+        for segment in self.unique_segments:
+            answer = answers.get(segment.number)
+            if answer is None:
+                continue
+            if sorted(_PLACEHOLDER_RE.findall(answer)) == sorted(
+                _PLACEHOLDER_RE.findall(segment.text)
+            ):
+                valid[segment.number] = answer
+        return valid
+
+    def translated_segments(self, translations, answers=None):
+        """Map segment numbers to restored translations
+
+        answers from answers() (or a cache of them) are used as they are.
+        """
+        if answers is None:
+            answers = self.answers(translations)
+        restored = {}
+        for segment in self.segments:
+            answer = answers.get(self.representatives[segment.number])
+            if answer is not None:
+                restored[segment.number] = unmask(answer, segment.masks)
+        return restored
+
+    def assemble(self, translations, answers=None):
+        """Rebuild the document, untranslated segments keep their text"""
+        restored = self.translated_segments(translations, answers)
+        return "".join(
+            restored.get(part.number, part.original)
+            if isinstance(part, Segment)
+            else part
+            for part in self.parts
+        )
+
+    def missing_segments(self, translations, answers=None):
+        restored = self.translated_segments(translations, answers)
+        return [s for s in self.segments if s.number not in restored]
+
+    def token_savings(self):
+        """Deduplication and prompt token estimate vs. sending it wholesale"""
+        if not self.wholesale_tokens:
+            return None
+        return savings_report(
+            self.segments,
+            self.unique_segments,
+            self.prompt_tokens,
+            self.wholesale_tokens,
+        )
+
+
+class _Builder:
+    """Collects raw strings and segments in document order"""
+
+    def __init__(self, mask_pattern):
+        self.mask_pattern = mask_pattern
+        self.parts = []
+        self.count = 0
+
+    def raw(self, text):
+        if text:
+            self.parts.append(text)
+
+    def text(self, text):
+        """Add a run of text, translatable if it has letters outside markup"""
+        stripped = text.strip()
+        if not stripped:
+            self.raw(text)
+            return
+        start = text.index(stripped[0])
+        end = start + len(stripped)
+        masked, masks = mask(stripped, self.mask_pattern)
+        if not _LETTER_RE.search(_PLACEHOLDER_RE.sub("", masked)):
+            self.raw(text)
+            return
+        self.raw(text[:start])
+        self.count += 1
+        self.parts.append(Segment(self.count, masked, masks, stripped))
+        self.raw(text[end:])
+
+
+def parse_html(text):
+    """Split HTML into raw markup and text segments between block tags"""
+    builder = _Builder(_HTML_MASK_RE)
+    flow_start = 0
+    for match in _HTML_TOKEN_RE.finditer(text):
+        tag = match.group(2)
+        if tag and tag.lower() in _HTML_INLINE_TAGS:
+            continue
+        builder.text(text[flow_start:match.start()])
+        builder.raw(match.group())
+        flow_start = match.end()
+    builder.text(text[flow_start:])
+    return builder.parts
+
+
+def _parse_markdown_table_row(builder, line):
+    for index, cell in enumerate(re.split(r"(?<!\\)\|", line)):
+        if index:
+            builder.raw("|")
+        builder.text(cell)
+
+
+def parse_markdown(text):
+    """Split Markdown into raw structure and text segments"""
+    builder = _Builder(_MD_MASK_RE)
+    lines = text.splitlines(keepends=True)
+    paragraph = []
+
+    def flush_paragraph():
+        if paragraph:
+            block = "".join(paragraph)
+            body = block.rstrip("\n")
+            builder.text(body)
+            builder.raw(block[len(body):])
+            paragraph.clear()
+
+    index = 0
+    # YAML front matter
+    if lines and lines[0].rstrip() == "---":
+        for end in range(1, len(lines)):
+            if lines[end].rstrip() in ("---", "..."):
+                builder.raw("".join(lines[:end + 1]))
+                index = end + 1
+                break
+
+    previous_blank = True
+    while index < len(lines):
+        line = lines[index]
+        content = line.rstrip("\r\n")
+        newline = line[len(content):]
+
+        fence = _MD_FENCE_RE.match(content)
+        if fence:
+            flush_paragraph()
+            marker = fence.group(1)
+            end = index + 1
+            while end < len(lines) and not lines[end].lstrip().startswith(marker):
+                end += 1
+            builder.raw("".join(lines[index:end + 1]))
+            index = end + 1
+            previous_blank = False
+            continue
+
+        if not content.strip():
+            flush_paragraph()
+            builder.raw(line)
+            previous_blank = True
+            index += 1
+            continue
+
+        if (
+            (previous_blank and not paragraph and re.match(r"^(?: {4}|\t)", content))
+            or _MD_LINK_DEFINITION_RE.match(content)
+            or _MD_RULE_RE.match(content)
+            or (_MD_TABLE_SEPARATOR_RE.match(content) and "-" in content)
+        ):
+            # Indented code, link definitions, rules, table separators
+            flush_paragraph()
+            builder.raw(line)
+        elif content.lstrip().startswith("|"):
+            flush_paragraph()
+            _parse_markdown_table_row(builder, content)
+            builder.raw(newline)
+        elif _MD_HEADING_RE.match(content):
+            flush_paragraph()
+            heading = _MD_HEADING_RE.match(content)
+            builder.raw(heading.group(1))
+            builder.text(heading.group(2))
+            builder.raw(content[heading.end(2):] + newline)
+        else:
+            prefix = _MD_PREFIX_RE.match(content).group(1)
+            if prefix.strip():
+                # List items and quotes
+                flush_paragraph()
+                builder.raw(prefix)
+                builder.text(content[len(prefix):])
+                builder.raw(newline)
+            else:
+                paragraph.append(line)
+        previous_blank = False
+        index += 1
+    flush_paragraph()
+    return builder.parts
+
+
+def split_plain(text):
+    """Yield (raw, segment) pieces of plain text: lines, tab cells, sentences"""
+    for line in text.splitlines(keepends=True):
+        content = line.rstrip("\r\n")
+        for index, cell in enumerate(content.split("\t")):
+            if index:
+                yield "\t", None
+            # Sentences, the whitespace between them is kept raw
+            position = 0
+            for end, next_start in sentence_breaks(cell):
+                yield None, cell[position:end]
+                if next_start > end:
+                    yield cell[end:next_start], None
+                position = next_start
+            yield None, cell[position:]
+        yield line[len(content):], None
+
+
+def parse_plain(text):
+    """Split plain text or pasted spreadsheet cells into sentence segments"""
+    builder = _Builder(MASK_RE)
+    for raw, segment in split_plain(text):
+        if raw is not None:
+            builder.raw(raw)
+        else:
+            builder.text(segment)
+    return builder.parts
+
+
+def duplicate_ratio(text):
+    """Share of repeated segments in plain text, a cheap pre-check"""
+    seen = set()
+    total = 0
+    for _, segment in split_plain(text):
+        if segment and segment.strip():
+            total += 1
+            seen.add(segment.strip())
+    return (1 - len(seen) / total if total else 0.0), total
+
+
+def parse_markup(text, markup_format=None):
+    """Parse Markdown, HTML or plain text, None if the format is unknown"""
+    markup_format = markup_format or detect_markup(text)
+    if markup_format == HTML:
+        parts = parse_html(text)
+    elif markup_format == MARKDOWN:
+        parts = parse_markdown(text)
+    elif markup_format == PLAIN:
+        parts = parse_plain(text)
+    else:
+        return None
+    return MarkupDocument(markup_format, text, parts)
+
+
+def prepare_markup(text):
+    """Parse markup for translation, raises ValueError for plain text"""
+    document = parse_markup(text)
+    if document is None:
+        raise ValueError("Text is not a Markdown or HTML document")
+    return document
+
+
+def prepare_plain(text):
+    """Segment plain text for deduplicated translation"""
+    return parse_markup(text, PLAIN)
+
+
+def build_batch_prompt(segments, source, target):
+    """Build the prompt for one batch of segments"""
+    return build_numbered_prompt(
+        "numbered text segments",
+        f"Keep every placeholder like {PLACEHOLDER_FORMAT.format(1)}, every "
+        f"{LINE_BREAK} marker and all markup punctuation exactly where they "
+        "belong. Return exactly one line per segment in the same order, keeping "
+        "the numbers, and nothing else.",
+        "Segments",
+        segments,
+        source,
+        target,
+    )
+
+
+def finalize_markup(document, translations):
+    """Rebuild the document and report the token savings"""
+    missing = document.missing_segments(translations)
+    if missing:
+        print(f"Warning: {len(missing)} segments were left untranslated")
+    log_savings(f"{document.format.capitalize()} translation", document.token_savings())
+    return document.assemble(translations)
+
+
+def translate_markup(
+    text,
+    target,
+    source="Auto",
+    model=None,
+    workers=None,
+    markup_format=None,
+    priority=BACKGROUND,
+):
+    """Translate a Markdown, HTML or (with PLAIN) plain text document
+
+    Returns (text, token savings). Each unique segment is translated once.
+    Segments whose answer is missing or lost placeholders are retried once
+    before falling back to the original text.
+    """
+    document = parse_markup(text, markup_format)
+    if document is None:
+        raise ValueError("Text is not a Markdown or HTML document")
+    config = get_config()
+    model = model or config.model
+    workers = workers or config.max_concurrent_requests
+    complete = functools.partial(complete_chat, priority=priority)
+
+    payloads = document.build_payloads(model, source, target, stream=False)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        translations = list(executor.map(complete, payloads))
+        missing = document.missing_segments(translations)
+        if missing:
+            retry = document.build_payloads(
+                model, source, target, stream=False, segments=missing
+            )
+            translations.extend(executor.map(complete, retry))
+    return finalize_markup(document, translations), document.token_savings()
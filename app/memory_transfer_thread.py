@@ -0,0 +1,32 @@
+"""
+Translation memory import/export thread module
+"""
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .translation_memory import get_translation_memory
+
+
+class MemoryTransferThread(QThread):
+    """Thread importing or exporting the translation memory"""
+
+    progress = pyqtSignal(int)
+    finished = pyqtSignal(int)
+    error = pyqtSignal(str)
+
+    def __init__(self, path, export=False, parent=None):
+        super().__init__(parent)
+        self.path = path
+        self.export = export
+
+    def run(self):
+        try:
+            memory = get_translation_memory()
+            if memory is None:
+                raise RuntimeError("Translation memory is disabled")
+            if self.export:
+                count = memory.export_file(self.path, progress=self.progress.emit)
+            else:
+                count = memory.import_file(self.path, progress=self.progress.emit)
+            self.finished.emit(count)
+        except Exception as e:
+            self.error.emit(f"Error: {str(e)}")
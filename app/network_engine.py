@@ -0,0 +1,728 @@
+"""
+Non-blocking network engine for streaming translations
+
+All requests share one QNetworkAccessManager on the Qt event loop, so any
+number of concurrent streams costs no extra OS threads. Requests expose the
+same chunk_received/finished/error/alternatives_ready signals as
+TranslateThread. Requests are admitted by the shared RequestScheduler, so
+document chunks queue behind what the user is waiting for.
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QByteArray, QObject, QTimer, QUrl, pyqtSignal
+from PyQt6.QtNetwork import QNetworkAccessManager, QNetworkReply, QNetworkRequest
+
+try:
+    from PyQt6.QtNetwork import QHttp1Configuration
+except ImportError:  # Qt < 6.5
+    QHttp1Configuration = None
+
+from .config import get_config
+from .key_pool import get_key_pool
+from .openai_client import (
+    REVOKED_STATUSES,
+    THROTTLED_STATUSES,
+    StreamAssembler,
+    build_alternatives_payload,
+    build_headers,
+    build_translation_payload,
+    chat_completions_url,
+    estimate_payload_tokens,
+    parse_alternatives,
+    build_prompt,
+    parse_sse_line,
+)
+from .result_store import cached_result, payload_key, store_result
+from .scheduler import (
+    ALTERNATIVES,
+    BACKGROUND,
+    INTERACTIVE,
+    RequestScheduler,
+    get_scheduler,
+)
+
+# Single helper thread for CPU-bound document preparation, the heavy part
+# of which is further spread over the process pool
+_prepare_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="prepare")
+
+# How a text is translated, see NetworkEngine.pipeline()
+TEXT = "text"
+DOCUMENT = "document"
+SUBTITLES = "subtitles"
+MARKUP = "markup"
+DEDUPLICATED = "deduplicated"
+
+
+def _run_in_executor(function, signal, failed, *args):
+    """Run function on the prepare thread, deliver its result via signals"""
+    future = _prepare_executor.submit(function, *args)
+
+    def done(future):
+        error = future.exception()
+        if error is not None:
+            failed.emit(f"Error: {error}")
+        else:
+            signal.emit(future.result())
+
+    future.add_done_callback(done)
+
+
+class StreamRequest(QObject):
+    """Handle of one request running in the engine"""
+
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    chunk_received = pyqtSignal(str)
+    alternatives_ready = pyqtSignal(list)
+
+    def __init__(
+        self, engine, payload, alternatives_payload=None, priority=INTERACTIVE
+    ):
+        super().__init__()
+        self.engine = engine
+        self.payload = payload
+        self.alternatives_payload = alternatives_payload
+        self.priority = priority
+        self.ticket = None
+        self.stream = bool(payload.get("stream"))
+        self.request_payload = payload
+        self.assembler = StreamAssembler()
+        self.tried_keys = set()
+        self.key_pool = None
+        self.key_state = None
+        self.reply = None
+        self.buffer = b""
+        self.done = False
+        self.aborted = False
+        self.completed = False
+        self.last_error = None
+        self.started_at = None
+        self.finished_at = None
+        # When the current attempt was sent, until its first token arrives
+        self.sent_at = None
+        # payload_key() of requests whose result goes to the result store
+        self.result_key = None
+
+    def busy_seconds(self):
+        """Time from the first upstream attempt to completion"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+    def abort(self):
+        """Cancel the request, no further signals are emitted"""
+        if self.completed or self.aborted:
+            return
+        self.aborted = True
+        if self.reply is not None:
+            # finished handler releases the key and the slot
+            self.reply.abort()
+        elif self.ticket is not None and self.ticket.state == "queued":
+            # Never started, just leave the queue
+            self.completed = True
+            self.engine.scheduler.cancel(self.ticket)
+        else:
+            self.engine._complete(self)
+
+
+class NetworkEngine(QObject):
+    """Multiplexes many streaming chat completions on the event loop"""
+
+    # Admission by the scheduler, possibly from another thread
+    _admitted = pyqtSignal(object)
+
+    def __init__(self, parent=None, key_pool=None, max_concurrent=None, scheduler=None):
+        super().__init__(parent)
+        self.manager = QNetworkAccessManager(self)
+        self._key_pool = key_pool
+        if scheduler is None and max_concurrent:
+            # An explicit limit gets its own slots, e.g. in benchmarks
+            scheduler = RequestScheduler(max_concurrent)
+        self._scheduler = scheduler
+        self.active = set()
+        self._admitted.connect(self._on_admitted)
+
+    @property
+    def key_pool(self):
+        # An empty pool passed in is kept, it is falsy but still explicit
+        if self._key_pool is not None:
+            return self._key_pool
+        return get_key_pool()
+
+    @property
+    def scheduler(self):
+        return self._scheduler or get_scheduler()
+
+    @property
+    def max_concurrent(self):
+        return self.scheduler.max_concurrent
+
+    def translate(self, model, prompt, get_alternatives=False, priority=INTERACTIVE):
+        """Start a streaming translation, returns its StreamRequest"""
+        alternatives_payload = (
+            build_alternatives_payload(model, prompt) if get_alternatives else None
+        )
+        return self._submit_cached(
+            build_translation_payload(model, prompt), alternatives_payload, priority
+        )
+
+    def translate_document(self, model, text, source, target, priority=INTERACTIVE):
+        """Translate a large document with concurrent chunk requests"""
+        return DocumentRequest(self, model, text, source, target, priority=priority)
+
+    def translate_subtitles(self, model, text, source, target, priority=INTERACTIVE):
+        """Translate an SRT/VTT file in concurrent batches of cues"""
+        return self.translate_routed(model, text, source, target, SUBTITLES, priority)
+
+    def translate_markup(self, model, text, source, target, priority=INTERACTIVE):
+        """Translate only the text segments of a Markdown/HTML document"""
+        return self.translate_routed(model, text, source, target, MARKUP, priority)
+
+    def translate_deduplicated(
+        self, model, text, source, target, priority=INTERACTIVE
+    ):
+        """Translate each unique sentence or cell of plain text once"""
+        return self.translate_routed(
+            model, text, source, target, DEDUPLICATED, priority
+        )
+
+    def translate_routed(
+        self, model, text, source, target, route, priority=INTERACTIVE
+    ):
+        """Translate through the prepare/finalize pipeline of a route"""
+        prepare, finalize = self.pipeline(route)
+        return DocumentRequest(
+            self,
+            model,
+            text,
+            source,
+            target,
+            prepare=prepare,
+            finalize=finalize,
+            priority=priority,
+        )
+
+    def translate_fan_out(
+        self, model, text, source, targets, route=TEXT, priority=INTERACTIVE
+    ):
+        """Translate one text into several target languages concurrently"""
+        return FanOutRequest(self, model, text, source, targets, route, priority)
+
+    @staticmethod
+    def pipeline(route):
+        """(prepare, finalize) functions of a route, None for TEXT"""
+        if route == SUBTITLES:
+            from .subtitles import finalize_subtitles, prepare_subtitles
+
+            return prepare_subtitles, finalize_subtitles
+        if route == MARKUP:
+            from .markup import finalize_markup, prepare_markup
+
+            return prepare_markup, finalize_markup
+        if route == DEDUPLICATED:
+            from .markup import finalize_markup, prepare_plain
+
+            return prepare_plain, finalize_markup
+        if route == DOCUMENT:
+            from .processing import finalize_document, prepare_document
+
+            return prepare_document, finalize_document
+        return None, None
+
+    def submit(self, payload, alternatives_payload=None, priority=INTERACTIVE):
+        """Queue a chat completions payload, returns its StreamRequest"""
+        request = StreamRequest(self, payload, alternatives_payload, priority)
+        request.ticket = self.scheduler.submit(
+            lambda _ticket: self._admitted.emit(request), priority
+        )
+        return request
+
+    def _submit_cached(self, payload, alternatives_payload=None, priority=INTERACTIVE):
+        """submit() answered from the result store if the payload is known"""
+        key = payload_key(payload)
+        cached = cached_result(key)
+        if cached is None:
+            request = self.submit(payload, alternatives_payload, priority)
+        else:
+            request = StreamRequest(self, payload, alternatives_payload, priority)
+            # Callers connect signals after this returns
+            QTimer.singleShot(0, lambda: self._replay(request, cached))
+        request.result_key = key
+        return request
+
+    def _replay(self, request, text):
+        if request.aborted:
+            return
+        if request.stream:
+            request.chunk_received.emit(text)
+        self._finish(request, text)
+
+    def active_count(self):
+        return len(self.active)
+
+    def pending_count(self):
+        return sum(self.scheduler.queued().values())
+
+    def _on_admitted(self, request):
+        if request.aborted:
+            self.scheduler.finish(request.ticket)
+            return
+        self.active.add(request)
+        self._start(request)
+
+    def _start(self, request):
+        if request.aborted:
+            self._complete(request)
+            return
+
+        if request.started_at is None:
+            request.started_at = time.perf_counter()
+        key_pool = self.key_pool
+        key_state, retry_in = key_pool.try_acquire(
+            estimate_payload_tokens(request.request_payload),
+            exclude=request.tried_keys,
+        )
+        if key_state is None:
+            if retry_in is None:
+                self._fail(
+                    request, request.last_error or "No usable API key available"
+                )
+            else:
+                QTimer.singleShot(int(retry_in * 1000), lambda: self._start(request))
+            return
+
+        request.key_pool = key_pool
+        request.key_state = key_state
+        request.buffer = b""
+        request.done = False
+
+        timeout = get_config().request_timeout
+        net_request = QNetworkRequest(QUrl(chat_completions_url()))
+        for name, value in build_headers(key_state).items():
+            net_request.setRawHeader(name.encode(), value.encode())
+        net_request.setTransferTimeout(int(timeout * 1000))
+        net_request.setAttribute(
+            QNetworkRequest.Attribute.Http2AllowedAttribute, True
+        )
+        if QHttp1Configuration is not None:
+            http1 = QHttp1Configuration()
+            http1.setNumberOfConnectionsPerHost(min(self.scheduler.ceiling, 255))
+            net_request.setHttp1Configuration(http1)
+
+        body = QByteArray(
+            json.dumps(request.request_payload, ensure_ascii=False).encode("utf-8")
+        )
+        request.sent_at = time.perf_counter()
+        reply = self.manager.post(net_request, body)
+        request.reply = reply
+        reply.readyRead.connect(lambda: self._on_ready_read(request))
+        reply.finished.connect(lambda: self._on_finished(request))
+
+    @staticmethod
+    def _status(reply):
+        return reply.attribute(QNetworkRequest.Attribute.HttpStatusCodeAttribute)
+
+    def _on_ready_read(self, request):
+        reply = request.reply
+        if reply is None:
+            return
+        request.buffer += bytes(reply.readAll())
+        if not request.stream or self._status(reply) != 200:
+            # Parsed as a whole when the reply finishes
+            return
+
+        *lines, request.buffer = request.buffer.split(b"\n")
+        text = None
+        for line in lines:
+            content, done = parse_sse_line(line.decode("utf-8").rstrip("\r"))
+            if done:
+                request.done = True
+            elif content:
+                text = request.assembler.feed(content) or text
+        if text is not None and request.sent_at is not None:
+            self.scheduler.observe(
+                time.perf_counter() - request.sent_at, priority=request.priority
+            )
+            request.sent_at = None
+        if text is not None and not request.aborted:
+            request.chunk_received.emit(text)
+
+    def _on_finished(self, request):
+        reply = request.reply
+        request.reply = None
+        if reply is None:
+            return
+        if not request.aborted:
+            # Drain anything readyRead has not delivered yet
+            request.reply = reply
+            self._on_ready_read(request)
+            request.reply = None
+
+        status = self._status(reply)
+        network_error = reply.error()
+        headers = {
+            bytes(name).decode("latin-1").lower(): bytes(value).decode("latin-1")
+            for name, value in reply.rawHeaderPairs()
+        }
+        reply.deleteLater()
+        request.key_pool.release(request.key_state)
+
+        if request.aborted:
+            self._complete(request)
+            return
+
+        if status == 200:
+            request.key_pool.update_from_headers(request.key_state, headers)
+            if not request.stream:
+                self._finish_plain(request)
+            elif request.done:
+                self._finish(request, request.assembler.finish())
+            else:
+                self._resume(request, "Stream closed before completion")
+            return
+
+        message = self._error_message(request.buffer, status, reply, network_error)
+        request.last_error = f"API Error: {message}" if status else f"Error: {message}"
+        if status in THROTTLED_STATUSES or status is not None and status >= 500:
+            self.scheduler.observe(overloaded=True, priority=request.priority)
+        if status in THROTTLED_STATUSES:
+            request.key_pool.mark_throttled(request.key_state, headers)
+            request.tried_keys.add(request.key_state.key)
+            self._start(request)
+        elif status in REVOKED_STATUSES:
+            request.key_pool.mark_revoked(request.key_state)
+            request.tried_keys.add(request.key_state.key)
+            self._start(request)
+        elif status is None or status >= 500:
+            self._resume(request, message)
+        else:
+            self._fail(request, request.last_error)
+
+    @staticmethod
+    def _error_message(body, status, reply, network_error):
+        if status:
+            try:
+                return json.loads(body).get("error", {}).get("message", "Unknown error")
+            except ValueError:
+                return f"HTTP {status}"
+        if network_error != QNetworkReply.NetworkError.NoError:
+            return reply.errorString()
+        return "Unknown error"
+
+    def _resume(self, request, reason):
+        """Continue an interrupted request after the last complete sentence"""
+        assembler = request.assembler
+        if assembler.resumes >= get_config().stream_max_resumes:
+            self._fail(request, request.last_error or f"Error: {reason}")
+            return
+        committed = assembler.interrupt()
+        print(f"Stream interrupted ({reason}), resuming after {len(committed)} chars")
+        if committed:
+            # Drop the unfinished sentence, the continuation redoes it
+            request.chunk_received.emit(committed)
+        request.request_payload = assembler.next_payload(request.payload)
+        delay = min(0.5 * 2 ** (assembler.resumes - 1), 5)
+        QTimer.singleShot(int(delay * 1000), lambda: self._start(request))
+
+    def _finish_plain(self, request):
+        try:
+            result = json.loads(request.buffer)
+            content = result["choices"][0]["message"]["content"].strip()
+        except (ValueError, KeyError, IndexError) as e:
+            self._fail(request, f"Error: {e}")
+            return
+        self._finish(request, content)
+
+    def _finish(self, request, text):
+        self._complete(request)
+        if request.result_key is not None:
+            store_result(request.result_key, text)
+        request.finished.emit(text)
+        if request.alternatives_payload and text:
+            alternatives = self._submit_cached(
+                request.alternatives_payload, priority=ALTERNATIVES
+            )
+            alternatives.finished.connect(
+                lambda alt_text: self._emit_alternatives(request, alt_text)
+            )
+            alternatives.error.connect(
+                lambda error: print(f"Error getting alternatives: {error}")
+            )
+
+    @staticmethod
+    def _emit_alternatives(request, alternatives_text):
+        alternatives = parse_alternatives(alternatives_text)
+        if alternatives:
+            request.alternatives_ready.emit(alternatives)
+
+    def _fail(self, request, message):
+        self._complete(request)
+        request.error.emit(message)
+
+    def _complete(self, request):
+        if request.completed:
+            return
+        request.completed = True
+        request.finished_at = time.perf_counter()
+        self.active.discard(request)
+        if request.ticket is not None:
+            self.scheduler.finish(request.ticket)
+
+
+class DocumentRequest(QObject):
+    """Large document translated as concurrent chunk requests
+
+    prepare(text) returns an object with build_payloads() and assemble(),
+    finalize(prepared, translations) returns the final text; both run in
+    the background executor. Defaults are the document processing pipeline.
+    An already prepared object can be passed instead of the text. Chunks
+    are queued as background work unless another priority is given.
+    """
+
+    finished = pyqtSignal(str)
+    error = pyqtSignal(str)
+    chunk_received = pyqtSignal(str)
+    alternatives_ready = pyqtSignal(list)
+
+    # Internal signals delivering executor results on the GUI thread
+    _prepared = pyqtSignal(object)
+    _finalized = pyqtSignal(str)
+    _failed = pyqtSignal(str)
+
+    # Minimal interval between chunk_received updates
+    EMIT_INTERVAL_MS = 100
+
+    def __init__(
+        self,
+        engine,
+        model,
+        text,
+        source,
+        target,
+        prepare=None,
+        finalize=None,
+        prepared=None,
+        priority=BACKGROUND,
+    ):
+        super().__init__()
+        self.engine = engine
+        self.model = model
+        self.priority = priority
+        self.source = source
+        self.target = target
+        self.prepared = None
+        self.requests = []
+        self.partials = []
+        self.translations = []
+        self.remaining = 0
+        self.aborted = False
+
+        self.emit_timer = QTimer(self)
+        self.emit_timer.setSingleShot(True)
+        self.emit_timer.setInterval(self.EMIT_INTERVAL_MS)
+        self.emit_timer.timeout.connect(self._emit_progress)
+
+        self._prepared.connect(self._on_prepared)
+        self._finalized.connect(self._on_finalized)
+        self._failed.connect(self._on_failed)
+
+        if prepare is None or finalize is None:
+            # Loaded on first use, process pool support is not needed at start-up
+            from .processing import finalize_document, prepare_document
+
+            prepare = prepare or prepare_document
+            finalize = finalize or finalize_document
+        self.finalize = finalize
+
+        if prepared is not None:
+            QTimer.singleShot(0, lambda: self._on_prepared(prepared))
+        else:
+            _run_in_executor(prepare, self._prepared, self._failed, text)
+
+    def busy_seconds(self):
+        """Time from the first chunk request start to the last one's end"""
+        started = [r.started_at for r in self.requests if r.started_at is not None]
+        finished = [r.finished_at for r in self.requests if r.finished_at is not None]
+        if not started or not finished:
+            return 0.0
+        return max(finished) - min(started)
+
+    def abort(self):
+        """Cancel all chunk requests"""
+        self.aborted = True
+        self.emit_timer.stop()
+        for request in self.requests:
+            request.abort()
+
+    def _on_prepared(self, prepared):
+        if self.aborted:
+            return
+        self.prepared = prepared
+        payloads = prepared.build_payloads(self.model, self.source, self.target)
+        self.partials = [""] * len(payloads)
+        self.translations = [None] * len(payloads)
+        self.remaining = len(payloads)
+        if not payloads:
+            self._on_finalized("")
+            return
+        for index, payload in enumerate(payloads):
+            request = self.engine.submit(payload, priority=self.priority)
+            request.chunk_received.connect(
+                lambda text, i=index: self._on_chunk(i, text)
+            )
+            request.finished.connect(lambda text, i=index: self._on_chunk_done(i, text))
+            request.error.connect(self._on_failed)
+            self.requests.append(request)
+
+    def _on_chunk(self, index, text):
+        self.partials[index] = text
+        if not self.emit_timer.isActive():
+            self.emit_timer.start()
+
+    def _emit_progress(self):
+        if self.aborted or self.prepared is None:
+            return
+        self.chunk_received.emit(self.prepared.assemble(self.partials))
+
+    def _on_chunk_done(self, index, text):
+        self.partials[index] = text
+        self.translations[index] = text
+        self.remaining -= 1
+        if self.remaining == 0 and not self.aborted:
+            self.emit_timer.stop()
+            _run_in_executor(
+                self.finalize,
+                self._finalized,
+                self._failed,
+                self.prepared,
+                self.translations,
+            )
+
+    def _on_finalized(self, translation):
+        if self.aborted:
+            return
+        self.chunk_received.emit(translation)
+        self.finished.emit(translation)
+
+    def _on_failed(self, message):
+        if self.aborted:
+            return
+        self.abort()
+        self.error.emit(message)
+
+
+class FanOutRequest(QObject):
+    """One source translated into several target languages concurrently
+
+    The text is prepared once (format detection, segmentation, masking) and
+    the prepared document is shared by one request per target, all
+    multiplexed on the same engine. Signals carry the target language.
+    """
+
+    chunk_received = pyqtSignal(str, str)
+    target_finished = pyqtSignal(str, str)
+    target_failed = pyqtSignal(str, str)
+    # Wall-clock seconds and the estimated sum of sequential runs
+    finished = pyqtSignal(float, float)
+
+    _prepared = pyqtSignal(object)
+    _failed = pyqtSignal(str)
+
+    def __init__(
+        self, engine, model, text, source, targets, route=TEXT, priority=INTERACTIVE
+    ):
+        super().__init__()
+        self.engine = engine
+        self.model = model
+        self.priority = priority
+        self.text = text
+        self.source = source
+        self.targets = list(targets)
+        self.requests = {}
+        self.busy = {}
+        self.aborted = False
+        self.started = time.perf_counter()
+        self.prepare_seconds = 0.0
+
+        self._prepared.connect(self._on_prepared)
+        self._failed.connect(self._on_prepare_failed)
+
+        prepare, self.finalize = engine.pipeline(route)
+        if prepare is None:
+            QTimer.singleShot(0, lambda: self._on_prepared(None))
+        else:
+            _run_in_executor(prepare, self._prepared, self._failed, text)
+
+    def abort(self):
+        """Cancel the requests of all targets"""
+        self.aborted = True
+        for request in self.requests.values():
+            request.abort()
+
+    def _on_prepared(self, prepared):
+        if self.aborted:
+            return
+        self.prepare_seconds = time.perf_counter() - self.started
+        if not self.targets:
+            self._check_done()
+            return
+        for target in self.targets:
+            if prepared is None:
+                request = self.engine.translate(
+                    self.model,
+                    build_prompt(self.text, self.source, target),
+                    priority=self.priority,
+                )
+            else:
+                request = DocumentRequest(
+                    self.engine,
+                    self.model,
+                    None,
+                    self.source,
+                    target,
+                    finalize=self.finalize,
+                    prepared=prepared,
+                    priority=self.priority,
+                )
+            request.chunk_received.connect(
+                lambda text, t=target: self.chunk_received.emit(t, text)
+            )
+            request.finished.connect(
+                lambda text, t=target: self._on_target_finished(t, text)
+            )
+            request.error.connect(
+                lambda message, t=target: self._on_target_failed(t, message)
+            )
+            self.requests[target] = request
+
+    def _on_prepare_failed(self, message):
+        if self.aborted:
+            return
+        for target in self.targets:
+            self.busy[target] = 0.0
+            self.target_failed.emit(target, message)
+        self._check_done()
+
+    def _on_target_finished(self, target, text):
+        if self.aborted:
+            return
+        self.busy[target] = self.requests[target].busy_seconds()
+        self.target_finished.emit(target, text)
+        self._check_done()
+
+    def _on_target_failed(self, target, message):
+        if self.aborted:
+            return
+        self.busy[target] = self.requests[target].busy_seconds()
+        self.target_failed.emit(target, message)
+        self._check_done()
+
+    def _check_done(self):
+        if len(self.busy) < len(self.targets):
+            return
+        wall = time.perf_counter() - self.started
+        # Sequential runs would each prepare the text and run alone
+        sequential = sum(self.busy.values()) + self.prepare_seconds * len(self.targets)
+        self.finished.emit(wall, sequential)
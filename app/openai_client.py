@@ -0,0 +1,460 @@
+"""
+OpenAI chat completions client shared by translation threads and tools
+"""
+import json
+import re
+import threading
+import time
+import weakref
+
+from .config import get_config
+from .key_pool import get_key_pool
+from .scheduler import INTERACTIVE, get_scheduler
+
+DEFAULT_API_BASE_URL = "https://api.openai.com/v1"
+
+TRANSLATOR_SYSTEM_PROMPT = (
+    "You are a professional translator. Translate accurately and naturally."
+)
+ALTERNATIVES_SYSTEM_PROMPT = (
+    "You are a professional translator. Suggest different stylistic translation variants."
+)
+ALTERNATIVES_SUFFIX = "\n\nSuggest 3 alternative translation options in the format:\n1. [option 1]\n2. [option 2]\n3. [option 3]"
+
+CONTINUE_INSTRUCTION = (
+    "Your previous answer was cut off. Continue the translation exactly from "
+    "where it stopped. Do not repeat text that is already translated and do "
+    "not add comments."
+)
+
+# Status codes that mean "this key can't be used right now"
+THROTTLED_STATUSES = {429}
+REVOKED_STATUSES = {401, 403}
+
+# Sentence end followed by whitespace, CJK full stops, or a line break
+_SENTENCE_END_RE = re.compile(
+    r"[.!?…][\"'»”’)\]]*\s+|[。！？][」』”’）]*|\n+"
+)
+
+# "1.", "2)", "-", "*" or "•" starting an alternatives list item
+_LIST_MARKER_RE = re.compile(r"(?:\d+[.)]|[-*•])\s*")
+
+# Line breaks inside a batch item travel as this marker so one item is one line
+LINE_BREAK = "<br>"
+
+# "[n] text" line of a batch answer
+_NUMBERED_LINE_RE = re.compile(r"^\s*\[(\d+)\]\s?(.*)$")
+
+# Shortest repeated text treated as overlap when stitching continuations
+MIN_OVERLAP = 8
+MAX_OVERLAP = 300
+
+
+class APIError(Exception):
+    """Error returned by the API"""
+
+    def __init__(self, message, status_code=None):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+
+class TruncatedResponse(APIError):
+    """Answer stopped at the output token limit"""
+
+
+class StreamInterrupted(Exception):
+    """Stream ended before the [DONE] marker"""
+
+
+def recoverable_stream_errors():
+    """Disconnects after which a stream is resumed instead of failed"""
+    # requests is imported on first use, the GUI itself never needs it
+    import requests
+
+    return (
+        StreamInterrupted,
+        requests.exceptions.ConnectionError,
+        requests.exceptions.ChunkedEncodingError,
+        requests.exceptions.Timeout,
+    )
+
+
+def build_prompt(text, source, target):
+    """Build translation prompt for the given languages"""
+    if source == "Auto":
+        return f"Translate the following text into the language '{target}'. Return only the translation without additional comments:\n\n{text}"
+    return f"Translate the following text from the language '{source}' to the language '{target}'. Return only the translation without additional comments:\n\n{text}"
+
+
+def build_translation_payload(model, prompt, stream=True):
+    """Build chat completions payload for the main translation"""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": TRANSLATOR_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt},
+        ],
+        "temperature": 0.3,
+        "stream": stream,
+    }
+
+
+def build_alternatives_payload(model, prompt):
+    """Build chat completions payload for alternative translations"""
+    return {
+        "model": model,
+        "messages": [
+            {"role": "system", "content": ALTERNATIVES_SYSTEM_PROMPT},
+            {"role": "user", "content": prompt + ALTERNATIVES_SUFFIX},
+        ],
+        "temperature": 0.7,
+    }
+
+
+def numbered_lines(items):
+    """Batch items with .number and .text as "[n] text" lines"""
+    return "\n".join(
+        f"[{item.number}] {item.text.replace(chr(10), LINE_BREAK)}" for item in items
+    )
+
+
+def build_batch_prompt(subject, rules, heading, items, source, target, context=()):
+    """Build the prompt for one batch of numbered items
+
+    context holds (label, items) pairs shown before the items to translate,
+    empty ones are left out.
+    """
+    if source == "Auto":
+        direction = f"into the language '{target}'"
+    else:
+        direction = f"from the language '{source}' to the language '{target}'"
+    parts = [f"Translate the {subject} below {direction}. {rules}"]
+    for label, context_items in context:
+        if context_items:
+            parts.append(f"{label}:\n" + numbered_lines(context_items))
+    parts.append(f"{heading}:\n\n" + numbered_lines(items))
+    return "\n\n".join(parts)
+
+
+def parse_numbered_lines(text):
+    """Parse "[n] text" lines of a batch answer into {n: item text}"""
+    translated = {}
+    for line in text.split("\n"):
+        match = _NUMBERED_LINE_RE.match(line)
+        if match:
+            translated[int(match.group(1))] = (
+                match.group(2).strip().replace(LINE_BREAK, "\n")
+            )
+    return translated
+
+
+def chat_completions_url():
+    """Chat completions endpoint, api_base_url allows proxies and test servers"""
+    base_url = get_config().api_base_url or DEFAULT_API_BASE_URL
+    return base_url.rstrip("/") + "/chat/completions"
+
+
+def build_headers(key_state):
+    """Build request headers for a pool key"""
+    headers = {
+        "Authorization": f"Bearer {key_state.key}",
+        "Content-Type": "application/json",
+    }
+    if key_state.organization:
+        headers["OpenAI-Organization"] = key_state.organization
+    return headers
+
+
+def estimate_tokens(text):
+    """Rough token estimate used for rate accounting"""
+    return len(text) // 4 + 1
+
+
+def estimate_payload_tokens(payload):
+    """Rough token estimate for a whole request including the completion"""
+    prompt_chars = sum(len(m.get("content", "")) for m in payload.get("messages", []))
+    # Translations are roughly as long as their source
+    return 2 * (prompt_chars // 4 + 1)
+
+
+def parse_sse_line(line_text):
+    """Parse one SSE line, returns (content, done)"""
+    if not line_text.startswith("data: "):
+        return "", False
+    data_str = line_text[6:]
+    if data_str.strip() == "[DONE]":
+        return "", True
+    try:
+        data = json.loads(data_str)
+    except json.JSONDecodeError:
+        return "", False
+    if "choices" in data and len(data["choices"]) > 0:
+        delta = data["choices"][0].get("delta", {})
+        return delta.get("content", "") or "", False
+    return "", False
+
+
+def iter_stream_content(response):
+    """Yield content deltas from a streaming chat completions response"""
+    for line in response.iter_lines():
+        if line:
+            content, done = parse_sse_line(line.decode("utf-8"))
+            if done:
+                return
+            if content:
+                yield content
+    raise StreamInterrupted("Stream closed before completion")
+
+
+def split_at_last_sentence(text):
+    """Split text into (complete sentences, unfinished tail)"""
+    end = 0
+    for match in _SENTENCE_END_RE.finditer(text):
+        end = match.end()
+    return text[:end], text[end:]
+
+
+def build_continuation_payload(payload, partial):
+    """Build payload asking the model to continue after partial output"""
+    continuation = dict(payload)
+    continuation["messages"] = list(payload["messages"]) + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": CONTINUE_INSTRUCTION},
+    ]
+    return continuation
+
+
+def stitch(committed, continuation):
+    """Join continuation to committed text, dropping repeated overlap"""
+    head = continuation.lstrip() if committed[-1:].isspace() else continuation
+    tail = committed.rstrip()[-MAX_OVERLAP:]
+    for size in range(min(len(tail), len(head)), MIN_OVERLAP - 1, -1):
+        if tail[-size:] == head[:size]:
+            return committed + head[size:].lstrip()
+    return committed + head
+
+
+class StreamAssembler:
+    """Accumulates streamed content across resumed requests
+
+    feed() returns the visible text, or None while the start of a
+    continuation is buffered to strip text the model repeated.
+    """
+
+    def __init__(self):
+        self.committed = ""
+        self.buffered = ""
+        self.text = ""
+        self.resumes = 0
+
+    @property
+    def pending(self):
+        """True while a continuation head is buffered"""
+        return bool(self.committed) and self.buffered is not None
+
+    def feed(self, content):
+        """Add a content delta, returns the visible text or None"""
+        if not self.committed or self.buffered is None:
+            self.text += content
+            return self.text
+        self.buffered += content
+        if len(self.buffered) < MAX_OVERLAP:
+            return None
+        self.text = stitch(self.committed, self.buffered)
+        self.buffered = None
+        return self.text
+
+    def finish(self):
+        """Flush buffered continuation, returns the final text"""
+        if self.pending:
+            self.text = stitch(self.committed, self.buffered)
+            self.buffered = None
+        return self.text
+
+    def interrupt(self):
+        """Handle a disconnect, returns the text to resume after"""
+        self.finish()
+        self.committed, _tail = split_at_last_sentence(self.text)
+        self.text = self.committed
+        self.buffered = ""
+        self.resumes += 1
+        return self.committed
+
+    def next_payload(self, payload):
+        """Payload for the next attempt after interrupt()"""
+        if self.committed:
+            return build_continuation_payload(payload, self.committed)
+        return payload
+
+
+def iter_translation(payload, timeout=None, key_pool=None, max_resumes=None):
+    """Yield the growing translation text, resuming interrupted streams
+
+    On a recoverable disconnect the unfinished sentence is dropped (the
+    yielded text may shrink once) and a continuation request picks up after
+    the last complete sentence instead of starting over.
+    """
+    if key_pool is None:
+        key_pool = get_key_pool()
+    if max_resumes is None:
+        max_resumes = get_config().stream_max_resumes
+
+    assembler = StreamAssembler()
+    request_payload = payload
+    while True:
+        try:
+            response, key_state = post_chat(
+                request_payload, stream=True, timeout=timeout, key_pool=key_pool
+            )
+            # elapsed covers sending up to the headers, so this is the send time
+            sent_at = time.perf_counter() - response.elapsed.total_seconds()
+            try:
+                for content in iter_stream_content(response):
+                    if sent_at is not None:
+                        get_scheduler().observe(time.perf_counter() - sent_at)
+                        sent_at = None
+                    text = assembler.feed(content)
+                    if text is not None:
+                        yield text
+            finally:
+                response.close()
+                key_pool.release(key_state)
+            if assembler.pending:
+                yield assembler.finish()
+            return
+        except recoverable_stream_errors() as e:
+            if assembler.resumes >= max_resumes:
+                raise
+            committed = assembler.interrupt()
+            print(f"Stream interrupted ({e}), resuming after {len(committed)} chars")
+            if committed:
+                # Drop the unfinished sentence, the continuation redoes it
+                yield committed
+            request_payload = assembler.next_payload(payload)
+            time.sleep(min(0.5 * 2 ** (assembler.resumes - 1), 5))
+
+
+def parse_alternatives(alternatives_text):
+    """Parse numbered alternatives list returned by the model"""
+    alternatives = []
+    for line in alternatives_text.split("\n"):
+        line = line.strip()
+        # Only the list marker goes, periods inside the text stay
+        marker = _LIST_MARKER_RE.match(line)
+        if marker:
+            clean_line = line[marker.end():].strip()
+            if clean_line:
+                alternatives.append(clean_line)
+    return alternatives[:3]
+
+
+def error_message(response):
+    """Extract error message from an API error response"""
+    try:
+        return response.json().get("error", {}).get("message", "Unknown error")
+    except ValueError:
+        return f"HTTP {response.status_code}"
+
+
+_session_local = threading.local()
+_sessions = weakref.WeakSet()
+
+
+def get_session():
+    """Get a pooled HTTP session for the current thread"""
+    session = getattr(_session_local, "session", None)
+    if session is None:
+        import requests
+
+        session = requests.Session()
+        _session_local.session = session
+        _sessions.add(session)
+    return session
+
+
+def close_sessions():
+    """Close pooled connections of all threads' sessions
+
+    Sessions stay usable and reconnect on their next request.
+    """
+    for session in list(_sessions):
+        session.close()
+
+
+def complete_chat(
+    payload, priority=INTERACTIVE, timeout=None, key_pool=None, allow_truncated=True
+):
+    """Send a non-streaming request in a scheduler slot, returns the content
+
+    Without allow_truncated an answer cut off at the token limit raises
+    TruncatedResponse instead of being returned.
+    """
+    if key_pool is None:
+        key_pool = get_key_pool()
+    with get_scheduler().slot(priority):
+        response, key_state = post_chat(payload, timeout=timeout, key_pool=key_pool)
+        try:
+            result = response.json()
+        finally:
+            key_pool.release(key_state)
+    choice = result["choices"][0]
+    if not allow_truncated and choice.get("finish_reason") == "length":
+        raise TruncatedResponse("The translation was cut off at the token limit")
+    return choice["message"]["content"]
+
+
+def post_chat(payload, stream=False, timeout=None, key_pool=None):
+    """Send a chat completions request through the key pool
+
+    Throttled or revoked keys are taken out of rotation and the request is
+    retried with the next key. Returns (response, key_state); the caller
+    must pass key_state to key_pool.release() when done with the response.
+    """
+    if key_pool is None:
+        key_pool = get_key_pool()
+    if timeout is None:
+        timeout = get_config().request_timeout
+    estimated_tokens = estimate_payload_tokens(payload)
+
+    tried = set()
+    last_error = None
+    while True:
+        key_state = key_pool.acquire(
+            estimated_tokens, timeout=timeout, exclude=tried
+        )
+        if key_state is None:
+            if last_error is not None:
+                raise last_error
+            raise APIError("No usable API key available")
+
+        try:
+            response = get_session().post(
+                chat_completions_url(),
+                headers=build_headers(key_state),
+                json=payload,
+                timeout=timeout,
+                stream=stream,
+            )
+        except Exception:
+            key_pool.release(key_state)
+            raise
+
+        if response.status_code == 200:
+            key_pool.update_from_headers(key_state, response.headers)
+            return response, key_state
+
+        message = error_message(response)
+        response.close()
+        key_pool.release(key_state)
+        last_error = APIError(f"API Error: {message}", response.status_code)
+        if response.status_code in THROTTLED_STATUSES or response.status_code >= 500:
+            get_scheduler().observe(overloaded=True)
+
+        if response.status_code in THROTTLED_STATUSES:
+            key_pool.mark_throttled(key_state, response.headers)
+        elif response.status_code in REVOKED_STATUSES:
+            key_pool.mark_revoked(key_state)
+        else:
+            raise last_error
+        tried.add(key_state.key)
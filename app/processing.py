@@ -0,0 +1,429 @@
+"""
+Pre- and post-processing of large documents in a process pool
+
+Normalization, segmentation, glossary matching and placeholder masking are
+CPU-bound, so large documents are split into ranges that worker processes
+read from shared memory. Results come back as packed UTF-8 buffers rather
+than lists of Python strings to keep pickling cheap.
+"""
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from .config import get_config
+from .openai_client import build_prompt, build_translation_payload
+from .segmenter import sentence_breaks
+
+PLACEHOLDER_FORMAT = "⟦{}⟧"
+_PLACEHOLDER_RE = re.compile(r"⟦(\d+)⟧")
+
+# Spans that must reach the output unchanged
+MASK_RE = re.compile(
+    r"```.*?```"  # fenced code
+    r"|`[^`\n]+`"  # inline code
+    r"|https?://[^\s<>()\"']+"  # URLs
+    r"|[\w.+-]+@[\w-]+\.[\w.-]+"  # e-mails
+    r"|\{[\w.]*\}|%\(?\w*\)?[sdif]"  # format placeholders
+    r"|⟦\d+⟧",  # literal placeholders already in the text
+    re.DOTALL,
+)
+_PARAGRAPH_RE = re.compile(r"\n[ \t]*\n\s*")
+# Blank line in UTF-8 bytes, LF or CRLF; never inside a multi-byte sequence
+_BLANK_LINE_RE = re.compile(rb"\n\r?\n")
+_INVISIBLE_RE = re.compile("[​‌‍⁠﻿]")
+
+
+def normalize(text):
+    """Normalize line endings, Unicode form and invisible characters"""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    text = _INVISIBLE_RE.sub("", text)
+    return unicodedata.normalize("NFC", text)
+
+
+def segment(text):
+    """Split text into (segment, separator) pairs by paragraphs"""
+    segments = []
+    position = 0
+    for match in _PARAGRAPH_RE.finditer(text):
+        segments.append((text[position:match.start()], match.group()))
+        position = match.end()
+    if position < len(text):
+        segments.append((text[position:], ""))
+    return segments
+
+
+def split_long(segment_text, max_chars):
+    """Split an oversized paragraph into sentence-aligned pieces"""
+    pieces = []
+    position = 0
+    for end, next_start in sentence_breaks(segment_text):
+        if end - position >= max_chars:
+            pieces.append((segment_text[position:end], segment_text[end:next_start]))
+            position = next_start
+    pieces.append((segment_text[position:], ""))
+    return pieces
+
+
+def mask(text, pattern=None):
+    """Replace non-translatable spans with compact placeholders"""
+    masks = []
+
+    def replace(match):
+        masks.append(match.group())
+        return PLACEHOLDER_FORMAT.format(len(masks))
+
+    return (pattern or MASK_RE).sub(replace, text), masks
+
+
+def unmask(text, masks):
+    """Restore spans replaced by mask()"""
+    if not masks:
+        return text
+
+    def replace(match):
+        index = int(match.group(1)) - 1
+        return masks[index] if 0 <= index < len(masks) else match.group()
+
+    return _PLACEHOLDER_RE.sub(replace, text)
+
+
+def match_glossary(text, glossary):
+    """Find glossary terms that occur in the text"""
+    lowered = text.lower()
+    return [term for term in glossary if term.lower() in lowered]
+
+
+def deduplicate(items, key):
+    """Keep the first item per key
+
+    Returns the unique items and, for every item, the index of its unique
+    representative, so results can be expanded back into position.
+    """
+    uniques = []
+    seen = {}
+    positions = []
+    for item in items:
+        item_key = key(item)
+        position = seen.get(item_key)
+        if position is None:
+            position = seen[item_key] = len(uniques)
+            uniques.append(item)
+        positions.append(position)
+    return uniques, positions
+
+
+def savings_report(items, uniques, prompt_tokens, wholesale_tokens):
+    """Summary of deduplication and prompt tokens for logs and the UI"""
+    duplicates = len(items) - len(uniques)
+    return {
+        "segments": len(items),
+        "unique_segments": len(uniques),
+        "duplicate_percent": round(100 * duplicates / len(items)) if items else 0,
+        "prompt_tokens": prompt_tokens,
+        "wholesale_tokens": wholesale_tokens,
+        "saved_percent": round(100 * (wholesale_tokens - prompt_tokens) / wholesale_tokens),
+    }
+
+
+def log_savings(kind, savings):
+    """Print a savings report line"""
+    if savings:
+        print(
+            f"{kind}: {savings['unique_segments']} unique of {savings['segments']} "
+            f"segments ({savings['duplicate_percent']}% duplicates), "
+            f"~{savings['prompt_tokens']} prompt tokens instead of "
+            f"~{savings['wholesale_tokens']} ({savings['saved_percent']}% saved)"
+        )
+
+
+def pack_strings(strings):
+    """Pack strings into one UTF-8 buffer plus a lengths array"""
+    encoded = [s.encode("utf-8") for s in strings]
+    return b"".join(encoded), array("I", map(len, encoded)).tobytes()
+
+
+def unpack_strings(blob, lengths):
+    """Inverse of pack_strings()"""
+    sizes = array("I")
+    sizes.frombytes(lengths)
+    strings = []
+    position = 0
+    for size in sizes:
+        strings.append(blob[position:position + size].decode("utf-8"))
+        position += size
+    return strings
+
+
+class Chunk:
+    """Masked piece of a document sent in one request"""
+
+    __slots__ = ("text", "separator", "masks", "glossary_terms")
+
+    def __init__(self, text, separator, masks, glossary_terms):
+        self.text = text
+        self.separator = separator
+        self.masks = masks
+        self.glossary_terms = glossary_terms
+
+
+class PreparedDocument:
+    """Document split into masked chunks ready for translation"""
+
+    def __init__(self, chunks, glossary=None):
+        self.chunks = chunks
+        self.glossary = glossary or {}
+
+    def build_payloads(self, model, source, target):
+        """Build a chat completions payload per chunk"""
+        return [
+            build_chunk_payload(model, chunk, source, target, self.glossary)
+            for chunk in self.chunks
+        ]
+
+    def assemble(self, translations):
+        """Join translated chunks with the original separators"""
+        parts = []
+        for chunk, translation in zip(self.chunks, translations):
+            parts.append(unmask(translation, chunk.masks))
+            parts.append(chunk.separator)
+        return "".join(parts)
+
+
+def build_chunk_payload(model, chunk, source, target, glossary=None):
+    """Build request payload for one chunk, with glossary hints"""
+    prompt = build_prompt(chunk.text, source, target)
+    notes = []
+    if chunk.masks:
+        notes.append("Keep placeholders like ⟦1⟧ exactly as they are.")
+    if glossary and chunk.glossary_terms:
+        terms = "; ".join(f"{t} → {glossary[t]}" for t in chunk.glossary_terms)
+        notes.append(f"Use these term translations: {terms}.")
+    if notes:
+        prompt = " ".join(notes) + "\n" + prompt
+    return build_translation_payload(model, prompt)
+
+
+def _prepare_text(text, max_chars, glossary):
+    """Normalize, segment, chunk, mask and match glossary for one range"""
+    chunks = []
+    current = []
+    current_len = 0
+
+    def flush(separator):
+        nonlocal current, current_len
+        if not current:
+            return
+        masked, masks = mask("".join(current))
+        terms = match_glossary(masked, glossary) if glossary else []
+        chunks.append((masked, separator, masks, terms))
+        current = []
+        current_len = 0
+
+    for paragraph, separator in segment(normalize(text)):
+        pieces = (
+            split_long(paragraph, max_chars)
+            if len(paragraph) > max_chars
+            else [(paragraph, separator)]
+        )
+        if len(pieces) > 1:
+            pieces[-1] = (pieces[-1][0], separator)
+        for piece, piece_separator in pieces:
+            if current and current_len + len(piece) > max_chars:
+                # Previous chunk ends where this piece starts
+                last = current.pop()
+                flush(last)
+            current.append(piece)
+            current.append(piece_separator)
+            current_len += len(piece) + len(piece_separator)
+    if current:
+        last = current.pop()
+        flush(last)
+    return chunks
+
+
+def _pack_chunks(chunks):
+    texts, separators, masks, mask_counts, terms, term_counts = [], [], [], [], [], []
+    for text, separator, chunk_masks, chunk_terms in chunks:
+        texts.append(text)
+        separators.append(separator)
+        masks.extend(chunk_masks)
+        mask_counts.append(len(chunk_masks))
+        terms.extend(chunk_terms)
+        term_counts.append(len(chunk_terms))
+    return (
+        pack_strings(texts),
+        pack_strings(separators),
+        pack_strings(masks),
+        array("I", mask_counts).tobytes(),
+        pack_strings(terms),
+        array("I", term_counts).tobytes(),
+    )
+
+
+def _unpack_chunks(packed):
+    texts, separators, masks, mask_counts, terms, term_counts = packed
+    texts = unpack_strings(*texts)
+    separators = unpack_strings(*separators)
+    masks = unpack_strings(*masks)
+    terms = unpack_strings(*terms)
+    mask_sizes = array("I")
+    mask_sizes.frombytes(mask_counts)
+    term_sizes = array("I")
+    term_sizes.frombytes(term_counts)
+
+    chunks = []
+    mask_pos = term_pos = 0
+    for text, separator, mask_size, term_size in zip(
+        texts, separators, mask_sizes, term_sizes
+    ):
+        chunks.append(
+            Chunk(
+                text,
+                separator,
+                masks[mask_pos:mask_pos + mask_size],
+                terms[term_pos:term_pos + term_size],
+            )
+        )
+        mask_pos += mask_size
+        term_pos += term_size
+    return chunks
+
+
+def _prepare_range(shm_name, start, end, max_chars, glossary):
+    """Worker entry: prepare bytes [start, end) of a shared buffer"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        text = bytes(shm.buf[start:end]).decode("utf-8")
+    finally:
+        shm.close()
+    return _pack_chunks(_prepare_text(text, max_chars, glossary))
+
+
+def _unmask_range(packed_translations, packed_masks, mask_counts):
+    """Worker entry: unmask a batch of translated chunks"""
+    translations = unpack_strings(*packed_translations)
+    masks = unpack_strings(*packed_masks)
+    sizes = array("I")
+    sizes.frombytes(mask_counts)
+    restored = []
+    position = 0
+    for translation, size in zip(translations, sizes):
+        restored.append(unmask(translation, masks[position:position + size]))
+        position += size
+    return pack_strings(restored)
+
+
+def split_ranges(data, parts, min_size):
+    """Split UTF-8 bytes into ranges ending at paragraph boundaries"""
+    size = max(len(data) // max(parts, 1), min_size)
+    ranges = []
+    start = 0
+    while start < len(data):
+        end = start + size
+        if end >= len(data):
+            end = len(data)
+        else:
+            boundary = _BLANK_LINE_RE.search(data, end)
+            end = len(data) if boundary is None else boundary.end()
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+_pool = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def get_process_pool(workers=None):
+    """Get the shared document process pool"""
+    global _pool, _pool_workers
+    workers = workers or get_config().processing_workers or os.cpu_count() or 1
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # Spawned workers never inherit Qt state from the GUI process
+            _pool = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            _pool_workers = workers
+        return _pool
+
+
+def shutdown_process_pool():
+    """Stop pool workers, e.g. before quitting"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+def prepare_document(text, glossary=None, max_chars=None, workers=None):
+    """Split a document into masked chunks, in parallel for large inputs"""
+    config = get_config()
+    glossary = config.glossary if glossary is None else glossary
+    max_chars = max_chars or config.document_chunk_chars
+    workers = workers or config.processing_workers or os.cpu_count() or 1
+
+    if workers <= 1 or len(text) < config.process_pool_threshold:
+        chunks = [Chunk(*c) for c in _prepare_text(text, max_chars, glossary)]
+        return PreparedDocument(chunks, glossary)
+
+    data = text.encode("utf-8")
+    ranges = split_ranges(data, workers * 4, max_chars * 4)
+    shm = shared_memory.SharedMemory(create=True, size=len(data))
+    try:
+        shm.buf[:len(data)] = data
+        pool = get_process_pool(workers)
+        futures = [
+            pool.submit(_prepare_range, shm.name, start, end, max_chars, glossary)
+            for start, end in ranges
+        ]
+        chunks = []
+        for future in futures:
+            chunks.extend(_unpack_chunks(future.result()))
+    finally:
+        shm.close()
+        shm.unlink()
+    return PreparedDocument(chunks, glossary)
+
+
+def finalize_document(prepared, translations, workers=None):
+    """Unmask translated chunks and reassemble the document"""
+    config = get_config()
+    workers = workers or config.processing_workers or os.cpu_count() or 1
+    total = sum(len(t) for t in translations)
+    if workers <= 1 or total < config.process_pool_threshold:
+        return prepared.assemble(translations)
+
+    pool = get_process_pool(workers)
+    batch = max(len(translations) // (workers * 4), 1)
+    futures = []
+    for i in range(0, len(translations), batch):
+        chunks = prepared.chunks[i:i + batch]
+        masks = [m for chunk in chunks for m in chunk.masks]
+        futures.append(
+            pool.submit(
+                _unmask_range,
+                pack_strings(translations[i:i + batch]),
+                pack_strings(masks),
+                array("I", [len(chunk.masks) for chunk in chunks]).tobytes(),
+            )
+        )
+    restored = []
+    for future in futures:
+        restored.extend(unpack_strings(*future.result()))
+
+    parts = []
+    for chunk, text in zip(prepared.chunks, restored):
+        parts.append(text)
+        parts.append(chunk.separator)
+    return "".join(parts)
@@ -0,0 +1,157 @@
+"""
+Background worker draining the persistent job queue
+"""
+import threading
+import time
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from .config import get_config
+from .openai_client import (
+    APIError,
+    TruncatedResponse,
+    build_prompt,
+    build_translation_payload,
+    complete_chat,
+)
+from .scheduler import BACKGROUND
+
+# Jobs are retried with exponential backoff while offline or throttled
+MAX_ATTEMPTS = 8
+BASE_RETRY_SECONDS = 15
+MAX_RETRY_SECONDS = 15 * 60
+
+
+def is_recoverable(error):
+    """Check whether a failed job should be retried later"""
+    import requests
+
+    if isinstance(
+        error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+    ):
+        return True
+    if isinstance(error, TruncatedResponse):
+        # The same request would be cut off again
+        return False
+    if isinstance(error, APIError):
+        status = error.status_code
+        return status is None or status == 429 or status >= 500
+    return False
+
+
+def translate_job(payload, timeout=None):
+    """Translate a queued job payload, returns the translation
+
+    Texts longer than document_chunk_chars are split into segment batches
+    like documents, so no single request has to carry the whole job.
+    """
+    text = payload["text"]
+    if len(text) > get_config().document_chunk_chars:
+        return _translate_chunked(payload, timeout)
+    prompt = build_prompt(text, payload["source"], payload["target"])
+    # Queued jobs give way to anything the user is waiting for
+    return complete_chat(
+        build_translation_payload(payload["model"], prompt, stream=False),
+        BACKGROUND,
+        timeout=timeout,
+        allow_truncated=False,
+    ).strip()
+
+
+def _translate_chunked(payload, timeout):
+    from .markup import PLAIN, parse_markup
+
+    text = payload["text"]
+    document = parse_markup(text) or parse_markup(text, PLAIN)
+    model, source, target = payload["model"], payload["source"], payload["target"]
+    answers = {}
+    # Segments whose answer is missing or lost placeholders get one retry
+    for _ in range(2):
+        missing = [s for s in document.unique_segments if s.number not in answers]
+        if not missing:
+            break
+        payloads = document.build_payloads(
+            model, source, target, stream=False, segments=missing
+        )
+        answers.update(
+            document.answers(
+                [
+                    complete_chat(request, BACKGROUND, timeout=timeout)
+                    for request in payloads
+                ]
+            )
+        )
+    left = len(document.missing_segments((), answers))
+    if left:
+        raise APIError(f"{left} segments were left untranslated")
+    return document.assemble((), answers).strip()
+
+
+class QueueWorker(QThread):
+    """Thread that translates queued jobs at the configured rate"""
+
+    job_started = pyqtSignal(str)
+    job_finished = pyqtSignal(str, str)
+    job_failed = pyqtSignal(str, str)
+    queue_changed = pyqtSignal(dict)
+
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+        self._wake = threading.Event()
+        self._last_start = 0.0
+
+    def wake(self):
+        """Wake the worker after a job was submitted"""
+        self._wake.set()
+
+    def stop(self):
+        """Stop the worker, unfinished jobs stay in the queue"""
+        self.requestInterruption()
+        self._wake.set()
+
+    def _sleep(self, seconds):
+        self._wake.wait(seconds)
+        self._wake.clear()
+
+    def _throttle(self):
+        """Keep job starts under queue_requests_per_minute"""
+        rate = max(get_config().queue_requests_per_minute, 1)
+        wait = self._last_start + 60.0 / rate - time.monotonic()
+        while wait > 0 and not self.isInterruptionRequested():
+            time.sleep(min(wait, 0.5))
+            wait = self._last_start + 60.0 / rate - time.monotonic()
+        self._last_start = time.monotonic()
+
+    def run(self):
+        self.queue_changed.emit(self.queue.counts())
+        while not self.isInterruptionRequested():
+            job = self.queue.claim_next()
+            if job is None:
+                wait = self.queue.next_ready_in()
+                self._sleep(60 if wait is None else min(max(wait, 0.1), 60))
+                continue
+
+            self._throttle()
+            if self.isInterruptionRequested():
+                # Leave the job for the next start
+                self.queue.fail(job.id, "Interrupted", retry_in=0)
+                break
+
+            self.job_started.emit(job.id)
+            self.queue_changed.emit(self.queue.counts())
+            try:
+                translation = translate_job(job.payload)
+            except Exception as e:
+                if is_recoverable(e) and job.attempts < MAX_ATTEMPTS:
+                    retry_in = min(
+                        BASE_RETRY_SECONDS * 2 ** (job.attempts - 1), MAX_RETRY_SECONDS
+                    )
+                    self.queue.fail(job.id, str(e), retry_in=retry_in)
+                else:
+                    self.queue.fail(job.id, str(e))
+                    self.job_failed.emit(job.id, str(e))
+            else:
+                self.queue.complete(job.id, translation)
+                self.job_finished.emit(job.id, translation)
+            self.queue_changed.emit(self.queue.counts())
@@ -0,0 +1,628 @@
+"""
+Content-addressed store of cached request results
+
+Translations and alternatives requested through TranslateThread and
+NetworkEngine.translate() are kept by a hash of their request payload, so
+asking again costs a file read instead of an API call. Values are addressed
+by their own hash and stored once however many requests produced them.
+They are zlib-compressed with a preset dictionary trained on the stored
+texts: a short translation barely compresses on its own, the dictionary
+supplies the phrases it shares with the others. Values are read through
+a memory map, and the texts read last are kept decompressed.
+
+Files in the store directory:
+
+    values.dat   compressed values, appended
+    values.idx   32-byte records in value order: hash, offset, length, size
+    keys.idx     20-byte records sorted by key hash: hash, value number
+    keys.log     records of keys added since keys.idx was last merged
+    dict-N.bin   preset dictionaries, a value's first byte names its own
+
+The store can be inspected and compacted from the command line:
+
+    python -m app.result_store stats
+    python -m app.result_store compact
+"""
+import argparse
+import bisect
+import hashlib
+import json
+import mmap
+import os
+import re
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from pathlib import Path
+
+from .config import get_config
+
+DEFAULT_STORE_DIR = Path.home() / ".cache" / "linguagpt" / "results"
+
+HASH_SIZE = 16
+KEY_RECORD = struct.Struct(f"<{HASH_SIZE}sI")
+VALUE_RECORD = struct.Struct(f"<{HASH_SIZE}sQII")
+
+# zlib looks back 32 KB, a longer dictionary is never used
+DICTIONARY_SIZE = 32 * 1024
+# Values stored before the first dictionary is trained
+TRAIN_AFTER = 200
+# Values sampled for a dictionary, the newest ones
+TRAIN_SAMPLES = 2000
+# maintain() retrains once the store holds this many times the sampled values
+RETRAIN_GROWTH = 10
+# Keys kept in the journal before it is merged into the sorted index
+JOURNAL_LIMIT = 4096
+COMPRESSION_LEVEL = 9
+# Sorted index records per fence, lookups bisect the fences in C first
+FENCE_STRIDE = 32
+# Decompressed values kept in memory for repeated reads
+HOT_VALUES = 256
+# First byte of a value stored uncompressed
+RAW = 255
+
+# Payload fields that do not change the result
+_TRANSPORT_FIELDS = ("stream", "stream_options")
+_TOKEN_RE = re.compile(r"\S+\s*")
+
+
+def _digest(data):
+    return hashlib.blake2b(data, digest_size=HASH_SIZE).digest()
+
+
+def payload_key(payload):
+    """Store key of a chat completions payload, streamed or not"""
+    fields = {k: v for k, v in payload.items() if k not in _TRANSPORT_FIELDS}
+    return _digest(json.dumps(fields, sort_keys=True, ensure_ascii=False).encode())
+
+
+def train_dictionary(samples, size=DICTIONARY_SIZE):
+    """Preset dictionary of the phrases that repeat most across samples
+
+    Phrases are runs of one to four words with their trailing whitespace,
+    scored by the bytes they would save. The best ones go last, where zlib
+    reaches them with the shortest distances.
+    """
+    counts = Counter()
+    for text in samples:
+        tokens = _TOKEN_RE.findall(text)
+        phrases = set()
+        for length in range(1, 5):
+            for start in range(len(tokens) - length + 1):
+                phrases.add("".join(tokens[start:start + length]))
+        counts.update(phrases)
+
+    scored = sorted(
+        (
+            ((count - 1) * len(phrase.encode("utf-8")), phrase)
+            for phrase, count in counts.items()
+            if count > 1 and len(phrase) > 3
+        ),
+        reverse=True,
+    )
+    chosen = []
+    used = 0
+    for _score, phrase in scored:
+        data = phrase.encode("utf-8")
+        if used + len(data) > size:
+            break
+        chosen.append(data)
+        used += len(data)
+    return b"".join(reversed(chosen))
+
+
+def _search(records, digest, fences=()):
+    """Number stored for digest in sorted KEY_RECORD records, or None
+
+    fences holds every FENCE_STRIDE-th hash of records, a C bisection over
+    them narrows the Python one down to a single stride.
+    """
+    width = KEY_RECORD.size
+    lo, hi = 0, len(records) // width
+    if fences:
+        fence = bisect.bisect_right(fences, digest) - 1
+        if fence < 0:
+            return None
+        lo = fence * FENCE_STRIDE
+        hi = min(hi, lo + FENCE_STRIDE)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if records[mid * width:mid * width + HASH_SIZE] < digest:
+            lo = mid + 1
+        else:
+            hi = mid
+    start = lo * width
+    if records[start:start + HASH_SIZE] == digest:
+        return KEY_RECORD.unpack_from(records, start)[1]
+    return None
+
+
+class _HashIndex:
+    """Hash -> number lookups in sorted records plus recent additions"""
+
+    def __init__(self, records=b"", recent=None):
+        self.records = records
+        self.recent = recent or {}
+        step = FENCE_STRIDE * KEY_RECORD.size
+        self.fences = [
+            records[start:start + HASH_SIZE] for start in range(0, len(records), step)
+        ]
+
+    def __len__(self):
+        return len(self.records) // KEY_RECORD.size + len(self.recent)
+
+    def get(self, digest):
+        number = self.recent.get(digest)
+        if number is not None:
+            return number
+        return _search(self.records, digest, self.fences)
+
+    def merged(self):
+        """All records in one sorted array"""
+        width = KEY_RECORD.size
+        rows = [
+            self.records[start:start + width]
+            for start in range(0, len(self.records), width)
+        ]
+        rows.extend(KEY_RECORD.pack(*item) for item in self.recent.items())
+        rows.sort()
+        return b"".join(rows)
+
+    def nbytes(self):
+        """Approximate memory held by the index"""
+        hash_bytes = sys.getsizeof(b"\0" * HASH_SIZE)
+        return (
+            len(self.records)
+            + sys.getsizeof(self.recent)
+            + len(self.recent) * (hash_bytes + 28)
+            + sys.getsizeof(self.fences)
+            + len(self.fences) * hash_bytes
+        )
+
+
+def _read_records(path, record):
+    """Whole records of a file; a partial record left by a crash is cut off"""
+    try:
+        data = path.read_bytes()
+    except FileNotFoundError:
+        return b""
+    extra = len(data) % record.size
+    if extra:
+        data = data[:-extra]
+        with open(path, "r+b") as file:
+            file.truncate(len(data))
+    return data
+
+
+def _write_atomic(path, data):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class ResultStore:
+    """Compressed, deduplicated result cache in a directory, thread-safe"""
+
+    def __init__(self, directory=None):
+        self.directory = Path(directory) if directory else DEFAULT_STORE_DIR
+        # A compaction that stopped between its two renames
+        staged = self.directory.with_name(self.directory.name + ".new")
+        if staged.exists() and not self.directory.exists():
+            os.replace(staged, self.directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        self._files = {}
+        self._data = None
+        self._hot = OrderedDict()
+        self._dictionaries = {}
+        try:
+            meta = json.loads((self.directory / "store.json").read_text())
+        except (OSError, ValueError):
+            meta = {}
+        self.dictionary_id = meta.get("dictionary", 0)
+        self.trained_on = meta.get("trained_on", 0)
+
+        values = _read_records(self.directory / "values.idx", VALUE_RECORD)
+        data_path = self.directory / "values.dat"
+        data_size = data_path.stat().st_size if data_path.exists() else 0
+        # Records written after values.dat was last flushed are dropped
+        count = len(values) // VALUE_RECORD.size
+        while count:
+            _, offset, length, _ = VALUE_RECORD.unpack_from(
+                values, (count - 1) * VALUE_RECORD.size
+            )
+            if offset + length <= data_size:
+                break
+            count -= 1
+        if count * VALUE_RECORD.size < len(values):
+            values = values[:count * VALUE_RECORD.size]
+            _write_atomic(self.directory / "values.idx", values)
+        self._values = bytearray(values)
+
+        journal = {
+            key: number
+            for key, number in KEY_RECORD.iter_unpack(
+                _read_records(self.directory / "keys.log", KEY_RECORD)
+            )
+            if number < count
+        }
+        self._keys = _HashIndex(
+            _read_records(self.directory / "keys.idx", KEY_RECORD), journal
+        )
+        # Built by the first put(), lookups never need it
+        self._by_value = None
+
+    def close(self):
+        """Close open files, they are reopened on the next access"""
+        with self._lock:
+            self._close_files()
+
+    def _close_files(self):
+        if self._data is not None:
+            self._data.close()
+            self._data = None
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+
+    def _file(self, name, mode="ab"):
+        file = self._files.get((name, mode))
+        if file is None:
+            file = self._files[(name, mode)] = open(self.directory / name, mode)
+        return file
+
+    def _dictionary(self, dictionary_id):
+        dictionary = self._dictionaries.get(dictionary_id)
+        if dictionary is None:
+            path = self.directory / f"dict-{dictionary_id}.bin"
+            dictionary = self._dictionaries[dictionary_id] = path.read_bytes()
+        return dictionary
+
+    def value_count(self):
+        return len(self._values) // VALUE_RECORD.size
+
+    def __len__(self):
+        return len(self._keys)
+
+    def get(self, key):
+        """Cached text for a key from payload_key(), or None"""
+        with self._lock:
+            number = self._keys.get(key)
+            if number is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            text = self._hot.get(number)
+            if text is not None:
+                self._hot.move_to_end(number)
+                return text
+            text = self._text(number).decode("utf-8")
+            self._hot[number] = text
+            if len(self._hot) > HOT_VALUES:
+                self._hot.popitem(last=False)
+        return text
+
+    def put(self, key, text):
+        """Store text under a key, returns False if the key was known"""
+        data = text.encode("utf-8")
+        digest = _digest(data)
+        with self._lock:
+            if self._keys.get(key) is not None:
+                return False
+            if self._by_value is None:
+                self._by_value = _HashIndex(self._value_hashes())
+            number = self._by_value.get(digest)
+            if number is None:
+                number = self._append_value(digest, data)
+            self._keys.recent[key] = number
+            log = self._file("keys.log")
+            log.write(KEY_RECORD.pack(key, number))
+            log.flush()
+            if len(self._keys.recent) >= JOURNAL_LIMIT:
+                self._merge_keys()
+            if not self.dictionary_id and self.value_count() >= TRAIN_AFTER:
+                self._train()
+        return True
+
+    def _value_hashes(self):
+        """Sorted KEY_RECORD records of value hash -> value number"""
+        rows = [
+            KEY_RECORD.pack(record[0], number)
+            for number, record in enumerate(VALUE_RECORD.iter_unpack(self._values))
+        ]
+        rows.sort()
+        return b"".join(rows)
+
+    def _append_value(self, digest, data):
+        blob = self._compress(data)
+        output = self._file("values.dat")
+        output.seek(0, os.SEEK_END)
+        offset = output.tell()
+        output.write(blob)
+        output.flush()
+        record = VALUE_RECORD.pack(digest, offset, len(blob), len(data))
+        index = self._file("values.idx")
+        index.write(record)
+        index.flush()
+        self._values += record
+        number = self.value_count() - 1
+        self._by_value.recent[digest] = number
+        if len(self._by_value.recent) >= JOURNAL_LIMIT:
+            self._by_value = _HashIndex(self._by_value.merged())
+        return number
+
+    def _merge_keys(self):
+        records = self._keys.merged()
+        _write_atomic(self.directory / "keys.idx", records)
+        log = self._files.pop(("keys.log", "ab"), None)
+        if log is not None:
+            log.close()
+        (self.directory / "keys.log").unlink(missing_ok=True)
+        self._keys = _HashIndex(records)
+
+    def _read(self, number):
+        _, offset, length, _ = VALUE_RECORD.unpack_from(
+            self._values, number * VALUE_RECORD.size
+        )
+        end = offset + length
+        # Appended values are flushed before their record exists, a read
+        # past the mapped end maps the grown file again
+        if self._data is None or end > len(self._data):
+            if self._data is not None:
+                self._data.close()
+            data = self._file("values.dat", "rb")
+            self._data = mmap.mmap(data.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._data[offset:end]
+
+    def _compress(self, data, dictionary_id=None):
+        if dictionary_id is None:
+            dictionary_id = self.dictionary_id
+        if dictionary_id:
+            compressor = zlib.compressobj(
+                COMPRESSION_LEVEL,
+                zlib.DEFLATED,
+                -zlib.MAX_WBITS,
+                zdict=self._dictionary(dictionary_id),
+            )
+        else:
+            compressor = zlib.compressobj(
+                COMPRESSION_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS
+            )
+        packed = compressor.compress(data) + compressor.flush()
+        if len(packed) >= len(data):
+            return bytes([RAW]) + data
+        return bytes([dictionary_id]) + packed
+
+    @staticmethod
+    def _decompress(blob, dictionary=None):
+        if blob[0] == RAW:
+            return blob[1:]
+        if dictionary is None:
+            return zlib.decompress(blob[1:], -zlib.MAX_WBITS)
+        decompressor = zlib.decompressobj(-zlib.MAX_WBITS, zdict=dictionary)
+        return decompressor.decompress(blob[1:]) + decompressor.flush()
+
+    def _text(self, number):
+        blob = self._read(number)
+        dictionary = self._dictionary(blob[0]) if 0 < blob[0] < RAW else None
+        return self._decompress(blob, dictionary)
+
+    def _train(self):
+        """Train a dictionary on the newest values, used for new values"""
+        count = self.value_count()
+        samples = [
+            self._text(number).decode("utf-8", "replace")
+            for number in range(max(0, count - TRAIN_SAMPLES), count)
+        ]
+        dictionary = train_dictionary(samples)
+        if not dictionary:
+            return
+        dictionary_id = self.dictionary_id % (RAW - 1) + 1
+        _write_atomic(self.directory / f"dict-{dictionary_id}.bin", dictionary)
+        self._dictionaries[dictionary_id] = dictionary
+        self.dictionary_id = dictionary_id
+        self.trained_on = len(samples)
+        self._save_meta(self.directory)
+
+    def _save_meta(self, directory):
+        meta = {"dictionary": self.dictionary_id, "trained_on": self.trained_on}
+        _write_atomic(directory / "store.json", json.dumps(meta).encode())
+
+    def compact(self, max_bytes=None):
+        """Recompress every value with a freshly trained dictionary
+
+        With max_bytes, the oldest values are dropped, together with their
+        keys, until the rest takes three quarters of it. The new store is
+        written next to the old one and swapped in with two renames.
+        """
+        with self._lock:
+            keys = self._keys.merged()
+            kept = sorted({number for _, number in KEY_RECORD.iter_unpack(keys)})
+            if max_bytes is not None:
+                budget = max_bytes * 3 // 4
+                newest = []
+                for number in reversed(kept):
+                    budget -= VALUE_RECORD.unpack_from(
+                        self._values, number * VALUE_RECORD.size
+                    )[2]
+                    if budget < 0:
+                        break
+                    newest.append(number)
+                kept = newest[::-1]
+
+            texts = [self._text(number) for number in kept]
+            dictionary = train_dictionary(
+                [text.decode("utf-8", "replace") for text in texts[-TRAIN_SAMPLES:]]
+            )
+            dictionary_id = self.dictionary_id % (RAW - 1) + 1 if dictionary else 0
+
+            staged = self.directory.with_name(self.directory.name + ".new")
+            shutil.rmtree(staged, ignore_errors=True)
+            staged.mkdir(parents=True)
+            if dictionary:
+                (staged / f"dict-{dictionary_id}.bin").write_bytes(dictionary)
+                self._dictionaries[dictionary_id] = dictionary
+            renumbered = {}
+            records = bytearray()
+            with open(staged / "values.dat", "wb") as output:
+                for number, data in zip(kept, texts):
+                    blob = self._compress(data, dictionary_id)
+                    digest = VALUE_RECORD.unpack_from(
+                        self._values, number * VALUE_RECORD.size
+                    )[0]
+                    records += VALUE_RECORD.pack(
+                        digest, output.tell(), len(blob), len(data)
+                    )
+                    renumbered[number] = len(renumbered)
+                    output.write(blob)
+            (staged / "values.idx").write_bytes(records)
+            # Dropping and renumbering keeps the key order
+            (staged / "keys.idx").write_bytes(
+                b"".join(
+                    KEY_RECORD.pack(key, renumbered[number])
+                    for key, number in KEY_RECORD.iter_unpack(keys)
+                    if number in renumbered
+                )
+            )
+            self.dictionary_id = dictionary_id
+            self.trained_on = min(len(texts), TRAIN_SAMPLES)
+            self._save_meta(staged)
+
+            self._close_files()
+            retired = self.directory.with_name(self.directory.name + ".old")
+            shutil.rmtree(retired, ignore_errors=True)
+            os.replace(self.directory, retired)
+            os.replace(staged, self.directory)
+            shutil.rmtree(retired, ignore_errors=True)
+            self._load()
+
+    def maintain(self, max_bytes):
+        """Compact when over max_bytes or the dictionary is outgrown, close files"""
+        stats = self.stats()
+        if stats["stored_bytes"] > max_bytes or (
+            self.trained_on
+            and self.value_count() >= self.trained_on * RETRAIN_GROWTH
+            and self.trained_on < TRAIN_SAMPLES
+        ):
+            self.compact(max_bytes)
+        self.close()
+
+    def clear(self):
+        """Remove every cached result"""
+        with self._lock:
+            self._close_files()
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._load()
+
+    def stats(self):
+        """Disk and memory footprint"""
+        with self._lock:
+            raw = sum(record[3] for record in VALUE_RECORD.iter_unpack(self._values))
+            dictionaries = sum(
+                path.stat().st_size for path in self.directory.glob("dict-*.bin")
+            )
+            data_path = self.directory / "values.dat"
+            index_bytes = len(self._values) + len(self._keys) * KEY_RECORD.size
+            memory = len(self._values) + self._keys.nbytes()
+            memory += sum(len(d) for d in self._dictionaries.values())
+            if self._by_value is not None:
+                memory += self._by_value.nbytes()
+            memory += sum(sys.getsizeof(text) for text in self._hot.values())
+            return {
+                "keys": len(self._keys),
+                "values": self.value_count(),
+                "raw_bytes": raw,
+                "stored_bytes": data_path.stat().st_size if data_path.exists() else 0,
+                "index_bytes": index_bytes,
+                "dictionary_bytes": dictionaries,
+                "memory_bytes": memory,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_result_store():
+    """Get the shared result store, None when disabled"""
+    global _store
+    if not get_config().result_cache:
+        return None
+    with _store_lock:
+        if _store is None:
+            _store = ResultStore()
+        return _store
+
+
+def cached_result(key):
+    """Cached result for a payload_key(), None if unknown or disabled"""
+    try:
+        store = get_result_store()
+        return store.get(key) if store is not None else None
+    except OSError as e:
+        print(f"Error reading result cache: {e}")
+        return None
+
+
+def store_result(key, text):
+    """Cache a finished result under a payload_key(), if enabled"""
+    if not text:
+        return
+    try:
+        store = get_result_store()
+        if store is not None:
+            store.put(key, text)
+    except OSError as e:
+        print(f"Error writing result cache: {e}")
+
+
+def maintain():
+    """Compact the shared store if needed and close its files"""
+    if _store is None:
+        return
+    try:
+        _store.maintain(get_config().result_cache_mb * 2**20)
+    except OSError as e:
+        print(f"Error compacting result cache: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.result_store",
+        description="Inspect or compact the LinguaGPT result cache",
+    )
+    parser.add_argument("command", choices=("stats", "compact", "clear"))
+    parser.add_argument("--store", help="store directory, default in ~/.cache")
+    args = parser.parse_args(argv)
+
+    store = ResultStore(args.store)
+    if args.command == "compact":
+        store.compact(get_config().result_cache_mb * 2**20)
+    elif args.command == "clear":
+        store.clear()
+    for name, value in store.stats().items():
+        if name not in ("hits", "misses"):
+            print(f"{name:>17} {value:,}")
+    store.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
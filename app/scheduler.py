@@ -0,0 +1,409 @@
+"""
+Priority-aware admission of API requests
+
+The window's streams on the event-loop engine, TranslateThread and the
+queue worker share one scheduler and the max_concurrent_requests slots.
+Queued requests are admitted in weighted fair order: each priority class
+stamps its requests with virtual finish times that grow by 1/weight, so an
+interactive request overtakes hundreds of queued background segments while
+background work still gets its share. Background requests never take the
+last free slot (reserved_slots), so a person typing does not wait for a
+long document chunk to finish. Queue waits are recorded per class.
+
+The number of slots adapts to the endpoint (AdaptiveLimit): it grows while
+time to first token stays near its baseline and backs off on 429s, 5xx
+responses and latency inflation, like TCP congestion control.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .config import get_config
+
+INTERACTIVE = "interactive"
+ALTERNATIVES = "alternatives"
+BACKGROUND = "background"
+PRIORITIES = (INTERACTIVE, ALTERNATIVES, BACKGROUND)
+WEIGHTS = {INTERACTIVE: 16, ALTERNATIVES: 4, BACKGROUND: 1}
+STATS_WINDOW = 1000
+# Weight of a new sample in the smoothed latency inflation
+INFLATION_SMOOTHING = 0.2
+# How fast a latency baseline follows slower samples upwards
+BASELINE_DRIFT = 0.01
+
+
+class Ticket:
+    """Place of one request in the scheduler"""
+
+    __slots__ = ("priority", "start", "tag", "queued_at", "admitted_at", "state")
+
+    def __init__(self, priority, start, tag):
+        self.priority = priority
+        self.start = start
+        self.tag = tag
+        self.queued_at = time.perf_counter()
+        self.admitted_at = None
+        # queued, running, done or cancelled
+        self.state = "queued"
+
+    @property
+    def wait_seconds(self):
+        if self.admitted_at is None:
+            return time.perf_counter() - self.queued_at
+        return self.admitted_at - self.queued_at
+
+
+def _percentile(ordered, p):
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p / 100 + 0.5))]
+
+
+class AdaptiveLimit:
+    """AIMD concurrency limit driven by time to first token and overload
+
+    Every successful stream reports its time to first token. Latency is
+    compared to a baseline per priority class, since a document chunk
+    always starts slower than a short sentence. While the smoothed
+    inflation stays within tolerance and the slots are all in use, the
+    limit grows: by one per sample until the first decrease (slow start),
+    then by one per limit samples. Inflation beyond tolerance multiplies
+    the limit by backoff, a 429 or 5xx by overload_backoff. Requests
+    started under the old limit report after a decrease, so at most one
+    decrease happens per limit outcomes.
+    """
+
+    def __init__(
+        self,
+        initial=4,
+        minimum=1,
+        maximum=16,
+        tolerance=1.5,
+        backoff=0.8,
+        overload_backoff=0.5,
+    ):
+        self.minimum = max(minimum, 1)
+        self.maximum = max(maximum, self.minimum)
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.overload_backoff = overload_backoff
+        self.value = float(min(max(initial, self.minimum), self.maximum))
+        self.baselines = {}
+        self.inflation = 1.0
+        self.slow_start = True
+        self.samples = 0
+        self.increases = 0
+        self.decreases = 0
+        self.overloads = 0
+        self._since_decrease = self.maximum
+        # (perf_counter, limit) whenever the whole-slot limit changes
+        self.history = deque([(time.perf_counter(), self.limit)], maxlen=STATS_WINDOW)
+
+    @property
+    def limit(self):
+        return int(self.value)
+
+    def on_latency(self, seconds, priority=None, in_use=None):
+        """Record the time to first token of a successful request"""
+        self.samples += 1
+        self._since_decrease += 1
+        baseline = self.baselines.get(priority)
+        if baseline is None or seconds < baseline:
+            baseline = seconds
+        else:
+            baseline += (seconds - baseline) * BASELINE_DRIFT
+        self.baselines[priority] = baseline
+        ratio = seconds / baseline if baseline > 0 else 1.0
+        self.inflation += (ratio - self.inflation) * INFLATION_SMOOTHING
+
+        if self.inflation > self.tolerance:
+            self._decrease(self.backoff)
+        elif in_use is None or in_use >= self.limit:
+            # A limit that is not used says nothing about a larger one
+            step = 1.0 if self.slow_start else 1.0 / self.value
+            self._set(min(self.value + step, self.maximum))
+            self.increases += 1
+
+    def on_overload(self):
+        """Record a 429 or 5xx response"""
+        self.overloads += 1
+        self._since_decrease += 1
+        self._decrease(self.overload_backoff)
+
+    def _decrease(self, factor):
+        if self._since_decrease < self.limit:
+            return
+        self._since_decrease = 0
+        self.slow_start = False
+        self.decreases += 1
+        self._set(max(self.value * factor, self.minimum))
+
+    def _set(self, value):
+        limit = self.limit
+        self.value = value
+        if self.limit != limit:
+            self.history.append((time.perf_counter(), self.limit))
+
+    def stats(self):
+        limits = [limit for _, limit in self.history]
+        return {
+            "limit": self.limit,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "lowest": min(limits),
+            "highest": max(limits),
+            "inflation": round(self.inflation, 2),
+            "samples": self.samples,
+            "increases": self.increases,
+            "decreases": self.decreases,
+            "overloads": self.overloads,
+        }
+
+
+class RequestScheduler:
+    """Weighted fair queue in front of a number of request slots
+
+    submit() calls start(ticket) as soon as the request may run, possibly
+    from the thread that finished another request; finish() frees the slot.
+    Threads use acquire() or the slot() context manager instead. With a
+    limiter the number of slots follows the outcomes passed to observe(),
+    otherwise it is max_concurrent (max_concurrent_requests by default).
+    """
+
+    def __init__(self, max_concurrent=None, reserved_slots=1, limiter=None):
+        self._max_concurrent = max_concurrent
+        self.reserved_slots = reserved_slots
+        self.limiter = limiter
+        self._lock = threading.Lock()
+        # Priority of the slot held by the current thread, for observe()
+        self._local = threading.local()
+        self._queues = {priority: deque() for priority in PRIORITIES}
+        self._last_tag = dict.fromkeys(PRIORITIES, 0.0)
+        self._virtual_time = 0.0
+        self.running = dict.fromkeys(PRIORITIES, 0)
+        self.admitted = dict.fromkeys(PRIORITIES, 0)
+        self.waits = {
+            priority: deque(maxlen=STATS_WINDOW) for priority in PRIORITIES
+        }
+
+    @property
+    def max_concurrent(self):
+        if self.limiter is not None:
+            return self.limiter.limit
+        return max(self._max_concurrent or get_config().max_concurrent_requests, 1)
+
+    @property
+    def ceiling(self):
+        """Most slots there can ever be, e.g. for sizing connection pools"""
+        if self.limiter is not None:
+            return self.limiter.maximum
+        return self.max_concurrent
+
+    def set_limiter(self, limiter):
+        """Replace the adaptive limit, None for a fixed number of slots"""
+        with self._lock:
+            self.limiter = limiter
+            admitted = self._admit()
+        self._start(admitted)
+
+    def observe(self, latency=None, overloaded=False, priority=None):
+        """Feed the outcome of a request attempt to the adaptive limit
+
+        latency is the time to first token of a successful stream in
+        seconds, overloaded marks a 429 or 5xx response. The priority
+        defaults to that of the slot held by the calling thread.
+        """
+        if self.limiter is None:
+            return
+        if priority is None:
+            priority = getattr(self._local, "priority", None)
+        with self._lock:
+            if overloaded:
+                self.limiter.on_overload()
+            elif latency is not None:
+                self.limiter.on_latency(
+                    latency, priority, sum(self.running.values())
+                )
+            # A grown limit admits queued requests right away
+            admitted = self._admit()
+        self._start(admitted)
+
+    def submit(self, start, priority=INTERACTIVE, cost=1.0):
+        """Queue a request, start(ticket) is called once it may run"""
+        if priority not in WEIGHTS:
+            raise ValueError(f"Unknown priority: {priority}")
+        with self._lock:
+            tag = max(self._virtual_time, self._last_tag[priority])
+            tag += cost / WEIGHTS[priority]
+            self._last_tag[priority] = tag
+            ticket = Ticket(priority, start, tag)
+            self._queues[priority].append(ticket)
+            admitted = self._admit()
+        self._start(admitted)
+        return ticket
+
+    def finish(self, ticket):
+        """Free the slot of a running request, or drop a queued one"""
+        with self._lock:
+            if ticket.state == "queued":
+                # Removed lazily when it reaches the head of its queue
+                ticket.state = "cancelled"
+                return
+            if ticket.state != "running":
+                return
+            ticket.state = "done"
+            self.running[ticket.priority] -= 1
+            admitted = self._admit()
+        self._start(admitted)
+
+    cancel = finish
+
+    def acquire(self, priority=INTERACTIVE):
+        """Block until the request may run, returns its ticket"""
+        ready = threading.Event()
+        ticket = self.submit(lambda _ticket: ready.set(), priority)
+        ready.wait()
+        return ticket
+
+    @contextmanager
+    def slot(self, priority=INTERACTIVE):
+        """Hold a request slot for the duration of the with block
+
+        A thread that already holds a slot keeps using it, so layered
+        callers (the service around core.translate_stream) take one slot.
+        """
+        if getattr(self._local, "priority", None) is not None:
+            yield None
+            return
+        ticket = self.acquire(priority)
+        outer = getattr(self._local, "priority", None)
+        self._local.priority = priority
+        try:
+            yield ticket
+        finally:
+            self._local.priority = outer
+            self.finish(ticket)
+
+    def _admit(self):
+        admitted = []
+        now = time.perf_counter()
+        limit = self.max_concurrent
+        background_limit = max(limit - self.reserved_slots, 1)
+        total = sum(self.running.values())
+        while total < limit:
+            best = None
+            for priority, queue in self._queues.items():
+                while queue and queue[0].state == "cancelled":
+                    queue.popleft()
+                if not queue:
+                    continue
+                if priority == BACKGROUND and total >= background_limit:
+                    continue
+                if best is None or queue[0].tag < best.tag:
+                    best = queue[0]
+            if best is None:
+                break
+            self._queues[best.priority].popleft()
+            self._virtual_time = best.tag
+            best.state = "running"
+            best.admitted_at = now
+            self.running[best.priority] += 1
+            self.admitted[best.priority] += 1
+            self.waits[best.priority].append(now - best.queued_at)
+            total += 1
+            admitted.append(best)
+        return admitted
+
+    @staticmethod
+    def _start(admitted):
+        for ticket in admitted:
+            try:
+                ticket.start(ticket)
+            except Exception as e:
+                print(f"Error starting scheduled request: {e}")
+
+    def queued(self):
+        with self._lock:
+            return {
+                priority: sum(1 for t in queue if t.state == "queued")
+                for priority, queue in self._queues.items()
+            }
+
+    def stats(self):
+        """Per-class counts and queue wait percentiles in milliseconds"""
+        queued = self.queued()
+        with self._lock:
+            result = {}
+            for priority in PRIORITIES:
+                waits = sorted(self.waits[priority])
+                entry = {
+                    "queued": queued[priority],
+                    "running": self.running[priority],
+                    "admitted": self.admitted[priority],
+                }
+                if waits:
+                    entry["wait_ms"] = {
+                        "p50": round(_percentile(waits, 50) * 1000, 1),
+                        "p95": round(_percentile(waits, 95) * 1000, 1),
+                        "max": round(waits[-1] * 1000, 1),
+                    }
+                result[priority] = entry
+            return result
+
+    def limit_stats(self):
+        """Current slot limit and how the adaptive limit got there"""
+        with self._lock:
+            if self.limiter is None:
+                return {"limit": self.max_concurrent, "adaptive": False}
+            return dict(self.limiter.stats(), adaptive=True)
+
+    def report(self):
+        """Slot limit and one line per class with queue wait percentiles"""
+        limit = self.limit_stats()
+        if limit["adaptive"]:
+            lines = [
+                f"Concurrency limit: {limit['limit']} (range {limit['lowest']}-"
+                f"{limit['highest']}, bounds {limit['minimum']}-{limit['maximum']}; "
+                f"{limit['decreases']} decreases, {limit['overloads']} overloads, "
+                f"latency inflation {limit['inflation']})"
+            ]
+        else:
+            lines = [f"Concurrency limit: {limit['limit']} (fixed)"]
+        lines.append("Request queue wait (ms):")
+        for priority, entry in self.stats().items():
+            wait = entry.get("wait_ms")
+            waits = (
+                f"p50 {wait['p50']}  p95 {wait['p95']}  max {wait['max']}"
+                if wait
+                else "no requests"
+            )
+            lines.append(f"  {priority:<13} {waits}  ({entry['admitted']} admitted)")
+        return "\n".join(lines)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Get the scheduler shared by all API requests of the process"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            config = get_config()
+            _scheduler = RequestScheduler(limiter=_build_limiter(config))
+            config.subscribe(_on_config_changed)
+        return _scheduler
+
+
+def _build_limiter(config):
+    if not config.adaptive_concurrency:
+        return None
+    return AdaptiveLimit(
+        config.max_concurrent_requests, maximum=config.max_concurrent_ceiling
+    )
+
+
+def _on_config_changed(changed_keys):
+    keys = {"adaptive_concurrency", "max_concurrent_requests", "max_concurrent_ceiling"}
+    if changed_keys & keys and _scheduler is not None:
+        _scheduler.set_limiter(_build_limiter(get_config()))
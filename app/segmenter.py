@@ -0,0 +1,227 @@
+"""
+Rule-based multilingual sentence segmenter
+
+Finds sentence boundaries in English, Russian, Kazakh, Spanish, French,
+German, Chinese, Japanese and Korean text:
+
+    for start, end in sentence_spans(text, "Deutsch"):
+        sentence = text[start:end]
+
+Results are offsets into the original string, nothing is copied. A single
+precompiled regex finds candidate sentence ends; a candidate after a period
+is rejected for known abbreviations, initials, list numbers, ordinals (in
+languages that write them with a period) and when the next word starts in
+lower case. CJK full stops end a sentence without following whitespace.
+"""
+import functools
+import re
+
+# Shared by all languages, matched case-insensitively without the last period
+_COMMON_ABBREVIATIONS = {
+    "e.g", "i.e", "etc", "vs", "cf", "ca", "approx", "no", "nr", "fig", "vol",
+    "p", "pp", "ch", "sec", "ed", "eds", "dr", "prof", "st", "jr", "sr", "mr",
+    "mrs", "ms", "inc", "ltd", "co", "corp", "dept", "jan", "feb", "mar", "apr",
+    "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec",
+}
+# Abbreviations only when a number follows: "No. 5", "Art. 12", "стр. 3"
+NUMBER_ABBREVIATIONS = {
+    "no", "nr", "n°", "núm", "p", "pp", "pág", "págs", "vol", "fig", "ch", "chap",
+    "cap", "sec", "art", "op", "min", "max", "tel", "abs", "abb", "s", "стр",
+    "рис", "табл", "гл", "илл", "бет",
+}
+ABBREVIATIONS = {
+    "en": {
+        "a.m", "p.m", "u.s", "u.k", "mt", "ave", "blvd", "rd", "gen", "gov",
+        "sen", "rep", "rev", "lt", "col", "capt", "sgt", "est", "al", "op",
+        "e.t.c", "viz", "esp", "incl", "misc",
+    },
+    "de": {
+        "z.b", "bzw", "usw", "u.a", "d.h", "s.o", "s.u", "ggf", "evtl", "inkl",
+        "vgl", "bspw", "sog", "geb", "hr", "fr", "str", "abs", "bd", "dipl",
+        "ing", "i.d.r", "o.ä", "u.ä", "z.t", "u.u", "jh", "jhd", "mio", "mrd",
+        "tel", "zzgl", "abb", "anm", "hrsg", "ca", "s", "d",
+    },
+    "fr": {
+        "mme", "mmes", "mlle", "mgr", "cf", "env", "av", "bd",
+        "p.ex", "c.-à-d", "c.à.d", "n°", "vol", "éd", "art", "chap", "hab",
+    },
+    "es": {
+        "sr", "sra", "sres", "srta", "dra", "ud", "uds", "vd", "vds", "d", "dña",
+        "pág", "págs", "núm", "av", "avda", "c", "cía", "ee.uu", "aprox", "ej",
+        "p.ej", "ud", "etc", "art", "cap", "dto",
+    },
+    "ru": {
+        "т.е", "т.к", "т.н", "т.д", "т.п", "др", "пр", "г", "гг", "в", "вв",
+        "ул", "пер", "пл", "просп", "д", "кв", "стр", "с", "см", "рис", "табл",
+        "им", "ок", "тыс", "млн", "млрд", "руб", "коп", "проф", "акад", "доц",
+        "и.о", "т", "н.э", "гл", "илл", "напр", "прим", "ред", "изд",
+        "обл", "р-н", "гос", "сокр", "англ", "нем", "франц", "лат", "греч",
+        "мин", "сек", "ч", "кг", "км", "ст", "тел", "т.ч", "т.о",
+    },
+    "kk": {
+        "т.б", "т.с.с", "б.з.б", "ж", "жж", "ғ", "ғғ", "көш", "к", "қ", "обл",
+        "млн", "млрд", "мың", "ш", "шақ", "а", "бет", "т.с", "проф", "акад",
+        "ауд", "см", "мыс",
+    },
+}
+# The Kazakh texts quote Russian abbreviations freely
+ABBREVIATIONS["kk"] |= ABBREVIATIONS["ru"]
+
+# Languages writing ordinal numbers with a period: "am 3. Oktober"
+ORDINAL_PERIOD_LANGUAGES = {"de", "da", "no", "nb", "fi", "cs", "sk", "pl", "hu", "tr"}
+# Abbreviations that may also end a sentence when a capital follows
+SENTENCE_FINAL_ABBREVIATIONS = {"etc", "usw", "т.д", "т.п", "др", "т.б", "т.с.с"}
+
+_TERMINATORS = ".!?…‽"
+_CLOSERS = "\"'»”’)\\]}"
+_CJK_CLOSERS = "」』”’）】〉》〕\"'"
+_OPENERS = "\"'«“‘([{¡¿"
+# A sentence never continues with a lower case letter, nor with a dash
+# after a closing quote: "«Ты придёшь?» — спросила она."
+_LOWER = "a-zß-öø-ÿа-яёіїєґәғқңөұүһ"
+# Candidate sentence ends: western punctuation followed by whitespace, CJK
+# full stops with optional whitespace, or a blank line. Periods after a
+# short word are marked as suspect and checked against the abbreviations in
+# Python; all other candidates are decided by the regex alone.
+_BREAK_RE = (
+    rf"(?:\.{{suspect}}(?P<suspect>)|[{_TERMINATORS}])[{_TERMINATORS}]*"
+    rf"(?:[{_CLOSERS}]+(?=\s+[^\s—–])|(?=\s))(?P<space>\s+)(?![\s{_LOWER}])"
+    rf"|[。！？｡．]+[{_CJK_CLOSERS}]*(?P<cjk>\s*)"
+    r"|(?P<paragraph>\n[ \t\r]*\n\s*)"
+)
+_LINE_BREAK_RE = r"|(?P<line>\n\s*)"
+# How far back an abbreviation is looked for
+MAX_TOKEN = 24
+
+
+def _language_code(language):
+    if not language:
+        return ""
+    from .translation_memory import language_code
+
+    return language_code(language)
+
+
+class _Rules:
+    """Precompiled boundary rules of one language"""
+
+    def __init__(self, code, line_breaks):
+        if code in ABBREVIATIONS:
+            self.abbreviations = frozenset(_COMMON_ABBREVIATIONS | ABBREVIATIONS[code])
+        else:
+            # Unknown or "Auto": every table, wrong splits hurt more than missed ones
+            self.abbreviations = frozenset(
+                _COMMON_ABBREVIATIONS.union(*ABBREVIATIONS.values())
+            )
+        self.ordinals = code in ORDINAL_PERIOD_LANGUAGES
+
+        # A period after a word longer than every abbreviation is decided by
+        # the regex alone; a lookbehind per abbreviation would be slower
+        longest = max(
+            len(word) for word in self.abbreviations | NUMBER_ABBREVIATIONS
+            if word.isalpha()
+        )
+        breaks = _BREAK_RE.replace("{suspect}", rf"(?<![^\W_]{{{longest + 1}}}\.)")
+        # The lookahead lets the scan skip to the next possible sentence end
+        self.pattern = re.compile(
+            rf"(?=[{_TERMINATORS}。！？｡．\n])(?:{breaks}"
+            + (_LINE_BREAK_RE if line_breaks else "")
+            + ")"
+        )
+
+    def ends_sentence(self, text, start, nxt, pos):
+        """Whether the period at start ends a sentence, nxt is the next word"""
+        low = start - MAX_TOKEN if start - MAX_TOKEN > pos else pos
+        space = text.rfind(" ", low, start)
+        if space < 0 and low > pos:
+            # Longer than any abbreviation
+            return True
+        token = text[space + 1 if space >= 0 else pos:start]
+        if not token.isprintable():
+            # Split by a line break or tab rather than a space
+            token = token.rsplit(None, 1)[-1] if token.strip() else ""
+        if not token:
+            return True
+        word = token.lstrip(_OPENERS).lower()
+        if word in self.abbreviations:
+            return word in SENTENCE_FINAL_ABBREVIATIONS and text[nxt:nxt + 1].isupper()
+        if word in NUMBER_ABBREVIATIONS:
+            return not text[nxt:nxt + 1].isdigit()
+        if word.isdigit():
+            # "1. Item" at a line start, "3. Oktober", but not "in 2019."
+            token_start = start - len(token)
+            at_line_start = token_start == pos or text[token_start - 1] == "\n"
+            return not (at_line_start or self.ordinals and len(word) <= 3)
+        if len(word) == 1:
+            # Initials: "J. R. R. Tolkien", "А. С. Пушкин"
+            return not text[start - 1].isupper()
+        if "-" in word:
+            # "Dipl.-Ing." is checked by its last part
+            return word.rsplit("-", 1)[-1] not in self.abbreviations
+        return True
+
+
+@functools.lru_cache(maxsize=None)
+def _rules(language, line_breaks):
+    return _Rules(_language_code(language), line_breaks)
+
+
+def sentence_breaks(text, language=None, pos=0, endpos=None, line_breaks=False):
+    """Yield (end, next_start) offsets between the sentences of text[pos:endpos]
+
+    end is where a sentence stops (after its punctuation and closing quotes),
+    next_start where the next one begins; the whitespace between them is
+    text[end:next_start]. A blank line always ends a sentence, a single line
+    break only with line_breaks.
+    """
+    rules = _rules(language, line_breaks)
+    ends_sentence = rules.ends_sentence
+    if endpos is None:
+        endpos = len(text)
+    for match in rules.pattern.finditer(text, pos, endpos):
+        kind = match.lastgroup
+        end, nxt = match.span(kind)
+        if nxt >= endpos:
+            return
+        if kind == "space":
+            if match.start("suspect") >= 0 and not ends_sentence(
+                text, match.start(), nxt, pos
+            ):
+                # An abbreviation before a blank line still ends the paragraph
+                newlines = text.count("\n", end, nxt)
+                if newlines < 2 and not (line_breaks and newlines):
+                    continue
+        elif kind != "cjk":
+            # Line break, the spaces before it do not belong to the sentence
+            while end > pos and text[end - 1] in " \t\r":
+                end -= 1
+        yield end, nxt
+
+
+def sentence_spans(text, language=None, pos=0, endpos=None, line_breaks=False):
+    """Yield (start, end) of each sentence without surrounding whitespace"""
+    if endpos is None:
+        endpos = len(text)
+    start = pos
+    for end, nxt in sentence_breaks(text, language, pos, endpos, line_breaks):
+        while start < end and text[start].isspace():
+            start += 1
+        if end > start:
+            yield start, end
+        start = nxt
+    # Leading and trailing whitespace of the whole range is not a sentence
+    while start < endpos and text[start].isspace():
+        start += 1
+    end = endpos
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    if end > start:
+        yield start, end
+
+
+def split_sentences(text, language=None, line_breaks=False):
+    """List of the sentences of text"""
+    return [
+        text[start:end]
+        for start, end in sentence_spans(text, language, line_breaks=line_breaks)
+    ]
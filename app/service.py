@@ -0,0 +1,452 @@
+"""
+Local HTTP translation service
+
+Runs the translation core behind a localhost API so other tools share the
+app's settings, API keys, pooled connections, translation cache and
+translation memory:
+
+    POST /translate  {"text", "target", "source"?, "model"?, "stream"?}
+    GET  /stats      latency percentiles and queue state
+    GET  /health
+
+Connections are handled by lightweight threads that only wait on their
+job; the upstream requests run in a bounded worker pool, each holding a
+slot of the app's adaptive request scheduler. Queued jobs are taken
+round-robin per client (X-Client-Id header, else peer address), so one
+busy client cannot starve the others.
+"""
+import hashlib
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from .config import get_config
+from .core import Rewind, translate_stream
+from .openai_client import APIError
+from .scheduler import INTERACTIVE, get_scheduler
+from .translation_memory import recall
+
+DEFAULT_SOURCE = "Auto"
+MAX_QUEUED_PER_CLIENT = 64
+MAX_BODY_BYTES = 1024 * 1024
+CACHE_ENTRIES = 2048
+STATS_WINDOW = 1000
+
+
+class ServiceJob:
+    """Translation request waiting for or running in the worker pool"""
+
+    def __init__(self, client, payload, stream):
+        self.client = client
+        self.payload = payload
+        self.stream = stream
+        self.events = queue.Queue()
+        self.cancelled = False
+        self.submitted = time.perf_counter()
+        self.started = None
+        self.first_token = None
+
+    def cancel(self):
+        """Client went away, stop spending tokens on it"""
+        self.cancelled = True
+
+
+class FairScheduler:
+    """Per-client FIFO queues served round-robin"""
+
+    def __init__(self, max_per_client=MAX_QUEUED_PER_CLIENT):
+        self.max_per_client = max_per_client
+        self._queues = {}
+        self._order = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+    def submit(self, job):
+        """Queue a job, returns False if its client has too many queued"""
+        with self._condition:
+            client_queue = self._queues.get(job.client)
+            if client_queue is None:
+                client_queue = self._queues[job.client] = deque()
+                self._order.append(job.client)
+            elif len(client_queue) >= self.max_per_client:
+                return False
+            client_queue.append(job)
+            self._condition.notify()
+            return True
+
+    def get(self):
+        """Take the next job in client rotation, None once closed"""
+        with self._condition:
+            while not self._order and not self._closed:
+                self._condition.wait()
+            if self._closed:
+                return None
+            client = self._order.popleft()
+            client_queue = self._queues[client]
+            job = client_queue.popleft()
+            if client_queue:
+                self._order.append(client)
+            else:
+                del self._queues[client]
+            return job
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def queued(self):
+        with self._condition:
+            return sum(len(q) for q in self._queues.values())
+
+    def clients(self):
+        with self._condition:
+            return len(self._queues)
+
+
+def _percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return {
+        f"p{p}": round(ordered[min(last, int(last * p / 100 + 0.5))] * 1000, 1)
+        for p in (50, 90, 99)
+    }
+
+
+class LatencyStats:
+    """Rolling latency percentiles of recent requests, in milliseconds"""
+
+    def __init__(self, window=STATS_WINDOW):
+        self._lock = threading.Lock()
+        self._queue_wait = deque(maxlen=window)
+        self._first_token = deque(maxlen=window)
+        self._total = deque(maxlen=window)
+        self.completed = 0
+        self.failed = 0
+        self.cache_hits = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.started_at = time.time()
+
+    def job_started(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def job_finished(self, job, ok):
+        now = time.perf_counter()
+        with self._lock:
+            self.in_flight -= 1
+            if not ok:
+                self.failed += 1
+                return
+            self.completed += 1
+            self._queue_wait.append(job.started - job.submitted)
+            if job.first_token is not None:
+                self._first_token.append(job.first_token - job.submitted)
+            self._total.append(now - job.submitted)
+
+    def record_cache_hit(self, seconds):
+        with self._lock:
+            self.cache_hits += 1
+            self._total.append(seconds)
+
+    def record_rejected(self):
+        with self._lock:
+            self.rejected += 1
+
+    def snapshot(self):
+        """Current counters and percentiles"""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started_at, 1),
+                "completed": self.completed,
+                "failed": self.failed,
+                "cache_hits": self.cache_hits,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "queue_wait_ms": _percentiles(self._queue_wait),
+                "first_token_ms": _percentiles(self._first_token),
+                "total_ms": _percentiles(self._total),
+            }
+
+
+class TranslationCache:
+    """In-memory LRU of finished translations"""
+
+    def __init__(self, max_entries=CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, source, target, text):
+        data = json.dumps([model, source, target, text], ensure_ascii=False)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class TranslationService(ThreadingHTTPServer):
+    """HTTP server with a bounded pool of upstream workers"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, address, workers=None):
+        super().__init__(address, _Handler)
+        self.scheduler = FairScheduler()
+        self.stats = LatencyStats()
+        self.cache = TranslationCache()
+        # The request scheduler decides how many of them send at once
+        workers = workers or get_scheduler().ceiling
+        self.workers = [
+            threading.Thread(target=self._work, name=f"service-worker-{i}", daemon=True)
+            for i in range(max(workers, 1))
+        ]
+        for worker in self.workers:
+            worker.start()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def server_close(self):
+        self.scheduler.close()
+        super().server_close()
+
+    def _work(self):
+        while True:
+            job = self.scheduler.get()
+            if job is None:
+                return
+            if job.cancelled:
+                continue
+            with get_scheduler().slot(INTERACTIVE):
+                job.started = time.perf_counter()
+                self.stats.job_started()
+                ok = False
+                try:
+                    ok = self._run(job)
+                except APIError as e:
+                    job.events.put(("error", e.message, e.status_code))
+                except Exception as e:
+                    job.events.put(("error", str(e), None))
+                finally:
+                    self.stats.job_finished(job, ok)
+
+    def _run(self, job):
+        """Stream one translation into the job's events"""
+        get_config().reload_if_changed()
+        payload = job.payload
+
+        translation = ""
+        deltas = translate_stream(
+            payload["text"], payload["target"], payload["source"], payload["model"]
+        )
+        try:
+            for delta in deltas:
+                if job.cancelled:
+                    return False
+                if job.first_token is None:
+                    job.first_token = time.perf_counter()
+                if isinstance(delta, Rewind):
+                    # A resumed stream may drop its unfinished sentence
+                    translation = translation[: len(translation) - delta]
+                    if job.stream:
+                        job.events.put(("rewind", int(delta)))
+                else:
+                    translation += delta
+                    if job.stream:
+                        job.events.put(("delta", delta))
+        finally:
+            deltas.close()
+
+        translation = translation.strip()
+        self.cache.put(payload["cache_key"], translation)
+        job.events.put(("done", translation))
+        return True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "LinguaGPT"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            server = self.server
+            stats = server.stats.snapshot()
+            stats.update(
+                queued=server.scheduler.queued(),
+                waiting_clients=server.scheduler.clients(),
+                workers=len(server.workers),
+                concurrency=get_scheduler().limit_stats(),
+                cache_entries=len(server.cache),
+            )
+            self._send_json(200, stats)
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        if self.path != "/translate":
+            self._send_json(404, {"error": "Not found"})
+            return
+        started = time.perf_counter()
+        try:
+            request = self._read_json()
+            text = request["text"]
+            target = request["target"]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"Bad request: {e}"})
+            return
+        if not isinstance(text, str) or not text.strip():
+            self._send_json(400, {"error": "Bad request: empty text"})
+            return
+
+        model = request.get("model") or get_config().model
+        source = request.get("source") or DEFAULT_SOURCE
+        for name, value in (("target", target), ("source", source), ("model", model)):
+            if not isinstance(value, str) or not value.strip():
+                self._send_json(
+                    400, {"error": f"Bad request: {name} must be a string"}
+                )
+                return
+
+        server = self.server
+        stream = bool(request.get("stream"))
+        cache_key = TranslationCache.make_key(model, source, target, text)
+
+        cached = server.cache.get(cache_key)
+        if cached is None:
+            cached = recall(text, source, target)
+            if cached is not None:
+                server.cache.put(cache_key, cached)
+        if cached is not None:
+            server.stats.record_cache_hit(time.perf_counter() - started)
+            if stream:
+                self._start_stream()
+                self._send_event({"delta": cached})
+                self._send_event({"done": True, "translation": cached, "cached": True})
+            else:
+                self._send_json(200, {"translation": cached, "cached": True})
+            return
+
+        client = self.headers.get("X-Client-Id") or self.client_address[0]
+        payload = {
+            "text": text,
+            "source": source,
+            "target": target,
+            "model": model,
+            "cache_key": cache_key,
+        }
+        job = ServiceJob(client, payload, stream)
+        if not server.scheduler.submit(job):
+            server.stats.record_rejected()
+            self._send_json(
+                429, {"error": "Too many queued requests"}, {"Retry-After": "1"}
+            )
+            return
+
+        try:
+            if stream:
+                self._relay_stream(job)
+            else:
+                self._relay_result(job)
+        except (BrokenPipeError, ConnectionResetError):
+            job.cancel()
+
+    def _relay_result(self, job):
+        event = job.events.get()
+        while event[0] not in ("done", "error"):
+            event = job.events.get()
+        if event[0] == "done":
+            self._send_json(200, {"translation": event[1], "cached": False})
+        else:
+            self._send_json(502, {"error": event[1], "status": event[2]})
+
+    def _relay_stream(self, job):
+        self._start_stream()
+        while True:
+            event = job.events.get()
+            kind = event[0]
+            if kind == "delta":
+                self._send_event({"delta": event[1]})
+            elif kind == "rewind":
+                self._send_event({"rewind": event[1]})
+            elif kind == "done":
+                self._send_event({"done": True, "translation": event[1], "cached": False})
+                return
+            else:
+                self._send_event({"error": event[1], "status": event[2]})
+                return
+
+    def _read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length > MAX_BODY_BYTES:
+            raise ValueError("body too large")
+        request = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(request, dict):
+            raise ValueError("expected a JSON object")
+        return request
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _start_stream(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        # The end of the stream is marked by closing the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+    def _send_event(self, event):
+        data = json.dumps(event, ensure_ascii=False)
+        self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def serve(port=None, host="127.0.0.1", workers=None):
+    """Run the service until interrupted"""
+    port = get_config().service_port if port is None else port
+    server = TranslationService((host, port), workers=workers)
+    print(f"LinguaGPT service on {server.url} with {len(server.workers)} workers")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
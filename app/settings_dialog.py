@@ -8,17 +8,20 @@ from PyQt6.QtWidgets import (
     QButtonGroup,
     QComboBox,
     QDialog,
+    QFileDialog,
     QHBoxLayout,
     QLabel,
     QLineEdit,
     QMessageBox,
+    QPlainTextEdit,
     QPushButton,
     QRadioButton,
     QVBoxLayout,
 )
 
-from .config import Config
-from .translations import get_translation
+from .config import get_config
+from .translation_memory import LANGUAGE_CODES
+from .translations import TRANSLATIONS, get_translation
 
 
 class SettingsDialog(QDialog):
@@ -27,9 +30,10 @@ class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.parent_window = parent
-        self.config = Config()
+        self.config = get_config()
         self.setWindowTitle("" + parent.t("settings"))
-        self.setFixedSize(500, 650)
+        self.setFixedSize(500, 860)
+        self.memory_thread = None
         self.setup_ui()
         self.load_settings()
 
@@ -63,6 +67,32 @@ class SettingsDialog(QDialog):
         """)
         layout.addWidget(self.api_key_input)
 
+        # Additional API keys for the key pool
+        self.api_keys_label = QLabel(self.parent_window.t("api_keys_label"))
+        self.api_keys_label.setFont(QFont("Segoe UI", 10))
+        self.api_keys_label.setWordWrap(True)
+        layout.addWidget(self.api_keys_label)
+
+        self.api_keys_input = QPlainTextEdit()
+        self.api_keys_input.setPlaceholderText(
+            self.parent_window.t("api_keys_placeholder")
+        )
+        self.api_keys_input.setFont(QFont("Segoe UI", 10))
+        self.api_keys_input.setFixedHeight(90)
+        self.api_keys_input.setStyleSheet("""
+            QPlainTextEdit {
+                padding: 8px;
+                border: 2px solid #3a3a5c;
+                border-radius: 8px;
+                background: #2a2a4a;
+                color: white;
+            }
+            QPlainTextEdit:focus {
+                border: 2px solid #e94560;
+            }
+        """)
+        layout.addWidget(self.api_keys_input)
+
         # UI Language selection
         self.ui_lang_label = QLabel(self.parent_window.t("ui_language_label"))
         self.ui_lang_label.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
@@ -71,6 +101,11 @@ class SettingsDialog(QDialog):
         self.ui_lang_combo = QComboBox()
         self.ui_lang_combo.addItem("English", "en")
         self.ui_lang_combo.addItem("Русский", "ru")
+        # Languages added to the catalog by python -m app.localize
+        names = {code: name for name, code in LANGUAGE_CODES.items()}
+        for code in TRANSLATIONS:
+            if code not in ("en", "ru"):
+                self.ui_lang_combo.addItem(names.get(code, code), code)
         self.ui_lang_combo.setFont(QFont("Segoe UI", 10))
         self.ui_lang_combo.setStyleSheet("""
             QComboBox {
@@ -121,6 +156,43 @@ class SettingsDialog(QDialog):
         # Set model texts
         self.update_model_texts()
 
+        # Translation memory import/export
+        self.memory_label = QLabel(self.parent_window.t("memory_label"))
+        self.memory_label.setFont(QFont("Segoe UI", 12, QFont.Weight.Bold))
+        layout.addWidget(self.memory_label)
+
+        memory_layout = QHBoxLayout()
+        memory_button_style = """
+            QPushButton {
+                background: #3a3a5c;
+                color: white;
+                border: none;
+                padding: 8px 20px;
+                border-radius: 6px;
+            }
+            QPushButton:hover {
+                background: #4a4a6c;
+            }
+            QPushButton:disabled {
+                color: #8a8aa0;
+            }
+        """
+        self.memory_import_btn = QPushButton(self.parent_window.t("memory_import"))
+        self.memory_export_btn = QPushButton(self.parent_window.t("memory_export"))
+        for button in (self.memory_import_btn, self.memory_export_btn):
+            button.setFont(QFont("Segoe UI", 9))
+            button.setCursor(Qt.CursorShape.PointingHandCursor)
+            button.setStyleSheet(memory_button_style)
+            memory_layout.addWidget(button)
+        self.memory_import_btn.clicked.connect(self.import_memory)
+        self.memory_export_btn.clicked.connect(self.export_memory)
+        layout.addLayout(memory_layout)
+
+        self.memory_status = QLabel()
+        self.memory_status.setFont(QFont("Segoe UI", 9))
+        self.memory_status.setStyleSheet("color: #a0a0c0;")
+        layout.addWidget(self.memory_status)
+
         layout.addStretch()
 
         # Delete key button
@@ -187,8 +259,16 @@ class SettingsDialog(QDialog):
 
     def load_settings(self):
         """Load settings"""
-        self.config.load()
         self.api_key_input.setText(self.config.api_key)
+        # The pool keys as saved, whether or not the primary key is set
+        lines = []
+        for entry in self.config.api_keys or []:
+            if isinstance(entry, str):
+                entry = {"key": entry}
+            key = (entry.get("key") or "").strip()
+            if key:
+                lines.append(f"{key} {entry.get('organization') or ''}".strip())
+        self.api_keys_input.setPlainText("\n".join(lines))
         model = self.config.model
         ui_lang = self.config.ui_language
 
@@ -220,8 +300,15 @@ class SettingsDialog(QDialog):
         self.api_key_input.setPlaceholderText(
             self.parent_window.t("api_key_placeholder")
         )
+        self.api_keys_label.setText(self.parent_window.t("api_keys_label"))
+        self.api_keys_input.setPlaceholderText(
+            self.parent_window.t("api_keys_placeholder")
+        )
         self.ui_lang_label.setText(self.parent_window.t("ui_language_label"))
         self.model_label.setText(self.parent_window.t("select_model"))
+        self.memory_label.setText(self.parent_window.t("memory_label"))
+        self.memory_import_btn.setText(self.parent_window.t("memory_import"))
+        self.memory_export_btn.setText(self.parent_window.t("memory_export"))
         self.delete_key_btn.setText(self.parent_window.t("delete_key"))
         self.save_btn.setText(self.parent_window.t("save"))
         self.cancel_btn.setText(self.parent_window.t("cancel"))
@@ -276,7 +363,12 @@ class SettingsDialog(QDialog):
 
         ui_language = self.ui_lang_combo.currentData()
 
-        self.config.save(api_key=api_key, model=model, ui_language=ui_language)
+        self.config.save(
+            api_key=api_key,
+            model=model,
+            ui_language=ui_language,
+            api_keys=self.parse_api_keys(),
+        )
 
         QMessageBox.information(
             self,
@@ -285,6 +377,69 @@ class SettingsDialog(QDialog):
         )
         self.accept()
 
+    def parse_api_keys(self):
+        """Parse additional API keys, one "key [organization]" per line"""
+        api_keys = []
+        for line in self.api_keys_input.toPlainText().splitlines():
+            parts = line.split()
+            if parts:
+                api_keys.append(
+                    {"key": parts[0], "organization": parts[1] if len(parts) > 1 else ""}
+                )
+        return api_keys
+
+    def import_memory(self):
+        """Import a TMX or CSV file into the translation memory"""
+        path, _ = QFileDialog.getOpenFileName(
+            self,
+            self.parent_window.t("memory_import"),
+            "",
+            "Translation memory (*.tmx *.csv)",
+        )
+        if path:
+            self.start_memory_transfer(path, export=False)
+
+    def export_memory(self):
+        """Export the translation memory to a TMX or CSV file"""
+        path, _ = QFileDialog.getSaveFileName(
+            self,
+            self.parent_window.t("memory_export"),
+            "translation_memory.tmx",
+            "TMX (*.tmx);;CSV (*.csv)",
+        )
+        if path:
+            self.start_memory_transfer(path, export=True)
+
+    def start_memory_transfer(self, path, export):
+        """Run an import or export in the background"""
+        from .memory_transfer_thread import MemoryTransferThread
+
+        self.memory_import_btn.setEnabled(False)
+        self.memory_export_btn.setEnabled(False)
+        # Owned by the main window, so closing the dialog leaves it running
+        self.memory_thread = MemoryTransferThread(path, export, self.parent_window)
+        self.memory_thread.progress.connect(self.on_memory_progress)
+        self.memory_thread.finished.connect(self.on_memory_done)
+        self.memory_thread.error.connect(self.on_memory_error)
+        self.memory_thread.start()
+
+    def on_memory_progress(self, count):
+        self.memory_status.setText(
+            self.parent_window.t("memory_units").format(count=f"{count:,}")
+        )
+
+    def on_memory_done(self, count):
+        key = "memory_exported" if self.memory_thread.export else "memory_imported"
+        self.memory_import_btn.setEnabled(True)
+        self.memory_export_btn.setEnabled(True)
+        self.memory_status.setText(self.parent_window.t(key).format(count=f"{count:,}"))
+
+    def on_memory_error(self, error):
+        self.memory_import_btn.setEnabled(True)
+        self.memory_export_btn.setEnabled(True)
+        self.memory_status.clear()
+        QMessageBox.critical(self, self.parent_window.t("memory_error"), error)
+
     def delete_api_key(self):
         """Delete API key"""
         reply = QMessageBox.question(
@@ -296,15 +451,11 @@ class SettingsDialog(QDialog):
         )
 
         if reply == QMessageBox.StandardButton.Yes:
-            self.config.delete()
+            # Only the keys, the other settings share the file and stay
+            self.config.save(api_key="", api_keys=[])
 
             self.api_key_input.clear()
-
-            # Clear model selection
-            for btn in self.model_group.buttons():
-                btn.setAutoExclusive(False)
-                btn.setChecked(False)
-                btn.setAutoExclusive(True)
+            self.api_keys_input.clear()
 
             QMessageBox.information(
                 self, self.parent_window.t("done"), self.parent_window.t("deleted")
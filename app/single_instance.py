@@ -0,0 +1,103 @@
+"""
+Single-instance enforcement over a local socket
+
+The first launch listens on a per-user QLocalServer. Later launches send
+their request (show, translate text, open settings) as one JSON line to it
+and exit without creating a QApplication or importing the GUI.
+"""
+import getpass
+import hashlib
+import json
+
+from PyQt6.QtCore import QObject, pyqtSignal
+from PyQt6.QtNetwork import QAbstractSocket, QLocalServer, QLocalSocket
+
+CONNECT_TIMEOUT_MS = 200
+WRITE_TIMEOUT_MS = 2000
+
+
+def server_name():
+    """Per-user socket name, so users on one machine do not collide"""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "default"
+    digest = hashlib.sha1(user.encode("utf-8")).hexdigest()[:12]
+    return f"linguagpt-{digest}"
+
+
+def encode_message(message):
+    return json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n"
+
+
+def send_to_running_instance(message, name=None):
+    """Hand the message to a running instance, returns False if none"""
+    socket = QLocalSocket()
+    socket.connectToServer(name or server_name())
+    if not socket.waitForConnected(CONNECT_TIMEOUT_MS):
+        return False
+    socket.write(encode_message(message))
+    delivered = socket.waitForBytesWritten(WRITE_TIMEOUT_MS)
+    socket.disconnectFromServer()
+    if socket.state() != QLocalSocket.LocalSocketState.UnconnectedState:
+        socket.waitForDisconnected(WRITE_TIMEOUT_MS)
+    return delivered
+
+
+class InstanceServer(QObject):
+    """Receives requests from later launches of the app"""
+
+    message_received = pyqtSignal(dict)
+
+    def __init__(self, parent=None, name=None):
+        super().__init__(parent)
+        self.name = name or server_name()
+        self.server = QLocalServer(self)
+        self.server.newConnection.connect(self._on_new_connection)
+        self._buffers = {}
+
+    def listen(self):
+        """Start listening, returns False if another instance owns the name"""
+        if self.server.listen(self.name):
+            return True
+        if self.server.serverError() == QAbstractSocket.SocketError.AddressInUseError:
+            # A live owner would have answered; this is a stale socket file
+            if send_to_running_instance({"action": "ping"}, self.name):
+                return False
+            QLocalServer.removeServer(self.name)
+            if self.server.listen(self.name):
+                return True
+        print(f"Error starting instance server: {self.server.errorString()}")
+        return False
+
+    def close(self):
+        self.server.close()
+
+    def _on_new_connection(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            self._buffers[socket] = b""
+            socket.readyRead.connect(lambda s=socket: self._on_ready_read(s))
+            socket.disconnected.connect(lambda s=socket: self._on_disconnected(s))
+
+    def _on_ready_read(self, socket):
+        self._buffers[socket] += bytes(socket.readAll())
+        while b"\n" in self._buffers[socket]:
+            line, self._buffers[socket] = self._buffers[socket].split(b"\n", 1)
+            self._dispatch(line)
+
+    def _on_disconnected(self, socket):
+        self._on_ready_read(socket)
+        leftover = self._buffers.pop(socket, b"")
+        if leftover.strip():
+            self._dispatch(leftover)
+        socket.deleteLater()
+
+    def _dispatch(self, line):
+        try:
+            message = json.loads(line.decode("utf-8"))
+        except ValueError as e:
+            print(f"Error reading instance message: {e}")
+            return
+        if isinstance(message, dict) and message.get("action") != "ping":
+            self.message_received.emit(message)
@@ -0,0 +1,59 @@
+"""
+Cold start timing for --profile-startup
+"""
+import os
+import sys
+import time
+
+_START = time.perf_counter()
+
+
+def _process_age():
+    """Seconds since the process was created, None where unknown"""
+    try:
+        with open(f"/proc/{os.getpid()}/stat") as f:
+            # Field 22 is the start time in clock ticks since boot
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupTrace:
+    """Records named phases relative to interpreter start"""
+
+    def __init__(self):
+        self.enabled = False
+        self.phases = []
+        # Time spent before this module was imported (interpreter, site)
+        age = _process_age()
+        self.offset = max(age - (time.perf_counter() - _START), 0) if age else 0.0
+
+    def mark(self, phase):
+        """Record the end of a startup phase"""
+        if self.enabled:
+            self.phases.append((phase, time.perf_counter() - _START))
+
+    def report(self, stream=None):
+        """Print phase durations and the cumulative time"""
+        stream = stream or sys.stderr
+        print("Startup profile (ms):", file=stream)
+        if self.offset:
+            print(f"  {'interpreter start':<28}{self.offset * 1000:8.1f}", file=stream)
+        previous = 0.0
+        for phase, elapsed in self.phases:
+            print(
+                f"  {phase:<28}{(elapsed - previous) * 1000:8.1f}"
+                f"  total {(self.offset + elapsed) * 1000:8.1f}",
+                file=stream,
+            )
+            previous = elapsed
+
+    def total(self):
+        """Seconds from process start to the last recorded phase"""
+        return self.offset + (self.phases[-1][1] if self.phases else 0.0)
+
+
+trace = StartupTrace()
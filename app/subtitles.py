@@ -0,0 +1,284 @@
+"""
+SRT and WebVTT subtitle translation
+
+Only cue text goes to the model: cue numbers, timings, VTT settings and
+header blocks are kept aside and put back unchanged. Cues are sent in
+batches of numbered lines with a few neighbouring cues as read-only
+context, and the batches are translated concurrently.
+"""
+import functools
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from .config import get_config
+from .openai_client import (
+    LINE_BREAK,
+    build_batch_prompt as build_numbered_prompt,
+    build_prompt,
+    build_translation_payload,
+    complete_chat,
+    estimate_tokens,
+    parse_numbered_lines,
+)
+from .processing import deduplicate, log_savings, savings_report
+from .scheduler import BACKGROUND
+
+SRT = "srt"
+VTT = "vtt"
+
+_TIMING_RE = re.compile(
+    r"^\s*(?:\d+:)?\d{1,2}:\d{2}[,.]\d{3}\s*-->\s*(?:\d+:)?\d{1,2}:\d{2}[,.]\d{3}"
+)
+_BLOCK_SEPARATOR_RE = re.compile(r"\n[ \t]*\n")
+
+
+class Cue:
+    """Subtitle cue, everything but its text is kept verbatim"""
+
+    __slots__ = ("number", "identifier", "timing", "text")
+
+    def __init__(self, number, identifier, timing, text):
+        self.number = number
+        self.identifier = identifier
+        self.timing = timing
+        self.text = text
+
+    def render(self, text):
+        lines = [self.identifier] if self.identifier is not None else []
+        lines.append(self.timing)
+        if text:
+            lines.append(text)
+        return "\n".join(lines)
+
+
+class SubtitleBatch:
+    """Consecutive cues translated in one request"""
+
+    __slots__ = ("cues", "before", "after")
+
+    def __init__(self, cues, before, after):
+        self.cues = cues
+        self.before = before
+        self.after = after
+
+
+def detect_format(text):
+    """Return SRT, VTT or None by looking at the start of the text"""
+    head = text.lstrip("﻿ \t\r\n")[:500].replace("\r\n", "\n")
+    if head.startswith("WEBVTT"):
+        return VTT
+    lines = head.split("\n", 2)
+    if len(lines) >= 2 and lines[0].strip().isdigit() and _TIMING_RE.match(lines[1]):
+        return SRT
+    return None
+
+
+class SubtitleDocument:
+    """Parsed subtitle file: cues plus verbatim non-cue blocks"""
+
+    def __init__(self, subtitle_format, blocks):
+        self.format = subtitle_format
+        self.blocks = blocks
+        self.cues = [block for block in blocks if isinstance(block, Cue)]
+        self.batches = []
+        self.unique_cues = self.cues
+        self.representatives = {}
+        self.prompt_tokens = 0
+        self.wholesale_tokens = 0
+
+    def make_batches(self, max_chars=None, context_cues=None):
+        """Group unique cue texts into batches of at most max_chars
+
+        Repeated cue texts are sent once; their representative's answer is
+        used for every copy.
+        """
+        config = get_config()
+        max_chars = max_chars or config.subtitle_batch_chars
+        if context_cues is None:
+            context_cues = config.subtitle_context_cues
+
+        uniques, positions = deduplicate(self.cues, lambda cue: cue.text)
+        self.unique_cues = uniques
+        self.representatives = {
+            cue.number: uniques[position].number
+            for cue, position in zip(self.cues, positions)
+        }
+
+        # Index in self.cues of each unique cue's first occurrence
+        indices = [None] * len(uniques)
+        for index, position in enumerate(positions):
+            if indices[position] is None:
+                indices[position] = index
+
+        batches = []
+        current = []
+        size = 0
+        for cue, index in zip(uniques, indices):
+            if current and size + len(cue.text) > max_chars:
+                batches.append(self._batch(current, start, end, context_cues))
+                current = []
+                size = 0
+            if not current:
+                start = index
+            current.append(cue)
+            end = index + 1
+            size += len(cue.text)
+        if current:
+            batches.append(self._batch(current, start, end, context_cues))
+        return batches
+
+    def _batch(self, cues, start, end, context_cues):
+        """Batch of cues spanning self.cues[start:end], with its context"""
+        return SubtitleBatch(
+            cues,
+            self.cues[max(start - context_cues, 0):start] if context_cues else [],
+            self.cues[end:end + context_cues] if context_cues else [],
+        )
+
+    def build_payloads(self, model, source, target, stream=True):
+        """Build a chat completions payload per batch"""
+        self.batches = self.make_batches()
+        payloads = []
+        self.prompt_tokens = 0
+        for batch in self.batches:
+            prompt = build_batch_prompt(batch, source, target)
+            self.prompt_tokens += estimate_tokens(prompt)
+            payloads.append(build_translation_payload(model, prompt, stream=stream))
+        self.wholesale_tokens = estimate_tokens(
+            build_prompt(self.assemble([]), source, target)
+        )
+        return payloads
+
+    def _translated(self, translations):
+        translated = {}
+        for text in translations:
+            if text:
+                translated.update(parse_numbered_lines(text))
+        return {
+            cue.number: translated[self.representatives.get(cue.number, cue.number)]
+            for cue in self.cues
+            if self.representatives.get(cue.number, cue.number) in translated
+        }
+
+    def assemble(self, translations):
+        """Rebuild the file from (possibly partial) batch translations"""
+        translated = self._translated(translations)
+        parts = []
+        for block in self.blocks:
+            if isinstance(block, Cue):
+                parts.append(block.render(translated.get(block.number, block.text)))
+            else:
+                parts.append(block)
+        return "\n\n".join(parts) + "\n"
+
+    def missing_cues(self, translations):
+        """Cues the model's batch answers did not cover"""
+        translated = self._translated(translations)
+        return [cue for cue in self.cues if cue.number not in translated]
+
+    def token_savings(self):
+        """Deduplication and prompt token estimate vs. sending the file"""
+        if not self.wholesale_tokens:
+            return None
+        return savings_report(
+            self.cues, self.unique_cues, self.prompt_tokens, self.wholesale_tokens
+        )
+
+
+def parse_subtitles(text):
+    """Parse SRT or WebVTT text, None if it isn't a subtitle file"""
+    subtitle_format = detect_format(text)
+    if subtitle_format is None:
+        return None
+
+    text = text.lstrip("﻿").replace("\r\n", "\n").replace("\r", "\n").strip()
+    blocks = []
+    number = 0
+    for block in _BLOCK_SEPARATOR_RE.split(text):
+        lines = block.strip("\n").split("\n")
+        # Timing is the first line, or the second after an identifier
+        timing_index = next(
+            (i for i, line in enumerate(lines[:2]) if _TIMING_RE.match(line)), None
+        )
+        if timing_index is None:
+            # WEBVTT header, NOTE, STYLE and REGION blocks
+            blocks.append(block.strip("\n"))
+            continue
+        number += 1
+        blocks.append(
+            Cue(
+                number,
+                lines[0] if timing_index == 1 else None,
+                lines[timing_index],
+                "\n".join(lines[timing_index + 1:]),
+            )
+        )
+    if number == 0:
+        return None
+    return SubtitleDocument(subtitle_format, blocks)
+
+
+def prepare_subtitles(text):
+    """Parse subtitles for translation, raises ValueError for other text"""
+    document = parse_subtitles(text)
+    if document is None:
+        raise ValueError("Text is not an SRT or WebVTT subtitle file")
+    return document
+
+
+def build_batch_prompt(batch, source, target):
+    """Build the prompt for one batch of cues"""
+    return build_numbered_prompt(
+        "subtitle lines",
+        "Each line starts with its cue number in brackets. Return exactly one "
+        "line per cue in the same order, keeping the numbers and any "
+        f"{LINE_BREAK} markers. Return only the translated lines.",
+        "Lines to translate",
+        batch.cues,
+        source,
+        target,
+        context=(
+            ("Preceding cues, for context only", batch.before),
+            ("Following cues, for context only", batch.after),
+        ),
+    )
+
+
+def finalize_subtitles(document, translations):
+    """Rebuild the subtitle file, untranslated cues keep their text"""
+    missing = document.missing_cues(translations)
+    if missing:
+        print(f"Warning: {len(missing)} subtitle cues were left untranslated")
+    log_savings("Subtitle translation", document.token_savings())
+    return document.assemble(translations)
+
+
+def translate_subtitles(
+    text, target, source="Auto", model=None, workers=None, priority=BACKGROUND
+):
+    """Translate an SRT/VTT file, keeping numbers and timings intact
+
+    Batches run concurrently; cues missing from a batch answer are retried
+    once in their own batch before falling back to the original text.
+    """
+    document = prepare_subtitles(text)
+    config = get_config()
+    model = model or config.model
+    workers = workers or config.max_concurrent_requests
+    complete = functools.partial(complete_chat, priority=priority)
+
+    payloads = document.build_payloads(model, source, target, stream=False)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        translations = list(executor.map(complete, payloads))
+
+        missing = document.missing_cues(translations)
+        if missing:
+            retry = SubtitleDocument(document.format, missing)
+            payloads = [
+                build_translation_payload(
+                    model, build_batch_prompt(batch, source, target), stream=False
+                )
+                for batch in retry.make_batches(context_cues=0)
+            ]
+            translations.extend(executor.map(complete, payloads))
+    return finalize_subtitles(document, translations)
@@ -1,11 +1,21 @@
 """
 Translation thread module
 """
-import json
-
-import requests
 from PyQt6.QtCore import QThread, pyqtSignal
 
+from .config import get_config
+from .key_pool import get_key_pool
+from .openai_client import (
+    APIError,
+    build_alternatives_payload,
+    build_translation_payload,
+    complete_chat,
+    iter_translation,
+    parse_alternatives,
+)
+from .result_store import cached_result, payload_key, store_result
+from .scheduler import ALTERNATIVES, INTERACTIVE, get_scheduler
+
 
 class TranslateThread(QThread):
     """Thread for performing translation"""
@@ -15,122 +25,60 @@ class TranslateThread(QThread):
     chunk_received = pyqtSignal(str)
     alternatives_ready = pyqtSignal(list)
 
-    def __init__(self, api_key, model, prompt, get_alternatives=False):
+    def __init__(self, model, prompt, get_alternatives=False, key_pool=None):
         super().__init__()
-        self.api_key = api_key
         self.model = model
         self.prompt = prompt
         self.get_alternatives = get_alternatives
+        self.key_pool = key_pool if key_pool is not None else get_key_pool()
+        self.timeout = get_config().request_timeout
 
     def run(self):
         try:
-            # Main translation
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a professional translator. Translate accurately and naturally.",
-                        },
-                        {"role": "user", "content": self.prompt},
-                    ],
-                    "temperature": 0.3,
-                    "stream": True,
-                },
-                timeout=30,
-                stream=True,
-            )
-
-            if response.status_code == 200:
+            # Main translation, interrupted streams are resumed
+            payload = build_translation_payload(self.model, self.prompt)
+            key = payload_key(payload)
+            full_translation = cached_result(key)
+            if full_translation is not None:
+                self.chunk_received.emit(full_translation)
+            else:
                 full_translation = ""
-                for line in response.iter_lines():
-                    if line:
-                        line_text = line.decode("utf-8")
-                        if line_text.startswith("data: "):
-                            data_str = line_text[6:]
-                            if data_str.strip() == "[DONE]":
-                                break
-                            try:
-                                data = json.loads(data_str)
-                                if "choices" in data and len(data["choices"]) > 0:
-                                    delta = data["choices"][0].get("delta", {})
-                                    content = delta.get("content", "")
-                                    if content:
-                                        full_translation += content
-                                        self.chunk_received.emit(full_translation)
-                            except json.JSONDecodeError:
-                                pass
+                with get_scheduler().slot(INTERACTIVE):
+                    for full_translation in iter_translation(
+                        payload, timeout=self.timeout, key_pool=self.key_pool
+                    ):
+                        self.chunk_received.emit(full_translation)
+                store_result(key, full_translation)
 
-                self.finished.emit(full_translation)
+            self.finished.emit(full_translation)
 
-                # Get alternative translations
-                if self.get_alternatives and full_translation:
-                    self.get_alternative_translations()
-            else:
-                error_msg = (
-                    response.json()
-                    .get("error", {})
-                    .get("message", "Unknown error")
-                )
-                self.error.emit(f"API Error: {error_msg}")
+            # Get alternative translations
+            if self.get_alternatives and full_translation:
+                self.get_alternative_translations()
 
+        except APIError as e:
+            self.error.emit(str(e))
         except Exception as e:
             self.error.emit(f"Error: {str(e)}")
 
     def get_alternative_translations(self):
         """Get alternative translation options"""
         try:
-            alt_prompt = (
-                self.prompt
-                + "\n\nSuggest 3 alternative translation options in the format:\n1. [option 1]\n2. [option 2]\n3. [option 3]"
-            )
-
-            response = requests.post(
-                "https://api.openai.com/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": "You are a professional translator. Suggest different stylistic translation variants.",
-                        },
-                        {"role": "user", "content": alt_prompt},
-                    ],
-                    "temperature": 0.7,
-                },
-                timeout=30,
-            )
-
-            if response.status_code == 200:
-                result = response.json()
-                alternatives_text = result["choices"][0]["message"]["content"].strip()
-
-                # Parse alternatives
-                alternatives = []
-                for line in alternatives_text.split("\n"):
-                    line = line.strip()
-                    if line and (line[0].isdigit() or line.startswith("-")):
-                        # Remove numbering
-                        clean_line = (
-                            line.split(".", 1)[-1].strip()
-                            if "." in line
-                            else line.lstrip("- ")
-                        )
-                        if clean_line:
-                            alternatives.append(clean_line)
-
-                if alternatives:
-                    self.alternatives_ready.emit(alternatives[:3])
+            payload = build_alternatives_payload(self.model, self.prompt)
+            key = payload_key(payload)
+            alternatives_text = cached_result(key)
+            if alternatives_text is None:
+                alternatives_text = complete_chat(
+                    payload,
+                    ALTERNATIVES,
+                    timeout=self.timeout,
+                    key_pool=self.key_pool,
+                ).strip()
+                store_result(key, alternatives_text)
+            alternatives = parse_alternatives(alternatives_text)
+            if alternatives:
+                self.alternatives_ready.emit(alternatives)
 
         except Exception as e:
             print(f"Error getting alternatives: {e}")
+
@@ -0,0 +1,562 @@
+"""
+Local translation memory backed by SQLite, with TMX/CSV import and export
+
+Units are looked up by exact source text. Bulk imports stream the input in
+batched transactions on a separate connection, each batch sorted by the
+lookup index so its inserts touch the index in order, while lookups and
+single additions carry on.
+It can also be run as a tool:
+
+    python -m app.translation_memory import memories.tmx
+    python -m app.translation_memory export approved.csv --target ru
+"""
+import argparse
+import codecs
+import csv
+import functools
+import hashlib
+import html
+import queue
+import re
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from xml.sax.saxutils import escape, quoteattr
+
+from . import __version__
+from .config import get_config
+
+DEFAULT_MEMORY_FILE = Path.home() / ".gpt_translator_memory.sqlite3"
+
+# Language names used by the UI and their ISO 639-1 codes
+LANGUAGE_CODES = {
+    "English": "en",
+    "Russian": "ru",
+    "Español": "es",
+    "Français": "fr",
+    "Deutsch": "de",
+    "中文": "zh",
+    "日本語": "ja",
+    "한국어": "ko",
+    "Қазақша": "kk",
+}
+
+BATCH_SIZE = 50000
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS units (
+    source_lang TEXT NOT NULL,
+    target_lang TEXT NOT NULL,
+    source_hash INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    target TEXT NOT NULL,
+    origin TEXT NOT NULL DEFAULT '',
+    updated_at REAL NOT NULL
+);
+"""
+_INDEX = """
+CREATE UNIQUE INDEX IF NOT EXISTS units_lookup
+    ON units (target_lang, source_hash, source_lang);
+"""
+_COLUMNS = "source_lang, target_lang, source_hash, source, target, origin, updated_at"
+
+
+@functools.lru_cache(maxsize=1024)
+def language_code(language):
+    """Normalize a UI language name or locale tag to a language code
+
+    "Auto" and empty values map to "" (any language).
+    """
+    if not language or language in ("Auto", "*all*"):
+        return ""
+    if language in LANGUAGE_CODES:
+        return LANGUAGE_CODES[language]
+    return language.replace("_", "-").split("-")[0].lower()
+
+
+def source_hash(text):
+    """Stable 64-bit hash of a source text"""
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+_TUV = r"<tuv\b[^>]*?lang\s*=\s*[\"']([^\"']*)[\"'][^>]*>\s*<seg>([^<]*)</seg>\s*</tuv>"
+# One pass over a chunk yields, in order: whole bilingual units without
+# inline markup (the common case), or <tu> start tags followed by their
+# (lang, seg) variants
+_TMX_RE = re.compile(
+    rf"<tu\b([^>]*)>\s*{_TUV}\s*{_TUV}\s*</tu>"
+    r"|(<tu\b[^>]*>)"
+    r"|<tuv\b[^>]*?lang\s*=\s*[\"']([^\"']*)[\"'][^>]*>.*?<seg>(.*?)</seg\s*>",
+    re.DOTALL,
+)
+_SRCLANG_RE = re.compile(r"""srclang\s*=\s*["']([^"']*)["']""")
+_TAG_RE = re.compile(r"<!\[CDATA\[(.*?)\]\]>|<[^>]*>", re.DOTALL)
+_ENCODING_RE = re.compile(rb"""^<\?xml[^>]*encoding\s*=\s*["']([\w-]+)["']""")
+TMX_READ_SIZE = 4 << 20
+
+
+def _seg_text(seg):
+    """Text content of a <seg>: inline codes unwrapped, entities decoded"""
+    if "<" in seg:
+        parts = []
+        position = 0
+        for match in _TAG_RE.finditer(seg):
+            parts.append(html.unescape(seg[position:match.start()]))
+            if match.group(1) is not None:
+                parts.append(match.group(1))
+            position = match.end()
+        parts.append(html.unescape(seg[position:]))
+        return "".join(parts)
+    return html.unescape(seg) if "&" in seg else seg
+
+
+def _tu_units(variants, source_lang):
+    source = next((v for v in variants if v[0] == source_lang), variants[0])
+    if source[1]:
+        for variant in variants:
+            if variant is not source and variant[1]:
+                yield source[0], variant[0], source[1], variant[1]
+
+
+def _srclang(tag, default=""):
+    match = _SRCLANG_RE.search(tag)
+    return language_code(match.group(1)) if match else default
+
+
+def iter_tmx(file):
+    """Stream (source_lang, target_lang, source, target) from a TMX file
+
+    UTF-8 files are scanned chunk by chunk with one regular expression,
+    which is about twice as fast as building elements; other encodings go
+    through ElementTree.
+    """
+    head = file.read(TMX_READ_SIZE)
+    encoding = _ENCODING_RE.match(head.lstrip(b"\xef\xbb\xbf"))
+    if encoding and encoding.group(1).decode().lower() not in ("utf-8", "utf8"):
+        file.seek(0)
+        yield from _iter_tmx_etree(file)
+        return
+
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    text = decoder.decode(head)
+    header = re.search(r"<header\b[^>]*>", text)
+    header_source = _srclang(header.group(0)) if header else ""
+    source_lang = header_source
+    variants = []
+    while True:
+        chunk = file.read(TMX_READ_SIZE)
+        # Scan up to the last complete unit, keep the rest for the next round
+        end = len(text)
+        if chunk:
+            end = text.rfind("</tu>") + 5 if "</tu>" in text else 0
+        for match in _TMX_RE.findall(text, 0, end):
+            tu, first_lang, first, second_lang, second, start, lang, seg = match
+            if start or first_lang:
+                if variants:
+                    yield from _tu_units(variants, source_lang)
+                    variants = []
+                source_lang = _srclang(start or tu, header_source)
+                if first_lang:
+                    yield from _tu_units(
+                        (
+                            (language_code(first_lang), _seg_text(first)),
+                            (language_code(second_lang), _seg_text(second)),
+                        ),
+                        source_lang,
+                    )
+            else:
+                variants.append((language_code(lang), _seg_text(seg)))
+        if not chunk:
+            if variants:
+                yield from _tu_units(variants, source_lang)
+            return
+        text = text[end:] + decoder.decode(chunk)
+
+
+def _iter_tmx_etree(file):
+    # Rarely needed, kept out of the app's first translation
+    import xml.etree.ElementTree as ElementTree
+
+    header_source = ""
+    context = ElementTree.iterparse(file, events=("start", "end"))
+    _, root = next(context)
+    for event, element in context:
+        tag = element.tag
+        if event == "start":
+            if tag == "header":
+                header_source = language_code(element.get("srclang", ""))
+            continue
+        if tag != "tu":
+            continue
+        variants = []
+        for tuv in element.iter("tuv"):
+            seg = tuv.find("seg")
+            if seg is not None:
+                lang = tuv.get(_XML_LANG) or tuv.get("lang") or ""
+                variants.append((language_code(lang), "".join(seg.itertext())))
+        source_lang = language_code(element.get("srclang", "")) or header_source
+        source = next((v for v in variants if v[0] == source_lang), None)
+        if source is None and variants:
+            source = variants[0]
+        if source is not None and source[1]:
+            for variant in variants:
+                if variant is not source and variant[1]:
+                    yield source[0], variant[0], source[1], variant[1]
+        # Keep memory flat on multi-gigabyte files
+        root.clear()
+
+
+def iter_csv(file, source_lang=None, target_lang=None):
+    """Stream units from CSV
+
+    Either a header with source_lang, target_lang, source, target columns,
+    or two source/target columns with the languages given as arguments.
+    """
+    reader = csv.reader(file)
+    first = next(reader, None)
+    if first is None:
+        return
+    header = [column.strip().lower() for column in first]
+    if {"source", "target"} <= set(header):
+        index = {name: header.index(name) for name in header}
+        source_column, target_column = index["source"], index["target"]
+        source_lang_column = index.get("source_lang")
+        target_lang_column = index.get("target_lang")
+        rows = reader
+    else:
+        source_column, target_column = 0, 1
+        source_lang_column = target_lang_column = None
+        rows = _prepend(first, reader)
+
+    default_source = language_code(source_lang)
+    default_target = language_code(target_lang)
+    for row in rows:
+        if len(row) <= max(source_column, target_column):
+            continue
+        source, target = row[source_column], row[target_column]
+        if not source or not target:
+            continue
+        yield (
+            language_code(row[source_lang_column])
+            if source_lang_column is not None
+            else default_source,
+            language_code(row[target_lang_column])
+            if target_lang_column is not None
+            else default_target,
+            source,
+            target,
+        )
+
+
+def _prepend(first, rows):
+    yield first
+    yield from rows
+
+
+class TranslationMemory:
+    """Exact-match store of approved and learned translations"""
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_MEMORY_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA + _INDEX)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def count(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM units").fetchone()[0]
+
+    def lookup(self, text, source, target):
+        """Translation of text, or None; source "Auto" matches any language"""
+        source_lang = language_code(source)
+        query = (
+            "SELECT target FROM units WHERE target_lang = ? AND source_hash = ? "
+            "AND source = ?"
+        )
+        params = [language_code(target), source_hash(text), text]
+        if source_lang:
+            query += " AND source_lang = ?"
+            params.append(source_lang)
+        with self._lock:
+            row = self._conn.execute(query + " LIMIT 1", params).fetchone()
+        return row[0] if row else None
+
+    def add(self, text, translation, source, target, origin="api"):
+        """Store one translation, replacing an older one for the same text"""
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO units ({_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    language_code(source),
+                    language_code(target),
+                    source_hash(text),
+                    text,
+                    translation,
+                    origin,
+                    time.time(),
+                ),
+            )
+
+    def bulk_import(self, units, origin="import", progress=None):
+        """Load (source_lang, target_lang, source, target) units, returns count
+
+        Later units win over earlier ones and over existing entries. Batches
+        are written by a helper thread on its own connection, so parsing
+        overlaps with SQLite work and lookups keep going during the import.
+        """
+        now = time.time()
+        imported = 0
+        batches = queue.Queue(maxsize=2)
+        errors = []
+        conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        conn.execute("PRAGMA synchronous=OFF")
+
+        def write():
+            while True:
+                batch = batches.get()
+                if batch is None:
+                    return
+                if not errors:
+                    try:
+                        self._insert_batch(conn, batch)
+                    except sqlite3.Error as e:
+                        errors.append(e)
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+        try:
+            batch = []
+            for source_lang, target_lang, source, target in units:
+                batch.append(
+                    (
+                        source_lang,
+                        target_lang,
+                        source_hash(source),
+                        source,
+                        target,
+                        origin,
+                        now,
+                    )
+                )
+                if len(batch) >= BATCH_SIZE:
+                    batches.put(batch)
+                    imported += len(batch)
+                    batch = []
+                    if progress:
+                        progress(imported)
+            if batch:
+                batches.put(batch)
+                imported += len(batch)
+                if progress:
+                    progress(imported)
+        finally:
+            batches.put(None)
+            writer.join()
+            conn.close()
+        if errors:
+            raise errors[0]
+        return imported
+
+    @staticmethod
+    def _insert_batch(conn, batch):
+        """Replace a batch in index order; the stable sort keeps later units last"""
+        batch.sort(key=lambda unit: (unit[1], unit[2], unit[0]))
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.executemany(
+                f"INSERT OR REPLACE INTO units ({_COLUMNS}) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                batch,
+            )
+        except sqlite3.Error:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def iter_units(self, source=None, target=None):
+        """Stream (source_lang, target_lang, source, target) units"""
+        query = "SELECT source_lang, target_lang, source, target FROM units"
+        conditions, params = [], []
+        if language_code(source):
+            conditions.append("source_lang = ?")
+            params.append(language_code(source))
+        if language_code(target):
+            conditions.append("target_lang = ?")
+            params.append(language_code(target))
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        # A separate connection keeps lookups responsive during long exports
+        conn = sqlite3.connect(str(self.path))
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(BATCH_SIZE)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            conn.close()
+
+    def import_file(self, path, source=None, target=None, progress=None):
+        """Import a .tmx or .csv file, returns the number of units"""
+        path = Path(path)
+        if path.suffix.lower() == ".tmx":
+            with open(path, "rb") as file:
+                return self.bulk_import(iter_tmx(file), progress=progress)
+        with open(path, newline="", encoding="utf-8-sig") as file:
+            return self.bulk_import(iter_csv(file, source, target), progress=progress)
+
+    def export_file(self, path, source=None, target=None, progress=None):
+        """Export units to a .tmx or .csv file, returns the number of units"""
+        path = Path(path)
+        units = self.iter_units(source, target)
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if path.suffix.lower() == ".tmx":
+                return write_tmx(file, units, progress)
+            return write_csv(file, units, progress)
+
+
+def write_tmx(file, units, progress=None):
+    """Write units as TMX 1.4, returns the number written"""
+    file.write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<tmx version="1.4">\n'
+        f'  <header creationtool="LinguaGPT" creationtoolversion="{__version__}" '
+        'segtype="sentence" o-tmf="LinguaGPT" adminlang="en" srclang="*all*" '
+        'datatype="plaintext"/>\n'
+        "  <body>\n"
+    )
+    count = 0
+    parts = []
+    for source_lang, target_lang, source, target in units:
+        source_attr = quoteattr(source_lang or "und")
+        parts.append(
+            f"    <tu srclang={source_attr}>\n"
+            f"      <tuv xml:lang={source_attr}><seg>{escape(source)}</seg></tuv>\n"
+            f"      <tuv xml:lang={quoteattr(target_lang or 'und')}>"
+            f"<seg>{escape(target)}</seg></tuv>\n"
+            "    </tu>\n"
+        )
+        count += 1
+        if len(parts) >= BATCH_SIZE:
+            file.write("".join(parts))
+            parts = []
+            if progress:
+                progress(count)
+    file.write("".join(parts) + "  </body>\n</tmx>\n")
+    if progress:
+        progress(count)
+    return count
+
+
+def write_csv(file, units, progress=None):
+    """Write units as CSV with a header row, returns the number written"""
+    writer = csv.writer(file)
+    writer.writerow(["source_lang", "target_lang", "source", "target"])
+    count = 0
+    batch = []
+    for unit in units:
+        batch.append(unit)
+        if len(batch) >= BATCH_SIZE:
+            writer.writerows(batch)
+            count += len(batch)
+            batch = []
+            if progress:
+                progress(count)
+    writer.writerows(batch)
+    count += len(batch)
+    if progress:
+        progress(count)
+    return count
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_translation_memory():
+    """Get the shared translation memory, None when disabled"""
+    global _memory
+    if not get_config().use_translation_memory:
+        return None
+    with _memory_lock:
+        if _memory is None:
+            _memory = TranslationMemory()
+        return _memory
+
+
+def recall(text, source, target):
+    """Translation from the shared memory, None if unknown or disabled"""
+    try:
+        memory = get_translation_memory()
+        return memory.lookup(text, source, target) if memory is not None else None
+    except sqlite3.Error as e:
+        print(f"Error reading translation memory: {e}")
+        return None
+
+
+def remember(text, translation, source, target):
+    """Store a finished translation in the shared memory, if enabled"""
+    if not translation:
+        return
+    try:
+        memory = get_translation_memory()
+        if memory is not None:
+            memory.add(text, translation, source, target)
+    except sqlite3.Error as e:
+        print(f"Error writing translation memory: {e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.translation_memory",
+        description="Import or export the LinguaGPT translation memory",
+    )
+    parser.add_argument("command", choices=("import", "export", "count"))
+    parser.add_argument("file", nargs="?", help=".tmx or .csv file")
+    parser.add_argument("--source", help="source language (CSV without header)")
+    parser.add_argument("--target", help="target language")
+    parser.add_argument("--memory", help="memory database, default in home")
+    args = parser.parse_args(argv)
+
+    memory = TranslationMemory(args.memory)
+    if args.command == "count":
+        print(memory.count())
+        return 0
+    if not args.file:
+        parser.error("a .tmx or .csv file is required")
+
+    def progress(count):
+        print(f"\r{count:,} units", end="", file=sys.stderr, flush=True)
+
+    start = time.perf_counter()
+    if args.command == "import":
+        count = memory.import_file(args.file, args.source, args.target, progress)
+    else:
+        count = memory.export_file(args.file, args.source, args.target, progress)
+    elapsed = time.perf_counter() - start
+    print(
+        f"\r{args.command.capitalize()}ed {count:,} units in {elapsed:.1f} s "
+        f"({count / max(elapsed, 1e-9):,.0f} units/s)",
+        file=sys.stderr,
+    )
+    memory.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -18,6 +18,8 @@ TRANSLATIONS = {
         "translate": "Translate",
         "ready": "Ready",
         "translation_ready": "Translation ready",
+        "tokens_saved": "Translation ready, ~{prompt_tokens} of ~{wholesale_tokens} tokens sent ({saved_percent}% saved)",
+        "dedup_report": "Translation ready, {unique_segments} unique of {segments} segments, ~{prompt_tokens} of ~{wholesale_tokens} tokens sent ({saved_percent}% saved)",
         "error": "Translation error",
         "alternatives": "Alternative translations",
         "alternative_selected": "Alternative selected",
@@ -25,6 +27,8 @@ TRANSLATIONS = {
         "copied": "Copied to clipboard",
         "api_key_label": "OpenAI API Key",
         "api_key_placeholder": "Enter your API key...",
+        "api_keys_label": "Additional API keys (optional, one per line: key [organization])",
+        "api_keys_placeholder": "sk-... org-...",
         "select_model": "Select GPT model",
         "ui_language_label": "Interface Language",
         "delete_key": "Delete API key",
@@ -37,12 +41,27 @@ TRANSLATIONS = {
         "success": "Success",
         "settings_saved": "Settings saved!",
         "confirm": "Confirmation",
-        "delete_confirm": "Are you sure you want to delete API key and all settings?\n\nTranslator will stop working until a new key is entered.",
+        "delete_confirm": "Are you sure you want to delete the API keys?\n\nTranslator will stop working until a new key is entered.",
         "done": "Done",
-        "deleted": "API key and settings deleted!\n\nEnter a new key to use the translator.",
+        "deleted": "API keys deleted!\n\nEnter a new key to use the translator.",
         "show": "Show",
         "quit": "Quit",
         "tray_tooltip": "GPT Translator",
+        "add_to_queue": "Add to queue",
+        "queue_job_done": "Queued translation finished",
+        "queue_job_failed": "Queued translation failed",
+        "translate_to_selected": "To {count} languages",
+        "live": "Live",
+        "live_report": "Live: {sent} of {total} sentences sent",
+        "fan_out_report": "{count} translations in {wall} s (~{sequential} s one by one)",
+        "memory_hit": "Translation found in translation memory",
+        "memory_label": "Translation memory",
+        "memory_import": "Import TMX/CSV...",
+        "memory_export": "Export TMX/CSV...",
+        "memory_units": "{count} units",
+        "memory_imported": "Imported {count} units",
+        "memory_exported": "Exported {count} units",
+        "memory_error": "Translation memory error",
     },
     "ru": {
         "title": "GPT Переводчик",
@@ -59,6 +78,8 @@ TRANSLATIONS = {
         "translate": "Перевести",
         "ready": "Готов к работе",
         "translation_ready": "Перевод готов",
+        "tokens_saved": "Перевод готов, отправлено ~{prompt_tokens} из ~{wholesale_tokens} токенов (экономия {saved_percent}%)",
+        "dedup_report": "Перевод готов, уникальных сегментов {unique_segments} из {segments}, отправлено ~{prompt_tokens} из ~{wholesale_tokens} токенов (экономия {saved_percent}%)",
         "error": "Ошибка перевода",
         "alternatives": "Альтернативные варианты перевода",
         "alternative_selected": "Выбран альтернативный вариант",
@@ -66,6 +87,8 @@ TRANSLATIONS = {
         "copied": "Скопировано в буфер обмена",
         "api_key_label": "OpenAI API Key",
         "api_key_placeholder": "Введите ваш API ключ...",
+        "api_keys_label": "Дополнительные API ключи (необязательно, по одному на строку: ключ [организация])",
+        "api_keys_placeholder": "sk-... org-...",
         "select_model": "Выберите модель GPT",
         "ui_language_label": "Язык интерфейса",
         "delete_key": "Удалить API ключ",
@@ -78,16 +101,33 @@ TRANSLATIONS = {
         "success": "Успех",
         "settings_saved": "Настройки сохранены!",
         "confirm": "Подтверждение",
-        "delete_confirm": "Вы уверены, что хотите удалить API ключ и все настройки?\n\nПереводчик перестанет работать до ввода нового ключа.",
+        "delete_confirm": "Вы уверены, что хотите удалить API ключи?\n\nПереводчик перестанет работать до ввода нового ключа.",
         "done": "Готово",
-        "deleted": "API ключ и настройки удалены!\n\nДля работы переводчика введите новый ключ.",
+        "deleted": "API ключи удалены!\n\nДля работы переводчика введите новый ключ.",
         "show": "Открыть",
         "quit": "Выход",
         "tray_tooltip": "GPT Переводчик",
+        "add_to_queue": "В очередь",
+        "queue_job_done": "Перевод из очереди готов",
+        "queue_job_failed": "Ошибка перевода из очереди",
+        "translate_to_selected": "На {count} яз.",
+        "live": "Живой",
+        "live_report": "Живой перевод: отправлено предложений {sent} из {total}",
+        "fan_out_report": "Переводов: {count} за {wall} с (~{sequential} с по очереди)",
+        "memory_hit": "Перевод найден в памяти переводов",
+        "memory_label": "Память переводов",
+        "memory_import": "Импорт TMX/CSV...",
+        "memory_export": "Экспорт TMX/CSV...",
+        "memory_units": "Единиц: {count}",
+        "memory_imported": "Импортировано единиц: {count}",
+        "memory_exported": "Экспортировано единиц: {count}",
+        "memory_error": "Ошибка памяти переводов",
     },
 }
 
 
 def get_translation(language: str, key: str) -> str:
     """Get translation by key for the specified language"""
-    return TRANSLATIONS.get(language, TRANSLATIONS["en"]).get(key, key)
+    # Generated catalogs may lag behind English by a few keys
+    text = TRANSLATIONS.get(language, TRANSLATIONS["en"]).get(key)
+    return text if text is not None else TRANSLATIONS["en"].get(key, key)
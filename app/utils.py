@@ -2,7 +2,8 @@
 Application utilities and styles
 """
 
-from PyQt6.QtGui import QColor, QPalette
+from PyQt6.QtCore import QEvent, QObject, QTimer
+from PyQt6.QtGui import QColor, QPalette, QTextCursor
 
 
 def get_app_stylesheet() -> str:
@@ -75,3 +76,59 @@ def get_dark_palette() -> QPalette:
     palette.setColor(QPalette.ColorRole.Button, QColor(233, 69, 96))
     palette.setColor(QPalette.ColorRole.ButtonText, QColor(255, 255, 255))
     return palette
+
+
+class _FirstPaintFilter(QObject):
+    """Event filter calling back once on the first paint event"""
+
+    def __init__(self, widget, callback):
+        super().__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint:
+            obj.removeEventFilter(self)
+            # Let the paint finish before reporting
+            QTimer.singleShot(0, self.callback)
+        return False
+
+
+def watch_first_paint(widget, callback):
+    """Call callback once the widget has painted for the first time"""
+    return _FirstPaintFilter(widget, callback)
+
+
+def _utf16_length(text):
+    return len(text.encode("utf-16-le")) // 2
+
+
+def splice_plain_text(editor, text):
+    """Replace only the changed middle of an editor's plain text
+
+    Unchanged text before and after keeps its scroll position and any
+    selection the user made in it.
+    """
+    old = editor.toPlainText()
+    if old == text:
+        return
+    limit = min(len(old), len(text))
+    prefix = 0
+    while prefix < limit and old[prefix] == text[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and old[len(old) - 1 - suffix] == text[len(text) - 1 - suffix]
+    ):
+        suffix += 1
+
+    # QTextCursor positions count UTF-16 code units
+    start = _utf16_length(old[:prefix])
+    cursor = QTextCursor(editor.document())
+    cursor.setPosition(start)
+    cursor.setPosition(
+        start + _utf16_length(old[prefix:len(old) - suffix]),
+        QTextCursor.MoveMode.KeepAnchor,
+    )
+    cursor.insertText(text[prefix:len(text) - suffix])
@@ -0,0 +1,479 @@
+"""
+Watch-folder daemon translating dropped files next to them
+
+    python main.py --watch
+    python -m app.watch_folder ~/Shared/inbox --target Russian [--once]
+
+Folders come from the watch_folders setting. Every watch_interval seconds
+each folder is listed; a file is only read when its size or mtime differs
+from the state DB, and only translated when its content hash changed.
+Markdown, HTML and plain text are split into segments whose answers are
+kept in the state DB, so an edited file sends only its changed segments.
+Translations are written next to the source as name.<code>.ext through a
+temporary file and a rename. Requests are background work in the shared
+scheduler.
+"""
+import argparse
+import functools
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from .config import get_config
+from .markup import HTML, MARKDOWN, PLAIN, parse_markup
+from .openai_client import complete_chat
+from .scheduler import BACKGROUND
+from .translation_memory import language_code
+
+DEFAULT_STATE_FILE = Path.home() / ".gpt_translator_watch.sqlite3"
+
+SUBTITLES = "subtitles"
+FORMATS = {
+    ".txt": PLAIN,
+    ".md": MARKDOWN,
+    ".markdown": MARKDOWN,
+    ".html": HTML,
+    ".htm": HTML,
+    ".srt": SUBTITLES,
+    ".vtt": SUBTITLES,
+}
+# Files modified more recently may still be being written
+SETTLE_SECONDS = 1.0
+# Failed files are tried again after this long, or when they change
+RETRY_SECONDS = 60
+# SQLite's limit on host parameters per statement is 999
+_LOOKUP_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT NOT NULL,
+    target TEXT NOT NULL,
+    folder TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    error TEXT,
+    not_before REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (path, target)
+);
+CREATE INDEX IF NOT EXISTS files_folder ON files (folder);
+CREATE TABLE IF NOT EXISTS segments (
+    key TEXT PRIMARY KEY,
+    answer TEXT NOT NULL,
+    used_at REAL NOT NULL
+);
+"""
+
+
+def segment_key(model, source, target, text):
+    """Cache key of one masked segment's answer"""
+    data = json.dumps([model, source, target, text], ensure_ascii=False)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def output_code(target):
+    """Suffix of the translated files, e.g. "ru" for Russian"""
+    return language_code(target) or target.lower()
+
+
+def output_path(path, target):
+    """report.md is translated into report.ru.md"""
+    return path.with_name(f"{path.stem}.{output_code(target)}{path.suffix}")
+
+
+def write_atomic(path, text):
+    """Write text via a temporary file and rename, readers never see half of it"""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=path.parent, prefix=f".{path.name}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def folder_entries(config=None):
+    """Watched folders from the settings as {"path", "targets", "source"}"""
+    config = config or get_config()
+    entries = []
+    for entry in config.watch_folders:
+        if isinstance(entry, str):
+            entry = {"path": entry}
+        targets = entry.get("targets") or config.watch_targets
+        if isinstance(targets, str):
+            targets = [targets]
+        entries.append(
+            {
+                "path": entry["path"],
+                "targets": list(targets),
+                "source": entry.get("source") or "Auto",
+            }
+        )
+    return entries
+
+
+class WatchState:
+    """SQLite record of seen files and translated segments
+
+    A file row holds the size, mtime and content hash the last translation
+    (or failure) was made from, per target language; segment rows hold
+    answers by segment_key().
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path) if path else DEFAULT_STATE_FILE
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def file(self, path, target):
+        """(size, mtime_ns, content_hash, error, not_before) or None"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT size, mtime_ns, content_hash, error, not_before FROM files "
+                "WHERE path = ? AND target = ?",
+                (path, target),
+            ).fetchone()
+
+    def record(
+        self, path, target, folder, stat, content_hash, error=None, retry_in=0
+    ):
+        """Store what a file was translated (or failed) from"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files (path, target, folder, size, "
+                "mtime_ns, content_hash, error, not_before, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    path,
+                    target,
+                    folder,
+                    stat.st_size,
+                    stat.st_mtime_ns,
+                    content_hash,
+                    error,
+                    now + retry_in,
+                    now,
+                ),
+            )
+
+    def paths(self, folder):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT path FROM files WHERE folder = ?", (folder,)
+            ).fetchall()
+        return {row[0] for row in rows}
+
+    def forget(self, path):
+        """Drop a file that was deleted, its translations stay"""
+        with self._lock:
+            self._conn.execute("DELETE FROM files WHERE path = ?", (path,))
+
+    def answers(self, keys):
+        """Cached answers of the given segment keys"""
+        keys = list(keys)
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _LOOKUP_BATCH):
+                batch = keys[i:i + _LOOKUP_BATCH]
+                marks = ", ".join("?" * len(batch))
+                found.update(
+                    self._conn.execute(
+                        f"SELECT key, answer FROM segments WHERE key IN ({marks})",
+                        batch,
+                    ).fetchall()
+                )
+            if found:
+                self._conn.executemany(
+                    "UPDATE segments SET used_at = ? WHERE key = ?",
+                    [(time.time(), key) for key in found],
+                )
+        return found
+
+    def store(self, answers):
+        """Cache segment answers by key"""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO segments (key, answer, used_at) "
+                "VALUES (?, ?, ?)",
+                [(key, answer, now) for key, answer in answers.items()],
+            )
+
+    def purge(self, older_than_days=90):
+        """Delete segment answers no file has used for a while"""
+        cutoff = time.time() - older_than_days * 86400
+        with self._lock:
+            self._conn.execute("DELETE FROM segments WHERE used_at < ?", (cutoff,))
+
+
+class FolderWatcher:
+    """Polls watched folders and translates changed files in a worker pool
+
+    At most workers files are translated at once, their batch requests
+    share a pool of the same size. Without folders the watch_folders
+    setting is read on every scan.
+    """
+
+    def __init__(self, folders=None, state=None, workers=None, model=None):
+        config = get_config()
+        self.folders = folders
+        self.model = model
+        self.state = state or WatchState()
+        workers = max(workers or config.watch_workers, 1)
+        self.files = ThreadPoolExecutor(workers, thread_name_prefix="watch-file")
+        self.requests = ThreadPoolExecutor(workers, thread_name_prefix="watch-request")
+        self.pending = {}
+        self.read = 0
+        self.translated = 0
+        self.failed = 0
+        self.segments_sent = 0
+        self.segments_reused = 0
+
+    def close(self):
+        self.files.shutdown(wait=True)
+        self.requests.shutdown(wait=True)
+        self.state.close()
+
+    def scan(self):
+        """Queue translations of new and changed files, returns how many"""
+        self.pending = {
+            key: future for key, future in self.pending.items() if not future.done()
+        }
+        queued = 0
+        for folder in self.folders or folder_entries():
+            queued += self._scan_folder(folder)
+        return queued
+
+    def wait(self):
+        """Block until the queued translations are done"""
+        for future in list(self.pending.values()):
+            future.result()
+
+    def _scan_folder(self, folder):
+        directory = Path(folder["path"]).expanduser()
+        targets = folder["targets"]
+        codes = {output_code(target) for target in targets}
+        try:
+            entries = list(os.scandir(directory))
+        except OSError as e:
+            print(f"Error listing watch folder {directory}: {e}")
+            return 0
+
+        now = time.time()
+        seen = set()
+        queued = 0
+        for entry in entries:
+            path = Path(entry.path)
+            if (
+                entry.name.startswith(".")
+                or path.suffix.lower() not in FORMATS
+                # Our own output: report.ru.md
+                or Path(path.stem).suffix[1:].lower() in codes
+                or not entry.is_file()
+            ):
+                continue
+            seen.add(entry.path)
+            stat = entry.stat()
+            if now - stat.st_mtime < SETTLE_SECONDS:
+                continue
+
+            data = digest = None
+            for target in targets:
+                if (entry.path, target) in self.pending:
+                    continue
+                row = self.state.file(entry.path, target)
+                output = output_path(path, target)
+                if row is not None and self._unchanged(row, stat, output, now):
+                    continue
+                if data is None:
+                    try:
+                        data = path.read_bytes()
+                    except OSError as e:
+                        print(f"Error reading {path}: {e}")
+                        break
+                    digest = hashlib.sha256(data).hexdigest()
+                    self.read += 1
+                if row is not None and row[2] == digest and row[3] is None:
+                    if output.exists():
+                        # Touched or copied over with the same content
+                        self.state.record(
+                            entry.path, target, str(directory), stat, digest
+                        )
+                        continue
+                self.pending[(entry.path, target)] = self.files.submit(
+                    self._translate, path, data, digest, stat, target, folder, directory
+                )
+                queued += 1
+
+        for path in self.state.paths(str(directory)) - seen:
+            self.state.forget(path)
+        return queued
+
+    @staticmethod
+    def _unchanged(row, stat, output, now):
+        size, mtime_ns, _, error, not_before = row
+        if size != stat.st_size or mtime_ns != stat.st_mtime_ns:
+            return False
+        if error is not None:
+            return now < not_before
+        return output.exists()
+
+    def _translate(self, path, data, digest, stat, target, folder, directory):
+        record = (str(path), target, str(directory), stat, digest)
+        try:
+            text = data.decode("utf-8-sig")
+        except UnicodeDecodeError:
+            print(f"Error translating {path.name}: not UTF-8 text")
+            # Not retried until the file changes
+            self.state.record(*record, error="not UTF-8 text", retry_in=math.inf)
+            self.failed += 1
+            return
+
+        output = output_path(path, target)
+        try:
+            translation, left = self.translate_text(
+                text, FORMATS[path.suffix.lower()], target, folder["source"]
+            )
+            write_atomic(output, translation)
+        except Exception as e:
+            print(f"Error translating {path.name}: {e}")
+            self.state.record(*record, error=str(e), retry_in=RETRY_SECONDS)
+            self.failed += 1
+            return
+
+        if left:
+            # Written with the original text there, the rest comes later
+            print(f"Warning: {left} segments of {path.name} were left untranslated")
+            self.state.record(
+                *record, error=f"{left} segments untranslated", retry_in=RETRY_SECONDS
+            )
+        else:
+            self.state.record(*record)
+        self.translated += 1
+        print(f"Translated {path.name} -> {output.name}")
+
+    def translate_text(self, text, text_format, target, source):
+        """Translate a file's text, returns (translation, untranslated segments)"""
+        model = self.model or get_config().model
+        if text_format == SUBTITLES:
+            from .subtitles import translate_subtitles
+
+            return (
+                translate_subtitles(text, target, source, model, priority=BACKGROUND),
+                0,
+            )
+
+        document = parse_markup(text, text_format)
+        keys = {
+            segment.number: segment_key(model, source, target, segment.text)
+            for segment in document.unique_segments
+        }
+        cached = self.state.answers(keys.values())
+        answers = {
+            number: cached[key] for number, key in keys.items() if key in cached
+        }
+        self.segments_reused += len(answers)
+
+        # Segments whose answer is missing or lost placeholders get one retry
+        for _ in range(2):
+            missing = [s for s in document.unique_segments if s.number not in answers]
+            if not missing:
+                break
+            payloads = document.build_payloads(
+                model, source, target, stream=False, segments=missing
+            )
+            self.segments_sent += len(missing)
+            # Dropped files give way to anything the user is waiting for
+            complete = functools.partial(complete_chat, priority=BACKGROUND)
+            found = document.answers(self.requests.map(complete, payloads))
+            self.state.store({keys[number]: answer for number, answer in found.items()})
+            answers.update(found)
+
+        left = len(document.missing_segments((), answers))
+        return document.assemble((), answers), left
+
+    def run(self, interval=None, once=False):
+        """Scan until interrupted, or once and wait for the translations"""
+        self.state.purge()
+        try:
+            while True:
+                get_config().reload_if_changed()
+                self.scan()
+                if once:
+                    self.wait()
+                    return
+                time.sleep(interval or get_config().watch_interval)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.close()
+
+
+def watch(folders=None, once=False, state_file=None):
+    """Run the watch-folder daemon until interrupted"""
+    folders = folders or folder_entries()
+    if not folders:
+        print("No watch folders configured (watch_folders setting)")
+        return
+    for folder in folders:
+        print(
+            f"Watching {folder['path']} -> {', '.join(folder['targets'])}",
+            flush=True,
+        )
+    FolderWatcher(folders, WatchState(state_file)).run(once=once)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m app.watch_folder",
+        description="Translate files dropped into folders next to them",
+    )
+    parser.add_argument("folders", nargs="*", help="folders, default watch_folders")
+    parser.add_argument(
+        "--target", action="append", help="target language, may be repeated"
+    )
+    parser.add_argument("--source", default="Auto", help="source language")
+    parser.add_argument("--once", action="store_true", help="scan once and exit")
+    parser.add_argument("--state", help="state database, default in home")
+    args = parser.parse_args(argv)
+
+    folders = None
+    if args.folders:
+        targets = args.target or get_config().watch_targets
+        folders = [
+            {"path": path, "targets": targets, "source": args.source}
+            for path in args.folders
+        ]
+    watch(folders, once=args.once, state_file=args.state)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Benchmark of the adaptive concurrency limit against a varying capacity
+
+Keeps the network engine saturated with streaming requests while the fake
+endpoint's capacity changes over time; requests beyond the capacity get a
+429 and latency inflates as the load approaches it. Reports per capacity
+phase the completed requests per second, failed requests, 429/5xx
+responses seen and the average concurrency limit, once for fixed limits
+and once for the adaptive one.
+
+Usage: python -m benchmarks.bench_adaptive [--schedule 0:8,8:3,16:12]
+       [--duration 24] [--fixed 4,16] [--ceiling 16]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+SAMPLE_MS = 100
+
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    last = len(ordered) - 1
+    return ordered[min(last, int(last * p / 100 + 0.5))]
+
+
+def run(label, limiter, args, schedule):
+    from PyQt6.QtCore import QCoreApplication, QTimer
+
+    from app.network_engine import NetworkEngine
+    from app.openai_client import build_translation_payload
+    from app.scheduler import BACKGROUND, RequestScheduler
+    from benchmarks.fake_openai_server import start_server_process
+
+    server, base_url = start_server_process(
+        delay=args.delay, tokens=args.tokens, capacity_schedule=schedule
+    )
+    try:
+        from app.config import get_config
+
+        get_config().save(api_base_url=base_url)
+        app = QCoreApplication.instance() or QCoreApplication([])
+        scheduler = RequestScheduler(reserved_slots=0, limiter=limiter)
+        engine = NetworkEngine(scheduler=scheduler)
+        payload = build_translation_payload(
+            "benchmark", "Translate the following text into 'Russian':\n\nbenchmark"
+        )
+
+        bounds = [seconds for seconds, _ in schedule[1:]] + [args.duration]
+        phases = [
+            {"done": 0, "failed": 0, "limits": [], "latencies": []} for _ in schedule
+        ]
+        overloads = [0] * len(schedule)
+        requests = set()
+        start = time.perf_counter()
+
+        def phase():
+            elapsed = time.perf_counter() - start
+            for index, bound in enumerate(bounds):
+                if elapsed < bound:
+                    return index
+            return len(bounds) - 1
+
+        def finished(request, ok):
+            requests.discard(request)
+            entry = phases[phase()]
+            if ok:
+                entry["done"] += 1
+                entry["latencies"].append(request.busy_seconds())
+            else:
+                entry["failed"] += 1
+            submit()
+
+        def submit():
+            if time.perf_counter() - start >= args.duration:
+                return
+            request = engine.submit(payload, priority=BACKGROUND)
+            request.finished.connect(lambda _text: finished(request, True))
+            request.error.connect(lambda _message: finished(request, False))
+            requests.add(request)
+
+        def sample():
+            index = phase()
+            phases[index]["limits"].append(scheduler.max_concurrent)
+            overloads[index] += limiter.overloads - sum(overloads)
+
+        def stop():
+            for request in list(requests):
+                request.abort()
+            app.quit()
+
+        sampler = QTimer()
+        sampler.timeout.connect(sample)
+        sampler.start(SAMPLE_MS)
+        QTimer.singleShot(int(args.duration * 1000), stop)
+        # A backlog deeper than any limit keeps every slot busy
+        for _ in range(limiter.maximum * 2):
+            submit()
+        app.exec()
+        sampler.stop()
+    finally:
+        server.terminate()
+
+    for index, ((seconds, capacity), bound) in enumerate(zip(schedule, bounds)):
+        entry = phases[index]
+        length = bound - seconds
+        limits = entry["limits"] or [0]
+        print(
+            f"{label:>10} {capacity:>9} {entry['done'] / length:>8.1f} "
+            f"{entry['failed']:>7} {overloads[index]:>6} "
+            f"{sum(limits) / len(limits):>6.1f} "
+            f"{_percentile(entry['latencies'], 95) * 1000:>9.0f}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--schedule", default="0:8,8:3,16:12")
+    parser.add_argument("--duration", type=float, default=24)
+    parser.add_argument("--fixed", default="4,16")
+    parser.add_argument("--ceiling", type=int, default=16)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.05)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import parse_schedule
+
+    schedule = parse_schedule(args.schedule)
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["LINGUAGPT_CONFIG"] = str(Path(tmp) / "config.json")
+        from app.config import get_config
+        from app.scheduler import AdaptiveLimit
+
+        get_config().save(api_key="benchmark", request_timeout=120)
+        print(f"capacity schedule {args.schedule}, {args.duration}s")
+        print(
+            f"{'limit':>10} {'capacity':>9} {'done/s':>8} {'failed':>7} "
+            f"{'429s':>6} {'avg':>6} {'p95 ms':>9}"
+        )
+        for fixed in filter(None, args.fixed.split(",")):
+            slots = int(fixed)
+            run(f"fixed {slots}", AdaptiveLimit(slots, slots, slots), args, schedule)
+        run("adaptive", AdaptiveLimit(4, maximum=args.ceiling), args, schedule)
+
+
+if __name__ == "__main__":
+    main()
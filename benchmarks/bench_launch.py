@@ -0,0 +1,179 @@
+"""
+Benchmark of launch-to-window time of the frozen builds
+
+Starts each build from build.py with --quit-after-paint and measures the
+wall time from spawning the executable until the window has painted, when
+its paint marker reaches stderr. This includes the onefile build's
+unpacking, which --profile-startup itself cannot see. Builds
+without a console (Windows) report nothing, there the time to exit is
+measured instead and marked with *.
+
+Cold runs evict the OS file cache before each launch, which needs root on
+Linux; elsewhere only the first run after a reboot is cold, so cold runs
+are skipped. Warm runs follow one discarded launch.
+
+Usage: python -m benchmarks.bench_launch [--cold 3] [--warm 5]
+       [profile=path ...]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+NAME = "LinguaGPT"
+# Printed by main.py --quit-after-paint as soon as the window has painted
+PAINT_MARKER = "window painted"
+
+
+def default_builds():
+    """Executables of the build.py profiles that exist"""
+    if sys.platform == "win32":
+        candidates = {
+            "onefile": ROOT / "dist" / f"{NAME}.exe",
+            "startup": ROOT / "dist" / "startup" / NAME / f"{NAME}.exe",
+        }
+    elif sys.platform == "darwin":
+        inside = Path(f"{NAME}.app", "Contents", "MacOS", NAME)
+        candidates = {
+            "onefile": ROOT / "dist" / inside,
+            "startup": ROOT / "dist" / "startup" / inside,
+        }
+    else:
+        candidates = {
+            "onefile": ROOT / "dist" / NAME,
+            "startup": ROOT / "dist" / "startup" / NAME / NAME,
+        }
+    return {label: path for label, path in candidates.items() if path.is_file()}
+
+
+def bundle_size(executable):
+    """Bytes and files of a onefile executable or a onedir folder"""
+    folder = executable.parent
+    if folder.name == "dist":
+        return executable.stat().st_size, 1
+    if folder.name == "MacOS":
+        folder = folder.parent.parent
+    files = [path for path in folder.rglob("*") if path.is_file()]
+    return sum(path.stat().st_size for path in files), len(files)
+
+
+def drop_caches():
+    """Evict the file cache so the next launch reads from disk"""
+    if not sys.platform.startswith("linux"):
+        return False
+    try:
+        os.sync()
+        with open("/proc/sys/vm/drop_caches", "w") as f:
+            f.write("3\n")
+        return True
+    except OSError:
+        return False
+
+
+def launch(executable, env, timeout):
+    """Seconds to the first paint, and whether only the exit was seen
+
+    stderr is read on a thread so the timeout holds even if the build hangs
+    before painting, the process is killed then.
+    """
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [str(executable), "--quit-after-paint"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        errors="replace",
+        env=env,
+    )
+    painted = []
+    seen = threading.Event()
+
+    def read():
+        for line in process.stderr:
+            if not painted and line.strip() == PAINT_MARKER:
+                painted.append(time.perf_counter() - start)
+                seen.set()
+        seen.set()
+
+    reader = threading.Thread(target=read, daemon=True)
+    reader.start()
+    try:
+        if not seen.wait(timeout):
+            raise subprocess.TimeoutExpired(process.args, timeout)
+        process.wait(max(start + timeout - time.perf_counter(), 0))
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+        raise
+    finally:
+        reader.join()
+    if not painted:
+        return time.perf_counter() - start, True
+    return painted[0], False
+
+
+def measure(runs, executable, env, timeout, cold):
+    times = []
+    exit_only = False
+    if not cold:
+        launch(executable, env, timeout)
+    for _ in range(runs):
+        if cold and not drop_caches():
+            return None, False
+        seconds, exited = launch(executable, env, timeout)
+        times.append(seconds)
+        exit_only = exit_only or exited
+    return times, exit_only
+
+
+def column(times, exit_only):
+    if not times:
+        return f"{'-':>12}"
+    mark = "*" if exit_only else " "
+    return f"{statistics.median(times) * 1000:>10.0f}{mark} "
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("builds", nargs="*", metavar="profile=path")
+    parser.add_argument("--cold", type=int, default=3)
+    parser.add_argument("--warm", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    builds = dict(build.split("=", 1) for build in args.builds) or default_builds()
+    if not builds:
+        parser.error("no builds in dist/, run build.py first")
+
+    env = dict(os.environ)
+    if sys.platform.startswith("linux") and not (
+        env.get("DISPLAY") or env.get("WAYLAND_DISPLAY")
+    ):
+        env["QT_QPA_PLATFORM"] = "offscreen"
+
+    print(
+        f"{'profile':>10} {'MB':>7} {'files':>6} {'cold ms':>12} "
+        f"{'warm ms':>12} {'warm min':>9}"
+    )
+    cold_skipped = False
+    for label, executable in builds.items():
+        executable = Path(executable)
+        size, files = bundle_size(executable)
+        cold, cold_exit = measure(args.cold, executable, env, args.timeout, True)
+        warm, warm_exit = measure(args.warm, executable, env, args.timeout, False)
+        cold_skipped = cold_skipped or cold is None
+        print(
+            f"{label:>10} {size / 2**20:>7.1f} {files:>6} {column(cold, cold_exit)}"
+            f"{column(warm, warm_exit)}{min(warm) * 1000:>9.0f}"
+        )
+    if cold_skipped:
+        print("Cold runs need root on Linux and are skipped elsewhere")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Benchmark of incremental catalog localization
+
+Localizes a copy of the app's TRANSLATIONS catalog into every UI language
+against the local fake endpoint: a full run for the new languages, a
+re-run with nothing changed, and a re-run after one English string
+changed. The full run is repeated with one string per request to show
+what packing saves. The fake endpoint answers non-streaming requests after
+a single delay, so the times show request overhead, not generation time.
+
+Usage: python -m benchmarks.bench_localize [--delay 0.005]
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+CATALOG = Path(__file__).resolve().parent.parent / "app" / "translations.py"
+
+
+def run(label, catalog, server):
+    from app.localize import localize
+
+    served = server.served
+    start = time.perf_counter()
+    report = localize(catalog)
+    elapsed = time.perf_counter() - start
+    translated = sum(counts["translated"] for counts in report.values())
+    print(
+        f"{label:>18} {elapsed:>8.2f} {server.served - served:>9} {translated:>8}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import start_server
+
+    server = start_server(delay=args.delay)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ["LINGUAGPT_CONFIG"] = str(tmp / "config.json")
+        from app.config import get_config
+
+        get_config().save(api_key="benchmark", api_base_url=server.base_url)
+        print(f"{'run':>18} {'seconds':>8} {'requests':>9} {'strings':>8}")
+
+        catalog = tmp / "translations.py"
+        shutil.copy(CATALOG, catalog)
+        run("all languages", catalog, server)
+        run("unchanged", catalog, server)
+        text = catalog.read_text(encoding="utf-8")
+        catalog.write_text(
+            text.replace('"Copy"', '"Copy text"', 1), encoding="utf-8"
+        )
+        run("one string edited", catalog, server)
+
+        # Every batch holds a single string
+        get_config().save(document_chunk_chars=1)
+        unpacked = tmp / "unpacked.py"
+        shutil.copy(CATALOG, unpacked)
+        run("one per request", unpacked, server)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
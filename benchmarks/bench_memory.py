@@ -0,0 +1,84 @@
+"""
+Benchmark of translation memory bulk import and export
+
+Generates a bilingual TMX file, imports it into an empty memory, imports it
+again on top (every unit replaced), then exports TMX and CSV. Reports units
+per second for each step.
+
+Usage: python -m benchmarks.bench_memory [--units 500000]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORDS = (
+    "valve pump pressure check open close the a of before after each daily "
+    "filter replace seal inspect motor gently until"
+).split()
+
+
+def make_tmx(path, units, seed=1):
+    """Write a TMX file with en-US -> ru-RU units"""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as file:
+        file.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n<tmx version="1.4">'
+            '<header srclang="en-US" datatype="plaintext" segtype="sentence" '
+            'adminlang="en" o-tmf="bench" creationtool="bench" '
+            'creationtoolversion="1"/><body>\n'
+        )
+        for number in range(units):
+            words = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12)))
+            file.write(
+                f'<tu tuid="{number}"><tuv xml:lang="en-US"><seg>{number}: '
+                f"{words} &amp; more.</seg></tuv><tuv xml:lang=\"ru-RU\"><seg>"
+                f"{number}: перевод {words}.</seg></tuv></tu>\n"
+            )
+        file.write("</body></tmx>\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--units", type=int, default=500000)
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["LINGUAGPT_CONFIG"] = str(Path(tmp.name) / "config.json")
+
+    from app.translation_memory import TranslationMemory
+
+    directory = Path(tmp.name)
+    source = directory / "bench.tmx"
+    make_tmx(source, args.units)
+    print(f"{args.units} units, {source.stat().st_size / 2**20:.0f} MB TMX")
+
+    memory = TranslationMemory(directory / "memory.sqlite3")
+    steps = (
+        ("import", lambda: memory.import_file(source)),
+        ("re-import", lambda: memory.import_file(source)),
+        ("export tmx", lambda: memory.export_file(directory / "out.tmx")),
+        ("export csv", lambda: memory.export_file(directory / "out.csv")),
+    )
+    print(f"{'step':>10} {'seconds':>8} {'units/s':>10}")
+    try:
+        for name, step in steps:
+            start = time.perf_counter()
+            count = step()
+            elapsed = time.perf_counter() - start
+            assert count == args.units, count
+            print(f"{name:>10} {elapsed:>8.2f} {count / elapsed:>10.0f}")
+        assert memory.count() == args.units
+    finally:
+        memory.close()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+"""
+Benchmark of thread-per-request vs. the event-loop network engine
+
+Runs 1/10/100 concurrent streams against a local fake endpoint and reports
+peak OS thread count, peak RSS and throughput for each mode. Every
+measurement runs in a fresh process so peaks don't leak between runs.
+
+Usage: python -m benchmarks.bench_network_engine [--streams 1 10 100]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def _proc_status(field):
+    """Read a numeric field of /proc/self/status, None elsewhere"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def thread_count():
+    return _proc_status("Threads") or threading.active_count()
+
+
+def peak_rss_mb():
+    peak = _proc_status("VmHWM")
+    if peak is None:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024
+
+
+def run_worker(mode, streams, base_url):
+    """Run one measurement in this process and print a JSON result"""
+    from PyQt6.QtCore import QCoreApplication, QTimer
+
+    from app.config import get_config
+
+    get_config().save(
+        api_key="benchmark",
+        api_base_url=base_url,
+        max_concurrent_requests=streams,
+        request_timeout=120,
+        # Every run sends the same prompts
+        result_cache=False,
+    )
+
+    from app.network_engine import NetworkEngine
+    from app.translate_thread import TranslateThread
+
+    app = QCoreApplication([])
+    engine = NetworkEngine(max_concurrent=streams)
+    state = {"done": 0, "chars": 0, "errors": 0, "peak_threads": thread_count()}
+    handles = []
+
+    def sample():
+        state["peak_threads"] = max(state["peak_threads"], thread_count())
+
+    def on_done(text):
+        state["done"] += 1
+        state["chars"] += len(text)
+        if state["done"] + state["errors"] == streams:
+            app.quit()
+
+    def on_error(error):
+        state["errors"] += 1
+        print(error, file=sys.stderr)
+        if state["done"] + state["errors"] == streams:
+            app.quit()
+
+    sampler = QTimer()
+    sampler.timeout.connect(sample)
+    sampler.start(5)
+
+    start = time.perf_counter()
+    for i in range(streams):
+        prompt = f"Translate the following text into the language 'Russian':\n\n{i}"
+        if mode == "threads":
+            handle = TranslateThread("benchmark", prompt)
+            handle.finished.connect(on_done)
+            handle.error.connect(on_error)
+            handle.start()
+        else:
+            handle = engine.translate("benchmark", prompt)
+            handle.finished.connect(on_done)
+            handle.error.connect(on_error)
+        handles.append(handle)
+    app.exec()
+    elapsed = time.perf_counter() - start
+    sample()
+
+    for handle in handles:
+        if mode == "threads":
+            handle.wait()
+    print(
+        json.dumps(
+            {
+                "mode": mode,
+                "streams": streams,
+                "seconds": elapsed,
+                "streams_per_s": state["done"] / elapsed,
+                "chars_per_s": state["chars"] / elapsed,
+                "peak_threads": state["peak_threads"],
+                "peak_rss_mb": peak_rss_mb(),
+                "errors": state["errors"],
+            }
+        )
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--streams", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--tokens", type=int, default=200)
+    parser.add_argument("--delay", type=float, default=0.01)
+    parser.add_argument("--worker", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        mode, streams, base_url = args.worker
+        run_worker(mode, int(streams), base_url)
+        return
+
+    from benchmarks.fake_openai_server import start_server_process
+
+    server, base_url = start_server_process(delay=args.delay, tokens=args.tokens)
+    print(
+        f"{'mode':>8} {'streams':>8} {'seconds':>8} {'streams/s':>10} "
+        f"{'chars/s':>10} {'threads':>8} {'RSS MB':>8}"
+    )
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, LINGUAGPT_CONFIG=str(Path(tmp) / "config.json"))
+            env.setdefault("QT_QPA_PLATFORM", "offscreen")
+            for streams in args.streams:
+                for mode in ("threads", "engine"):
+                    output = subprocess.run(
+                        [
+                            sys.executable,
+                            "-m",
+                            "benchmarks.bench_network_engine",
+                            "--worker",
+                            mode,
+                            str(streams),
+                            base_url,
+                        ],
+                        cwd=ROOT,
+                        env=env,
+                        capture_output=True,
+                        text=True,
+                        check=True,
+                    ).stdout
+                    result = json.loads(output.strip().splitlines()[-1])
+                    print(
+                        f"{mode:>8} {streams:>8} {result['seconds']:>8.2f} "
+                        f"{result['streams_per_s']:>10.1f} "
+                        f"{result['chars_per_s']:>10.0f} "
+                        f"{result['peak_threads']:>8} {result['peak_rss_mb']:>8.1f}"
+                    )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark of document pre/post-processing speedup vs. worker count
+
+Usage: python -m benchmarks.bench_processing [--size-mb 20] [--max-workers N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.processing import (  # noqa: E402
+    finalize_document,
+    get_process_pool,
+    normalize,
+    prepare_document,
+)
+
+WORDS = (
+    "the translation memory keeps approved segments for every release see "
+    "https://example.com/docs/install and run `pip install linguagpt` or mail "
+    "support@example.com with {product} version %s details"
+).split()
+
+
+def make_document(size_mb, seed=1):
+    """Generate a synthetic document of roughly size_mb megabytes"""
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    paragraphs = []
+    size = 0
+    while size < target:
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 25))).capitalize()
+            + "."
+            for _ in range(rng.randint(1, 8))
+        ]
+        paragraph = " ".join(sentences)
+        paragraphs.append(paragraph)
+        size += len(paragraph) + 2
+    return "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=20)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-chars", type=int, default=6000)
+    args = parser.parse_args()
+
+    text = make_document(args.size_mb)
+    glossary = {"translation memory": "память переводов", "release": "релиз"}
+    print(f"Document: {len(text) / 1e6:.1f}M chars, cores: {os.cpu_count()}")
+    print(f"{'workers':>8} {'prepare s':>10} {'finalize s':>11} {'speedup':>8}")
+
+    workers = 1
+    baseline = None
+    while workers <= args.max_workers:
+        if workers > 1:
+            # Exclude process start-up from the measurement
+            get_process_pool(workers).submit(len, "").result()
+
+        start = time.perf_counter()
+        prepared = prepare_document(
+            text, glossary=glossary, max_chars=args.chunk_chars, workers=workers
+        )
+        prepare_time = time.perf_counter() - start
+
+        translations = [chunk.text for chunk in prepared.chunks]
+        start = time.perf_counter()
+        result = finalize_document(prepared, translations, workers=workers)
+        finalize_time = time.perf_counter() - start
+
+        assert result == normalize(text), "round trip mismatch"
+        total = prepare_time + finalize_time
+        baseline = baseline or total
+        print(
+            f"{workers:>8} {prepare_time:>10.3f} {finalize_time:>11.3f} "
+            f"{baseline / total:>7.2f}x"
+        )
+        workers *= 2
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+Benchmark of the result store's footprint and read latency
+
+Fills stores with the results of translation requests: single sentences,
+paragraphs and numbered alternatives in Russian and English, where a share
+of requests (other prompts, same answer) repeat an earlier result. The
+same results are kept in a JSON file loaded into a dict, in a SQLite table,
+in the store without a dictionary and in the store. Reports the disk
+footprint, the memory held after opening (traced Python allocations, not
+SQLite's page cache), the open time and the latency of uniformly random
+reads, and of hot reads where most requests repeat one of the newest
+results.
+
+Usage: python -m benchmarks.bench_result_store [--requests 50000]
+       [--repeated 0.3] [--reads 20000]
+"""
+import argparse
+import gc
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import result_store  # noqa: E402
+from app.result_store import ResultStore, payload_key  # noqa: E402
+
+# Hot reads ask for one of the newest results this often
+HOT_KEYS = 100
+HOT_SHARE = 0.8
+
+WORDS = {
+    "en": (
+        "the report budget team release customer server update meeting review "
+        "plan design feature issue market quarter price contract deadline "
+        "schedule will be sent to all of our with for after before this next"
+    ).split(),
+    "ru": (
+        "отчёт бюджет команда выпуск клиент сервер обновление встреча обзор "
+        "план дизайн функция проблема рынок квартал цена договор срок график "
+        "будет отправлен всем нашим для после перед этот следующий в и на"
+    ).split(),
+}
+
+
+def sentence(rng, language):
+    words = [rng.choice(WORDS[language]) for _ in range(rng.randint(6, 16))]
+    return " ".join(words).capitalize() + rng.choice(".!?.")
+
+
+def result(rng):
+    language = rng.choice(("en", "ru"))
+    kind = rng.random()
+    if kind < 0.6:
+        return sentence(rng, language)
+    if kind < 0.85:
+        return " ".join(sentence(rng, language) for _ in range(rng.randint(3, 8)))
+    return "\n".join(
+        f"{number}. {sentence(rng, language)}" for number in range(1, 4)
+    )
+
+
+def make_results(count, repeated, seed=1):
+    """(payload key, text) pairs, repeated share answering like an earlier one"""
+    rng = random.Random(seed)
+    texts = []
+    pairs = []
+    for number in range(count):
+        if texts and rng.random() < repeated:
+            text = rng.choice(texts)
+        else:
+            text = result(rng)
+            texts.append(text)
+        payload = {"model": "gpt-4o-mini", "messages": [{"content": str(number)}]}
+        pairs.append((payload_key(payload), text))
+    return pairs
+
+
+def traced(function):
+    """Result of function, traced bytes it left allocated, seconds"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = function()
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size, elapsed
+
+
+def timed_reads(get, keys):
+    samples = []
+    for key in keys:
+        start = time.perf_counter()
+        if get(key) is None:
+            raise RuntimeError("missing key")
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return samples
+
+
+def read_latency(get, keys, reads, seed=2):
+    """p50 and p95 of uniform reads, p50 of reads mostly of recent results"""
+    rng = random.Random(seed)
+    uniform = timed_reads(get, rng.choices(keys, k=reads))
+    recent = keys[-HOT_KEYS:]
+    hot = timed_reads(
+        get,
+        [
+            rng.choice(recent) if rng.random() < HOT_SHARE else rng.choice(keys)
+            for _ in range(reads)
+        ],
+    )
+    return (
+        uniform[len(uniform) // 2],
+        uniform[int(len(uniform) * 0.95)],
+        hot[len(hot) // 2],
+    )
+
+
+def directory_size(path):
+    return sum(item.stat().st_size for item in Path(path).rglob("*") if item.is_file())
+
+
+def report(label, disk, memory, opened, latency):
+    p50, p95, hot = latency
+    print(
+        f"{label:>16} {disk / 1024:>9,.0f} {memory / 1024:>9,.0f} "
+        f"{opened * 1000:>8.1f} {p50 * 1e6:>7.1f} {p95 * 1e6:>7.1f} "
+        f"{hot * 1e6:>7.1f}"
+    )
+
+
+def bench_json(tmp, pairs, keys, reads):
+    path = tmp / "results.json"
+    path.write_text(
+        json.dumps({key.hex(): text for key, text in pairs}, ensure_ascii=False),
+        encoding="utf-8",
+    )
+
+    def load():
+        return json.loads(path.read_text(encoding="utf-8"))
+
+    cache, memory, opened = traced(load)
+    latency = read_latency(lambda key: cache.get(key.hex()), keys, reads)
+    report("json dict", path.stat().st_size, memory, opened, latency)
+
+
+def bench_sqlite(tmp, pairs, keys, reads):
+    path = tmp / "results.sqlite3"
+    conn = sqlite3.connect(str(path))
+    conn.execute("CREATE TABLE results (key BLOB PRIMARY KEY, text TEXT)")
+    conn.executemany("INSERT OR IGNORE INTO results VALUES (?, ?)", pairs)
+    conn.commit()
+    conn.close()
+
+    conn, memory, opened = traced(lambda: sqlite3.connect(str(path)))
+
+    def get(key):
+        row = conn.execute("SELECT text FROM results WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    latency = read_latency(get, keys, reads)
+    conn.close()
+    report("sqlite", path.stat().st_size, memory, opened, latency)
+
+
+def bench_store(label, tmp, pairs, keys, reads, train_after):
+    directory = tmp / label.replace(" ", "-")
+    result_store.TRAIN_AFTER = train_after
+    store = ResultStore(directory)
+    for key, text in pairs:
+        store.put(key, text)
+    store.close()
+
+    def load():
+        opened = ResultStore(directory)
+        opened.get(keys[0])
+        return opened
+
+    store, memory, opened = traced(load)
+    latency = read_latency(store.get, keys, reads)
+    stats = store.stats()
+    store.close()
+    report(label, directory_size(directory), memory, opened, latency)
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50000)
+    parser.add_argument("--repeated", type=float, default=0.3)
+    parser.add_argument("--reads", type=int, default=20000)
+    args = parser.parse_args()
+    train_after = result_store.TRAIN_AFTER
+
+    pairs = make_results(args.requests, args.repeated)
+    keys = [key for key, _ in pairs]
+    raw = sum(len(text.encode("utf-8")) for _, text in pairs)
+    unique = len({text for _, text in pairs})
+    print(
+        f"{args.requests:,} results, {unique:,} unique, "
+        f"{raw / 2**20:.1f} MB of text"
+    )
+    print(
+        f"{'storage':>16} {'disk KB':>9} {'mem KB':>9} {'open ms':>8} "
+        f"{'p50 us':>7} {'p95 us':>7} {'hot p50':>7}"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        bench_json(tmp, pairs, keys, args.reads)
+        bench_sqlite(tmp, pairs, keys, args.reads)
+        bench_store("no dictionary", tmp, pairs, keys, args.reads, args.requests + 1)
+        stats = bench_store("store", tmp, pairs, keys, args.reads, train_after)
+
+        directory = tmp / "store"
+        start = time.perf_counter()
+        ResultStore(directory).compact()
+        elapsed = time.perf_counter() - start
+        compacted = ResultStore(directory).stats()
+
+    print(
+        f"\nstore: {stats['values']:,} values for {stats['keys']:,} keys, "
+        f"values {stats['stored_bytes'] / stats['raw_bytes']:.0%} of their text, "
+        f"indexes {stats['index_bytes'] / 1024:,.0f} KB"
+    )
+    print(
+        f"compact ({elapsed:.1f} s, dictionary on the newest "
+        f"{result_store.TRAIN_SAMPLES}): values "
+        f"{compacted['stored_bytes'] / compacted['raw_bytes']:.0%} of their text"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark of interactive latency while background segments are queued
+
+Queues a batch of background document chunks on the network engine, then
+sends interactive translations at a fixed interval, as a person typing
+would. Reports the interactive queue wait and latency percentiles and the
+batch duration, once with a plain FIFO (the engine before the scheduler)
+and once with priority classes.
+
+Usage: python -m benchmarks.bench_scheduler [--background 200] [--slots 4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _percentiles(values):
+    ordered = sorted(values)
+    last = len(ordered) - 1
+    return [ordered[min(last, int(last * p / 100 + 0.5))] * 1000 for p in (50, 95)]
+
+
+def run(mode, args, base_url):
+    from PyQt6.QtCore import QCoreApplication, QTimer
+
+    from app.network_engine import NetworkEngine
+    from app.openai_client import build_translation_payload
+    from app.scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    if mode == "fifo":
+        # One class and no reserved slot behaves like the old request deque
+        scheduler = RequestScheduler(args.slots, reserved_slots=0)
+        background, interactive = BACKGROUND, BACKGROUND
+    else:
+        scheduler = RequestScheduler(args.slots)
+        background, interactive = BACKGROUND, INTERACTIVE
+    engine = NetworkEngine(scheduler=scheduler)
+
+    state = {"pending": args.background + args.interactive, "batch_done": None}
+    waits = []
+    latencies = []
+
+    def payload(i):
+        return build_translation_payload(
+            "benchmark", f"Translate the following text into 'Russian':\n\n{i}"
+        )
+
+    def finish_one():
+        state["pending"] -= 1
+        if state["pending"] == 0:
+            app.quit()
+
+    def on_batch_done():
+        state["remaining"] -= 1
+        if state["remaining"] == 0:
+            state["batch_done"] = time.perf_counter() - start
+        finish_one()
+
+    def send_interactive(i):
+        sent = time.perf_counter()
+        request = engine.submit(payload(f"typed {i}"), priority=interactive)
+
+        def done(_text=None):
+            waits.append(request.ticket.wait_seconds)
+            latencies.append(time.perf_counter() - sent)
+            finish_one()
+
+        request.finished.connect(done)
+        request.error.connect(done)
+        requests.append(request)
+
+    requests = []
+    state["remaining"] = args.background
+    start = time.perf_counter()
+    for i in range(args.background):
+        request = engine.submit(payload(i), priority=background)
+        request.finished.connect(on_batch_done)
+        request.error.connect(lambda _message: on_batch_done())
+        requests.append(request)
+    for i in range(args.interactive):
+        QTimer.singleShot(
+            int(args.interval * 1000 * (i + 1)), lambda i=i: send_interactive(i)
+        )
+    app.exec()
+
+    wait_p50, wait_p95 = _percentiles(waits)
+    latency_p50, latency_p95 = _percentiles(latencies)
+    print(
+        f"{mode:>9} {wait_p50:>9.0f} {wait_p95:>9.0f} {latency_p50:>12.0f} "
+        f"{latency_p95:>12.0f} {state['batch_done']:>8.2f}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--background", type=int, default=200)
+    parser.add_argument("--interactive", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.3)
+    parser.add_argument("--slots", type=int, default=4)
+    parser.add_argument("--tokens", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import start_server_process
+
+    server, base_url = start_server_process(delay=args.delay, tokens=args.tokens)
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["LINGUAGPT_CONFIG"] = str(Path(tmp) / "config.json")
+            from app.config import get_config
+
+            get_config().save(
+                api_key="benchmark",
+                api_base_url=base_url,
+                max_concurrent_requests=args.slots,
+                request_timeout=120,
+            )
+            print(
+                f"{args.background} background chunks, {args.interactive} "
+                f"interactive requests every {args.interval}s, {args.slots} slots"
+            )
+            print(
+                f"{'mode':>9} {'wait p50':>9} {'wait p95':>9} {'latency p50':>12} "
+                f"{'latency p95':>12} {'batch s':>8}   (ms unless noted)"
+            )
+            for mode in ("fifo", "priority"):
+                run(mode, args, base_url)
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
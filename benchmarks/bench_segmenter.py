@@ -0,0 +1,160 @@
+"""
+Benchmark of the sentence segmenter per language
+
+Builds a corpus per language from sentences with abbreviations, initials,
+numbers and quotes, checks that the segmenter finds exactly the sentences
+the corpus was built from and reports throughput in MB/s of UTF-8 text.
+
+Usage: python -m benchmarks.bench_segmenter [--size-mb 8] [--languages en,ru]
+       [--repeat 3]
+"""
+import argparse
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.segmenter import sentence_breaks  # noqa: E402
+
+SENTENCES = {
+    "en": [
+        "Mr. Smith arrived at 5 p.m. with Dr. Jones.",
+        "The results are in Fig. 3 of the report.",
+        "Prices rose by 3.5 percent in the U.S. last year!",
+        "Did J. R. R. Tolkien really write that?",
+        "We met at the office, e.g. in the small room.",
+        "It was the end of the story...",
+        "\"Are you coming?\" she asked.",
+        "Version 2.1 is available on the website.",
+    ],
+    "de": [
+        "Am 3. Oktober ist ein Feiertag in Deutschland.",
+        "Das gilt z.B. für alle Mitarbeiter bzw. Gäste.",
+        "Herr Dr. Müller kommt um 10 Uhr.",
+        "Siehe Abs. 2 und Nr. 14 der Verordnung!",
+        "Ist das wirklich so?",
+        "Die Preise stiegen um ca. 4 Prozent usw. und so fort.",
+        "„Kommst du mit?“ fragte sie.",
+    ],
+    "fr": [
+        "Mme. Dupont est arrivée à la gare.",
+        "Voir le chap. 4 pour les détails.",
+        "Il fait beau aujourd'hui!",
+        "«Bonjour», dit-il à voix basse.",
+        "Est-ce que tu viens ce soir?",
+        "Le prix est de 3,5 euros env. par kilo.",
+    ],
+    "es": [
+        "¿Qué hora es ahora mismo?",
+        "La Sra. García llegó tarde a la reunión.",
+        "Ver pág. 4 del informe anual.",
+        "¡Qué sorpresa tan agradable!",
+        "El Dr. Pérez trabaja en EE.UU. desde hace años.",
+        "Son las tres de la tarde.",
+    ],
+    "ru": [
+        "А. С. Пушкин родился в Москве.",
+        "Это было в 1999 г. в Санкт-Петербурге.",
+        "Мы купили хлеб, молоко и т. д. в магазине.",
+        "Подробности см. в табл. 3 на стр. 12.",
+        "Неужели это правда?",
+        "«Ты придёшь?» — спросила она.",
+        "Цена выросла на 3,5 тыс. руб. за год!",
+    ],
+    "kk": [
+        "Мен кеше мектепке бардым.",
+        "Ол 2020 ж. Алматыда туылған.",
+        "Кітаптар, дәптерлер т.б. заттар сатылады.",
+        "Бұл шынымен рас па?",
+        "Қандай керемет күн!",
+        "Біз А. Байтұрсынұлы көшесінде тұрамыз.",
+    ],
+    "zh": [
+        "今天天气很好。",
+        "你明天来吗？",
+        "他说：“好的！”",
+        "我们在北京见面了。",
+        "这本书的价格是3.5元。",
+    ],
+    "ja": [
+        "今日は晴れです。",
+        "明日は雨でしょうか？",
+        "「はい、そうです。」",
+        "東京駅で会いましょう！",
+        "価格は3.5ドルです。",
+    ],
+    "ko": [
+        "안녕하세요.",
+        "저는 학생입니다!",
+        "내일 비가 올까요?",
+        "서울역에서 만나요.",
+        "가격은 3.5달러입니다.",
+    ],
+}
+CJK = {"zh", "ja"}
+# The pattern the app used before the segmenter
+NAIVE_RE = re.compile(r"(?<=[.!?…。！？])\s+")
+
+
+def make_corpus(language, size_mb, seed=1):
+    """Text of roughly size_mb megabytes and its number of sentences"""
+    rng = random.Random(seed)
+    sentences = SENTENCES[language]
+    joiner = "" if language in CJK else " "
+    target = int(size_mb * 1024 * 1024)
+    paragraphs = []
+    count = 0
+    size = 0
+    while size < target:
+        chosen = [rng.choice(sentences) for _ in range(rng.randint(1, 8))]
+        paragraph = joiner.join(chosen)
+        paragraphs.append(paragraph)
+        count += len(chosen)
+        size += len(paragraph.encode("utf-8")) + 2
+    return "\n\n".join(paragraphs), count
+
+
+def best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size-mb", type=float, default=8)
+    parser.add_argument("--languages", default=",".join(SENTENCES))
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(
+        f"{'language':>8} {'MB':>6} {'sentences':>10} {'found':>10} "
+        f"{'MB/s':>7} {'sent/s':>9} {'naive MB/s':>11}"
+    )
+    for language in args.languages.split(","):
+        text, expected = make_corpus(language, args.size_mb)
+        megabytes = len(text.encode("utf-8")) / 2**20
+        list(sentence_breaks(text[:1000], language))  # compile the rules
+
+        elapsed, found = best_time(
+            lambda: sum(1 for _ in sentence_breaks(text, language)) + 1, args.repeat
+        )
+        naive, _ = best_time(
+            lambda: sum(1 for _ in NAIVE_RE.finditer(text)), args.repeat
+        )
+        print(
+            f"{language:>8} {megabytes:>6.1f} {expected:>10} {found:>10} "
+            f"{megabytes / elapsed:>7.1f} {found / elapsed:>9.0f} "
+            f"{megabytes / naive:>11.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
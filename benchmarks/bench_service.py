@@ -0,0 +1,147 @@
+"""
+Load test of the local HTTP translation service
+
+Starts the service against a local fake endpoint, then runs one "greedy"
+client that queues a burst of requests next to many light clients sending
+one streaming request each. With per-client round-robin the light clients'
+latency stays close to a single request's even while the burst is queued.
+
+Usage: python -m benchmarks.bench_service [--clients 200] [--burst 50]
+"""
+import argparse
+import http.client
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+
+def post(port, body, client_id):
+    """POST /translate, returns (seconds, translation)"""
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=300)
+    start = time.perf_counter()
+    connection.request(
+        "POST",
+        "/translate",
+        json.dumps(body),
+        {"Content-Type": "application/json", "X-Client-Id": client_id},
+    )
+    response = connection.getresponse()
+    if body.get("stream"):
+        text = ""
+        for line in response:
+            if not line.startswith(b"data: "):
+                continue
+            event = json.loads(line[6:])
+            if "error" in event:
+                raise RuntimeError(event["error"])
+            if "rewind" in event:
+                text = text[: len(text) - event["rewind"]]
+            text += event.get("delta", "")
+            if event.get("done"):
+                break
+    else:
+        result = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(result.get("error"))
+        text = result["translation"]
+    connection.close()
+    return time.perf_counter() - start, text
+
+
+def get_json(port, path):
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    connection.request("GET", path)
+    result = json.loads(connection.getresponse().read())
+    connection.close()
+    return result
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int((len(ordered) - 1) * p / 100 + 0.5))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--burst", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import start_server_process
+
+    fake, base_url = start_server_process(delay=args.delay)
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["LINGUAGPT_CONFIG"] = str(Path(tmp.name) / "config.json")
+
+    from app.config import get_config
+    from app.service import TranslationService
+
+    get_config().save(api_key="benchmark", api_base_url=base_url, request_timeout=120)
+    service = TranslationService(("127.0.0.1", 0), workers=args.workers)
+    threading.Thread(target=service.serve_forever, daemon=True).start()
+    port = service.server_address[1]
+
+    light, greedy, errors = [], [], []
+
+    def run(times, body, client_id):
+        try:
+            seconds, text = post(port, body, client_id)
+            if text != body["text"]:
+                raise RuntimeError(f"unexpected translation {text!r}")
+            times.append(seconds)
+        except Exception as e:
+            errors.append(str(e))
+
+    def request_body(i, client, stream):
+        text = f"Request {i} from {client}. " * 8
+        return {"text": text.strip(), "target": "Russian", "stream": stream}
+
+    threads = [
+        threading.Thread(
+            target=run, args=(greedy, request_body(i, "greedy", False), "greedy")
+        )
+        for i in range(args.burst)
+    ]
+    threads += [
+        threading.Thread(
+            target=run, args=(light, request_body(i, "light", True), f"light-{i}")
+        )
+        for i in range(args.clients)
+    ]
+
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    total = len(light) + len(greedy)
+    print(f"{total} requests in {elapsed:.2f} s ({total / elapsed:.1f} req/s), "
+          f"{len(errors)} errors")
+    for name, times in (("light", light), ("greedy", greedy)):
+        if times:
+            print(
+                f"{name:>8}: p50 {percentile(times, 50) * 1000:7.0f} ms  "
+                f"p99 {percentile(times, 99) * 1000:7.0f} ms"
+            )
+    print("service /stats:")
+    print(json.dumps(get_json(port, "/stats"), indent=2))
+
+    service.shutdown()
+    service.server_close()
+    fake.terminate()
+    tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
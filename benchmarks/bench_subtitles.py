@@ -0,0 +1,93 @@
+"""
+Benchmark of batched subtitle translation
+
+Generates a multi-thousand-cue SRT file, translates it through a local fake
+endpoint with different worker counts and reports cues per second. The
+output is checked to keep every cue number and timing.
+
+Usage: python -m benchmarks.bench_subtitles [--cues 5000] [--workers 1 4 16]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+WORDS = (
+    "you we they never always here there said think know maybe tomorrow "
+    "night road house back again right wait what why look"
+).split()
+
+
+def timestamp(ms):
+    hours, ms = divmod(ms, 3600000)
+    minutes, ms = divmod(ms, 60000)
+    seconds, ms = divmod(ms, 1000)
+    return f"{hours:02}:{minutes:02}:{seconds:02},{ms:03}"
+
+
+def make_srt(cues, seed=1):
+    """Generate an SRT file with one- and two-line cues"""
+    rng = random.Random(seed)
+    blocks = []
+    position = 0
+    for number in range(1, cues + 1):
+        start = position + rng.randint(100, 800)
+        end = start + rng.randint(900, 4000)
+        position = end
+        lines = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 8))).capitalize()
+            for _ in range(rng.choice((1, 1, 2)))
+        ]
+        blocks.append(
+            f"{number}\n{timestamp(start)} --> {timestamp(end)}\n" + "\n".join(lines)
+        )
+    return "\n\n".join(blocks) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cues", type=int, default=5000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import start_server_process
+
+    server, base_url = start_server_process(delay=args.delay, piece=64)
+    tmp = tempfile.TemporaryDirectory()
+    os.environ["LINGUAGPT_CONFIG"] = str(Path(tmp.name) / "config.json")
+
+    from app.config import get_config
+    from app.subtitles import parse_subtitles, translate_subtitles
+
+    get_config().save(api_key="benchmark", api_base_url=base_url, request_timeout=120)
+    srt = make_srt(args.cues)
+    source = parse_subtitles(srt)
+    print(f"{args.cues} cues, {len(srt) / 1024:.0f} KB, "
+          f"{len(source.make_batches())} batches")
+    print(f"{'workers':>8} {'seconds':>8} {'cues/s':>10}")
+    try:
+        for workers in args.workers:
+            start = time.perf_counter()
+            output = translate_subtitles(srt, "Russian", workers=workers)
+            elapsed = time.perf_counter() - start
+
+            result = parse_subtitles(output)
+            assert [c.timing for c in result.cues] == [c.timing for c in source.cues]
+            assert [c.identifier for c in result.cues] == [
+                c.identifier for c in source.cues
+            ]
+            print(f"{workers:>8} {elapsed:>8.2f} {args.cues / elapsed:>10.0f}")
+    finally:
+        server.terminate()
+        tmp.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Benchmark of the watch-folder daemon's incremental scans
+
+Fills a folder with Markdown and plain text files and runs one scan per
+scenario through FolderWatcher with a persistent state DB: the first
+translation, a restart with nothing changed, one edited sentence in a
+tenth of the files, and every file touched without changing its content.
+Reports the scan time, files read, requests sent and segments sent or
+reused from the state DB.
+
+Usage: python -m benchmarks.bench_watch [--files 300] [--sentences 40]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+WORDS = (
+    "report budget team release customer server update meeting review plan "
+    "design feature issue market quarter price contract deadline schedule"
+).split()
+
+
+def sentence(rng):
+    words = [rng.choice(WORDS) for _ in range(rng.randint(5, 12))]
+    return " ".join(words).capitalize() + "."
+
+
+def make_file(rng, index, sentences):
+    lines = [sentence(rng) for _ in range(sentences)]
+    if index % 2:
+        paragraphs = [" ".join(lines[i:i + 4]) for i in range(0, len(lines), 4)]
+        return ".txt", "\n\n".join(paragraphs) + "\n"
+    body = "\n\n".join(
+        f"## Section {i // 8 + 1}\n\n" + " ".join(lines[i:i + 8])
+        for i in range(0, len(lines), 8)
+    )
+    return ".md", f"# Document {index}\n\n{body}\n"
+
+
+def settle(paths, offset):
+    """Date files back so the watcher does not wait for writers"""
+    stamp = time.time() - 60 + offset
+    for path in paths:
+        os.utime(path, (stamp, stamp))
+
+
+def run_scan(label, folder, state_file, server):
+    from app.watch_folder import FolderWatcher, WatchState
+
+    folders = [{"path": str(folder), "targets": ["Russian"], "source": "Auto"}]
+    served = server.served
+    start = time.perf_counter()
+    watcher = FolderWatcher(folders, WatchState(state_file), workers=4)
+    watcher.run(once=True)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:>16} {elapsed:>8.2f} {watcher.read:>6} {watcher.translated:>11} "
+        f"{server.served - served:>9} {watcher.segments_sent:>6} "
+        f"{watcher.segments_reused:>7}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--sentences", type=int, default=40)
+    parser.add_argument("--delay", type=float, default=0.005)
+    args = parser.parse_args()
+
+    from benchmarks.fake_openai_server import start_server
+
+    server = start_server(delay=args.delay)
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        os.environ["LINGUAGPT_CONFIG"] = str(tmp / "config.json")
+        from app.config import get_config
+
+        get_config().save(api_key="benchmark", api_base_url=server.base_url)
+        folder = tmp / "inbox"
+        folder.mkdir()
+        sources = []
+        for index in range(args.files):
+            suffix, text = make_file(rng, index, args.sentences)
+            path = folder / f"doc{index}{suffix}"
+            path.write_text(text, encoding="utf-8")
+            sources.append(path)
+        settle(sources, 0)
+        state_file = tmp / "state.sqlite3"
+
+        print(f"{args.files} files of {args.sentences} sentences into Russian")
+        print(
+            f"{'scan':>16} {'seconds':>8} {'read':>6} {'translated':>11} "
+            f"{'requests':>9} {'sent':>6} {'reused':>7}"
+        )
+        run_scan("first", folder, state_file, server)
+        run_scan("restart", folder, state_file, server)
+
+        edited = sources[::10]
+        for path in edited:
+            text = path.read_text(encoding="utf-8")
+            first = text.index(".") + 1
+            path.write_text(
+                text[:first] + " One sentence was edited." + text[first:],
+                encoding="utf-8",
+            )
+        settle(edited, 1)
+        run_scan("edited 10%", folder, state_file, server)
+
+        settle(sources, 2)
+        run_scan("touched all", folder, state_file, server)
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
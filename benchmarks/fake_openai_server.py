@@ -0,0 +1,212 @@
+"""
+Local stand-in for the chat completions endpoint used by benchmarks
+
+Streams SSE responses with a configurable per-token delay and returns 429
+when more requests are in flight than the current capacity, which may
+change over time (capacity_schedule). By default the
+text to translate (everything after the prompt's "...:" header line) is
+echoed back, so round trips through the app can be verified.
+
+Usage: python -m benchmarks.fake_openai_server [--port 8765] [--delay 0.01]
+       [--capacity 8] [--capacity-schedule 0:8,10:3,20:12]
+Point the app at it with "api_base_url": "http://127.0.0.1:8765/v1".
+"""
+import argparse
+import json
+import multiprocessing
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIServer(ThreadingHTTPServer):
+    """Threaded HTTP server with shared load accounting"""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        address,
+        delay=0.01,
+        tokens=None,
+        capacity=None,
+        piece=16,
+        capacity_schedule=None,
+    ):
+        super().__init__(address, _Handler)
+        self.delay = delay
+        self.tokens = tokens
+        self.capacity = capacity
+        # [(seconds since start, capacity), ...] overrides capacity from then on
+        self.capacity_schedule = sorted(capacity_schedule or [])
+        self.started = time.monotonic()
+        self.piece = piece
+        self.active = 0
+        self.served = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+
+    def current_capacity(self):
+        capacity = self.capacity
+        elapsed = time.monotonic() - self.started
+        for seconds, scheduled in self.capacity_schedule:
+            if seconds > elapsed:
+                break
+            capacity = scheduled
+        return capacity
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.0"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        length = int(self.headers.get("Content-Length", 0))
+        payload = json.loads(self.rfile.read(length) or b"{}")
+
+        capacity = server.current_capacity()
+        with server.lock:
+            if capacity is not None and server.active >= capacity:
+                server.throttled += 1
+                throttled = True
+            else:
+                server.active += 1
+                throttled = False
+            active = server.active
+        if throttled:
+            self._send_json(
+                429,
+                {"error": {"message": "Rate limit reached"}},
+                {"retry-after": "0.5"},
+            )
+            return
+
+        try:
+            # Latency inflates as load approaches capacity
+            delay = server.delay
+            if capacity:
+                delay *= 1 + active / capacity
+            text = self._completion_text(payload)
+            headers = {
+                "x-ratelimit-remaining-requests": "1000",
+                "x-ratelimit-remaining-tokens": "1000000",
+                "x-ratelimit-reset-requests": "1s",
+                "x-ratelimit-reset-tokens": "1s",
+            }
+            if payload.get("stream"):
+                self._stream(text, delay, headers)
+            else:
+                time.sleep(delay)
+                self._send_json(
+                    200,
+                    {"choices": [{"message": {"role": "assistant", "content": text}}]},
+                    headers,
+                )
+        finally:
+            with server.lock:
+                server.active -= 1
+                server.served += 1
+
+    def _completion_text(self, payload):
+        server = self.server
+        if server.tokens is not None:
+            return "lorem " * server.tokens
+        messages = payload.get("messages") or [{"content": ""}]
+        user_text = messages[-1]["content"]
+        if "Suggest 3 alternative" in user_text:
+            return "1. first option\n2. second option\n3. third option"
+        return user_text.split(":\n\n", 1)[-1]
+
+    def _send_json(self, status, body, headers=None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _stream(self, text, delay, headers):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        piece = self.server.piece
+        for i in range(0, len(text), piece):
+            time.sleep(delay)
+            event = {"choices": [{"delta": {"content": text[i:i + piece]}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def parse_schedule(text):
+    """Parse "0:8,10:3" into [(0.0, 8), (10.0, 3)]"""
+    schedule = []
+    for part in filter(None, text.split(",")):
+        seconds, capacity = part.split(":")
+        schedule.append((float(seconds), int(capacity)))
+    return schedule
+
+
+def start_server(port=0, **options):
+    """Start the server in a background thread, returns the server"""
+    server = FakeOpenAIServer(("127.0.0.1", port), **options)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _serve_in_process(connection, options):
+    server = FakeOpenAIServer(("127.0.0.1", 0), **options)
+    connection.send(server.base_url)
+    server.serve_forever()
+
+
+def start_server_process(**options):
+    """Start the server in a separate process, returns (process, base_url)
+
+    Keeps the server's threads and memory out of the benchmarked process.
+    """
+    parent, child = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=_serve_in_process, args=(child, options), daemon=True
+    )
+    process.start()
+    return process, parent.recv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--delay", type=float, default=0.01)
+    parser.add_argument("--tokens", type=int, default=None)
+    parser.add_argument("--capacity", type=int, default=None)
+    parser.add_argument("--capacity-schedule", default="")
+    args = parser.parse_args()
+
+    server = FakeOpenAIServer(
+        ("127.0.0.1", args.port),
+        delay=args.delay,
+        tokens=args.tokens,
+        capacity=args.capacity,
+        capacity_schedule=parse_schedule(args.capacity_schedule),
+    )
+    print(f"Serving on {server.base_url}")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,12 @@
 Script for building LinguaGPT into an executable file
 """
 
+import argparse
+import ast
 import os
 import sys
 import subprocess
+from pathlib import Path
 
 import PyInstaller.__main__
 
@@ -20,6 +23,126 @@ is_github_actions = os.environ.get('GITHUB_ACTIONS') == 'true'
 app_name = "LinguaGPT"
 main_script = "main.py"
 
+# Plugins loaded depending on the desktop, kept whatever the trace says
+KEPT_PLUGIN_DIRS = (
+    "platforms",
+    "platformthemes",
+    "platforminputcontexts",
+    "xcbglintegrations",
+    "egldeviceintegrations",
+    "styles",
+    "tls",
+)
+# Qt loads every image format plugin when it first lists formats, so the
+# trace cannot tell; the app's images are PNG, which is built into QtGui
+UNUSED_PLUGIN_DIRS = ("imageformats", "iconengines")
+# Standard library packages the app never needs unless a trace saw them
+UNUSED_STDLIB = (
+    "tkinter",
+    "unittest",
+    "doctest",
+    "pydoc",
+    "pydoc_data",
+    "lib2to3",
+    "distutils",
+    "setuptools",
+    "pkg_resources",
+    "pip",
+    "xmlrpc",
+    "curses",
+    "idlelib",
+    "turtle",
+    "turtledemo",
+    "ensurepip",
+    "venv",
+    "test",
+)
+
+
+def app_imports():
+    """Module names imported anywhere in the app's sources"""
+    names = set()
+    for path in [Path(main_script), *Path("app").glob("*.py")]:
+        tree = ast.parse(path.read_text(encoding="utf-8"))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names.update(alias.name for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                names.add(node.module)
+                names.update(f"{node.module}.{alias.name}" for alias in node.names)
+    return names
+
+
+def load_traces(paths):
+    """Merged import traces, empty without any"""
+    from app import import_trace
+
+    trace = {"sessions": 0, "modules": [], "qt_plugins": None}
+    for path in paths:
+        trace = import_trace.merge(trace, import_trace.load(path))
+    return trace
+
+
+def startup_excludes(trace):
+    """PyQt6 modules and stdlib packages neither imported nor traced"""
+    import PyQt6
+
+    used = app_imports() | set(trace["modules"])
+    top_level = {name.split(".")[0] for name in used}
+    qt_modules = sorted(
+        {
+            path.name.split(".")[0]
+            for path in Path(PyQt6.__file__).parent.glob("Qt*")
+            if path.suffix in (".so", ".pyd")
+        }
+    )
+    excludes = [
+        f"PyQt6.{name}" for name in qt_modules if f"PyQt6.{name}" not in used
+    ]
+    excludes.extend(name for name in UNUSED_STDLIB if name not in top_level)
+    return excludes
+
+
+def prune_qt_files(bundle, trace):
+    """Remove Qt plugins and translations a session does not load, returns bytes"""
+    qt_dir = next(
+        (
+            path
+            for path in bundle.rglob("Qt6")
+            if path.is_dir() and path.parent.name == "PyQt6"
+        ),
+        None,
+    )
+    if qt_dir is None:
+        return 0
+    traced = trace["qt_plugins"]
+    removed = []
+    plugins = qt_dir / "plugins"
+    for category in sorted(plugins.iterdir()) if plugins.is_dir() else []:
+        name = category.name
+        if name in KEPT_PLUGIN_DIRS or name.startswith("wayland"):
+            continue
+        for plugin in category.iterdir():
+            if name in UNUSED_PLUGIN_DIRS or (
+                traced is not None and f"{name}/{plugin.name}" not in traced
+            ):
+                removed.append(plugin)
+    # No QTranslator is installed, Qt's own translations are never read
+    translations = qt_dir / "translations"
+    if translations.is_dir():
+        removed.extend(translations.iterdir())
+
+    freed = 0
+    for path in removed:
+        if path.is_file():
+            freed += path.stat().st_size
+            path.unlink()
+    for directory in [*plugins.glob("*"), translations]:
+        if directory.is_dir() and not any(directory.iterdir()):
+            directory.rmdir()
+    return freed
+
+
 def check_qt6_libraries():
     """Check if Qt6 libraries are available on Linux"""
     if not is_linux:
@@ -46,141 +169,220 @@ def check_qt6_libraries():
         print("[INFO] Qt6 libraries found")
     return True
 
-# PyInstaller parameters - simplified and more reliable
-pyinstaller_args = [
-    main_script,
-    f"--name={app_name}",
-    "--onefile",
-    "--windowed",
-    "--clean",
-    "--noconfirm",
-    # Only exclude modules that are definitely not needed
-    "--exclude-module=PyQt6.QtMultimedia",
-    "--exclude-module=PyQt6.QtWebEngine",
-    "--exclude-module=PyQt6.Qt3D",
-    "--exclude-module=PyQt6.QtQuick3D",
-    "--exclude-module=PyQt6.QtBluetooth",
-    "--exclude-module=PyQt6.QtPositioning",
-    "--exclude-module=PyQt6.QtSensors",
-    "--exclude-module=PyQt6.QtSerialPort",
-    "--exclude-module=PyQt6.QtWebChannel",
-    "--exclude-module=PyQt6.QtWebSockets",
-    "--exclude-module=PyQt6.QtTextToSpeech",
-    "--exclude-module=PyQt6.QtNfc",
-    "--exclude-module=PyQt6.QtSpatialAudio",
-]
-
-# Essential hidden imports
-pyinstaller_args.extend([
-    "--hidden-import=PyQt6.QtCore",
-    "--hidden-import=PyQt6.QtGui",
-    "--hidden-import=PyQt6.QtWidgets",
-    "--hidden-import=PyQt6.QtNetwork",
-    "--hidden-import=PyQt6.QtPrintSupport",
-    "--hidden-import=PyQt6.QtSvg",
-])
-
-# Add platform-specific configurations
-if is_linux:
-    if is_github_actions:
-        try:
-            print("[CONFIG] Configuring for GitHub Actions Linux environment")
-        except UnicodeEncodeError:
-            print("[CONFIG] Configuring for GitHub Actions Linux environment")
-        
-        # Add Qt6 runtime path for GitHub Actions
-        qt6_path = "/usr/lib/x86_64-linux-gnu"
-        if os.path.exists(qt6_path):
-            # Try to find Qt6 libraries with different naming conventions
-            qt_libs = [
-                "libQt6Core.so.6", "libQt6Gui.so.6", "libQt6Widgets.so.6",
-                "libQt6Network.so.6", "libQt6PrintSupport.so.6", "libQt6Svg.so.6"
-            ]
-            
-            for lib in qt_libs:
-                lib_path = f"{qt6_path}/{lib}"
-                if os.path.exists(lib_path):
-                    pyinstaller_args.append(f"--add-binary={lib_path}:.")
-                else:
-                    try:
-                        print(f"[WARNING] Library not found: {lib_path}")
-                    except UnicodeEncodeError:
-                        print(f"[WARNING] Library not found: {lib_path}")
-    
-    # Add essential Qt6 plugins for Linux
-    pyinstaller_args.extend([
-        "--collect-binaries=PyQt6.Qt6.plugins.platforms",
-        "--collect-binaries=PyQt6.Qt6.plugins.platformthemes",
-        "--collect-binaries=PyQt6.Qt6.plugins.styles",
-        "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
-        "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
-    ])
-
-elif is_windows:
-    pyinstaller_args.extend([
-        "--collect-binaries=PyQt6.Qt6.plugins.platforms",
-        "--collect-binaries=PyQt6.Qt6.plugins.styles",
-        "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
-        "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
-    ])
-
-elif is_mac:
-    pyinstaller_args.extend([
-        "--collect-binaries=PyQt6.Qt6.plugins.platforms",
-        "--collect-binaries=PyQt6.Qt6.plugins.styles",
-        "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
-        "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
-    ])
-
-# Start build
-try:
-    print(f"[BUILD] Building {app_name} for {sys.platform}...")
-    print(f"[BUILD] Parameters: {' '.join(pyinstaller_args)}")
-except UnicodeEncodeError:
-    # Fallback for Windows consoles without Unicode support
-    print(f"[BUILD] Building {app_name} for {sys.platform}...")
-    print("[BUILD] Parameters configured successfully")
-
-# Check Qt6 libraries on Linux
-if is_linux and not check_qt6_libraries():
-    print("[WARNING] Some Qt6 libraries are missing. Build may fail.")
-
-try:
-    PyInstaller.__main__.run(pyinstaller_args)
-    
+
+def parse_args():
+    """Parse build options"""
+    parser = argparse.ArgumentParser(description="Build LinguaGPT with PyInstaller")
+    parser.add_argument(
+        "--profile",
+        choices=("onefile", "startup"),
+        default="onefile",
+        help="onefile: one executable; startup: a folder tuned for launch speed",
+    )
+    parser.add_argument(
+        "--trace",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="import trace from main.py --record-imports, prunes the startup build",
+    )
+    parser.add_argument(
+        "--strip", action="store_true", help="strip symbols from binaries"
+    )
+    parser.add_argument(
+        "--upx", action="store_true", help="pack binaries with UPX, smaller but slower"
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Build the profile selected on the command line"""
+    args = parse_args()
+    # The startup profile bundles bytecode compiled with -O (the app has no asserts)
+    if args.profile == "startup" and not sys.flags.optimize:
+        sys.exit(subprocess.call([sys.executable, "-O", *sys.argv]))
+
+    # PyInstaller parameters - simplified and more reliable
+    pyinstaller_args = [
+        main_script,
+        f"--name={app_name}",
+        "--onefile",
+        "--windowed",
+        "--clean",
+        "--noconfirm",
+        # Only exclude modules that are definitely not needed
+        "--exclude-module=PyQt6.QtMultimedia",
+        "--exclude-module=PyQt6.QtWebEngine",
+        "--exclude-module=PyQt6.Qt3D",
+        "--exclude-module=PyQt6.QtQuick3D",
+        "--exclude-module=PyQt6.QtBluetooth",
+        "--exclude-module=PyQt6.QtPositioning",
+        "--exclude-module=PyQt6.QtSensors",
+        "--exclude-module=PyQt6.QtSerialPort",
+        "--exclude-module=PyQt6.QtWebChannel",
+        "--exclude-module=PyQt6.QtWebSockets",
+        "--exclude-module=PyQt6.QtTextToSpeech",
+        "--exclude-module=PyQt6.QtNfc",
+        "--exclude-module=PyQt6.QtSpatialAudio",
+    ]
+
+    # Pre-rendered icons, loaded instead of painting at startup
+    pyinstaller_args.append(
+        f"--add-data=resources/icons{os.pathsep}resources/icons"
+    )
+
+    excludes = []
+    if args.profile == "startup":
+        # A folder starts without unpacking the Qt payload to a temp dir first
+        trace = load_traces(args.trace)
+        pyinstaller_args[pyinstaller_args.index("--onefile")] = "--onedir"
+        pyinstaller_args.extend(["--distpath=dist/startup", "--workpath=build/startup"])
+        excludes = startup_excludes(trace)
+        pyinstaller_args.extend(f"--exclude-module={name}" for name in excludes)
+        print(
+            f"[CONFIG] Startup profile: {trace['sessions']} traced sessions, "
+            f"{len(excludes)} modules excluded"
+        )
+    else:
+        # Essential hidden imports
+        pyinstaller_args.extend([
+            "--hidden-import=PyQt6.QtCore",
+            "--hidden-import=PyQt6.QtGui",
+            "--hidden-import=PyQt6.QtWidgets",
+            "--hidden-import=PyQt6.QtNetwork",
+            "--hidden-import=PyQt6.QtPrintSupport",
+            "--hidden-import=PyQt6.QtSvg",
+        ])
+
+    if args.strip and not is_windows:
+        pyinstaller_args.append("--strip")
+    if args.upx:
+        # Packed Qt platform plugins and the runtime DLLs fail to load
+        pyinstaller_args.extend([
+            "--upx-exclude=qwindows.dll",
+            "--upx-exclude=vcruntime140.dll",
+            "--upx-exclude=python3.dll",
+        ])
+    elif args.profile == "startup":
+        # Packed binaries are unpacked in memory on every launch
+        pyinstaller_args.append("--noupx")
+
+    # Add platform-specific configurations
+    if is_linux:
+        if is_github_actions:
+            try:
+                print("[CONFIG] Configuring for GitHub Actions Linux environment")
+            except UnicodeEncodeError:
+                print("[CONFIG] Configuring for GitHub Actions Linux environment")
+
+            # Add Qt6 runtime path for GitHub Actions
+            qt6_path = "/usr/lib/x86_64-linux-gnu"
+            if os.path.exists(qt6_path):
+                # Try to find Qt6 libraries with different naming conventions
+                qt_libs = [
+                    "libQt6Core.so.6", "libQt6Gui.so.6", "libQt6Widgets.so.6",
+                    "libQt6Network.so.6", "libQt6PrintSupport.so.6", "libQt6Svg.so.6"
+                ]
+
+                for lib in qt_libs:
+                    module = "PyQt6.Qt" + lib[len("libQt6"):].split(".")[0]
+                    if module in excludes:
+                        continue
+                    lib_path = f"{qt6_path}/{lib}"
+                    if os.path.exists(lib_path):
+                        pyinstaller_args.append(f"--add-binary={lib_path}:.")
+                    else:
+                        try:
+                            print(f"[WARNING] Library not found: {lib_path}")
+                        except UnicodeEncodeError:
+                            print(f"[WARNING] Library not found: {lib_path}")
+
+        # Add essential Qt6 plugins for Linux
+        pyinstaller_args.extend([
+            "--collect-binaries=PyQt6.Qt6.plugins.platforms",
+            "--collect-binaries=PyQt6.Qt6.plugins.platformthemes",
+            "--collect-binaries=PyQt6.Qt6.plugins.styles",
+            "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
+            "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
+        ])
+
+    elif is_windows:
+        pyinstaller_args.extend([
+            "--collect-binaries=PyQt6.Qt6.plugins.platforms",
+            "--collect-binaries=PyQt6.Qt6.plugins.styles",
+            "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
+            "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
+        ])
+
+    elif is_mac:
+        pyinstaller_args.extend([
+            "--collect-binaries=PyQt6.Qt6.plugins.platforms",
+            "--collect-binaries=PyQt6.Qt6.plugins.styles",
+            "--collect-binaries=PyQt6.Qt6.plugins.iconengines",
+            "--collect-binaries=PyQt6.Qt6.plugins.imageformats",
+        ])
+
+    # Start build
     try:
-        print(f"\n[SUCCESS] Build completed successfully!")
+        print(f"[BUILD] Building {app_name} for {sys.platform}...")
+        print(f"[BUILD] Parameters: {' '.join(pyinstaller_args)}")
     except UnicodeEncodeError:
-        print("\n[SUCCESS] Build completed successfully!")
+        # Fallback for Windows consoles without Unicode support
+        print(f"[BUILD] Building {app_name} for {sys.platform}...")
+        print("[BUILD] Parameters configured successfully")
+
+    # Check Qt6 libraries on Linux
+    if is_linux and not check_qt6_libraries():
+        print("[WARNING] Some Qt6 libraries are missing. Build may fail.")
+
+    try:
+        PyInstaller.__main__.run(pyinstaller_args)
+
+        if args.profile == "startup":
+            freed = prune_qt_files(Path("dist/startup"), trace)
+            print(
+                f"[INFO] Pruned {freed / 2**20:.1f} MB of unused Qt plugins, "
+                "translations"
+            )
 
-    if is_windows:
         try:
-            print(f"[INFO] Executable file: dist/{app_name}.exe")
+            print(f"\n[SUCCESS] Build completed successfully!")
         except UnicodeEncodeError:
-            print(f"[INFO] Executable file: dist/{app_name}.exe")
-    elif is_mac:
+            print("\n[SUCCESS] Build completed successfully!")
+
+        if args.profile == "startup":
+            print(f"[INFO] Application folder: dist/startup/{app_name}")
+        elif is_windows:
+            try:
+                print(f"[INFO] Executable file: dist/{app_name}.exe")
+            except UnicodeEncodeError:
+                print(f"[INFO] Executable file: dist/{app_name}.exe")
+        elif is_mac:
+            try:
+                print(f"[INFO] Application: dist/{app_name}.app")
+            except UnicodeEncodeError:
+                print(f"[INFO] Application: dist/{app_name}.app")
+        else:
+            try:
+                print(f"[INFO] Executable file: dist/{app_name}")
+            except UnicodeEncodeError:
+                print(f"[INFO] Executable file: dist/{app_name}")
+
         try:
-            print(f"[INFO] Application: dist/{app_name}.app")
+            print("\n[INFO] You can now distribute application!")
         except UnicodeEncodeError:
-            print(f"[INFO] Application: dist/{app_name}.app")
-    else:
+            print("\n[INFO] You can now distribute application!")
+
+    except Exception as e:
         try:
-            print(f"[INFO] Executable file: dist/{app_name}")
+            print(f"\n[ERROR] Build error: {e}")
         except UnicodeEncodeError:
-            print(f"[INFO] Executable file: dist/{app_name}")
+            print(f"\n[ERROR] Build error occurred")
 
-    try:
-        print("\n[INFO] You can now distribute application!")
-    except UnicodeEncodeError:
-        print("\n[INFO] You can now distribute application!")
+        if is_github_actions:
+            print("[INFO] This is a known issue with GitHub Actions Qt6 environment.")
+            print("[INFO] The build artifacts may still work despite warnings.")
+        sys.exit(1)
 
-except Exception as e:
-    try:
-        print(f"\n[ERROR] Build error: {e}")
-    except UnicodeEncodeError:
-        print(f"\n[ERROR] Build error occurred")
-    
-    if is_github_actions:
-        print("[INFO] This is a known issue with GitHub Actions Qt6 environment.")
-        print("[INFO] The build artifacts may still work despite warnings.")
-    sys.exit(1)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -2,26 +2,211 @@
 LinguaGPT application entry point
 """
 
+import argparse
+import multiprocessing
+import os
 import sys
 
-from PyQt6.QtWidgets import QApplication
+# Imported before anything heavy so its clock starts as early as possible
+from app.startup_trace import trace
 
-from app.main_window import GPTTranslator
-from app.utils import get_dark_palette
+
+def parse_args(argv):
+    """Parse app options, leaving Qt's own arguments alone"""
+    parser = argparse.ArgumentParser(prog="LinguaGPT", add_help=False)
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print cold start phase timings to stderr",
+    )
+    parser.add_argument(
+        "--translate",
+        nargs="?",
+        const="-",
+        metavar="TEXT",
+        help="translate TEXT, or stdin if omitted or -, in the running instance",
+    )
+    parser.add_argument("--settings", action="store_true", help="open settings")
+    parser.add_argument(
+        "--serve",
+        nargs="?",
+        const=0,
+        type=int,
+        metavar="PORT",
+        help="run the local HTTP translation service instead of the window",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="translate files dropped into the watch folders instead of the window",
+    )
+    parser.add_argument(
+        "--import-memory",
+        metavar="FILE",
+        help="import a .tmx or .csv file into the translation memory and exit",
+    )
+    parser.add_argument(
+        "--export-memory",
+        metavar="FILE",
+        help="export the translation memory to a .tmx or .csv file and exit",
+    )
+    parser.add_argument(
+        "--watchdog",
+        nargs="?",
+        const=200,
+        type=int,
+        metavar="MS",
+        help="log event-loop stalls longer than MS with a stack sample",
+    )
+    parser.add_argument(
+        "--profile-cpu",
+        action="store_true",
+        help="write a cProfile report of each translation to the diagnostics folder",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="write top tracemalloc allocation sites of each translation",
+    )
+    parser.add_argument(
+        "--record-imports",
+        metavar="FILE",
+        help="on quit, add the loaded modules and Qt plugins to FILE for build.py",
+    )
+    parser.add_argument("--quit-after-paint", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_known_args(argv)
+
+
+def build_message(args):
+    """Request for the app instance built from the command line"""
+    text = args.translate
+    # Only an explicit --translate or --translate - reads stdin
+    if text == "-":
+        text = sys.stdin.read()
+    if text and text.strip():
+        return {"action": "translate", "text": text.strip()}
+    if args.settings:
+        return {"action": "settings"}
+    return {"action": "show"}
 
 
 def main():
     """Main application entry function"""
-    app = QApplication(sys.argv)
+    args, qt_args = parse_args(sys.argv[1:])
+    trace.enabled = args.profile_startup or args.quit_after_paint
+    trace.mark("python start")
+
+    if args.serve is not None:
+        # Headless, the service never imports Qt
+        from app.service import serve
+
+        serve(args.serve or None)
+        return
+
+    if args.watch:
+        # Headless like the service
+        from app.watch_folder import watch
+
+        watch()
+        return
+
+    if args.import_memory or args.export_memory:
+        from app.translation_memory import main as memory_main
+
+        if args.import_memory:
+            memory_main(["import", args.import_memory])
+        if args.export_memory:
+            memory_main(["export", args.export_memory])
+        return
+
+    message = build_message(args)
+
+    from app.single_instance import InstanceServer, send_to_running_instance
+
+    # Profiling runs always measure a full cold start
+    single_instance = not trace.enabled
+    if single_instance and send_to_running_instance(message):
+        return
+
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    trace.mark("import PyQt6")
+
+    from app.main_window import GPTTranslator
+    from app.utils import get_dark_palette, watch_first_paint
+
+    trace.mark("import app")
+
+    app = QApplication(sys.argv[:1] + qt_args)
     app.setStyle("Fusion")
 
     # Set dark palette
     app.setPalette(get_dark_palette())
+    trace.mark("QApplication")
+
+    if args.record_imports:
+        from app import import_trace
+
+        app.aboutToQuit.connect(lambda: import_trace.record(args.record_imports))
+
+    instance_server = None
+    if single_instance:
+        instance_server = InstanceServer(app)
+        # Lost a start-up race against another launch
+        if not instance_server.listen() and send_to_running_instance(message):
+            return
+
+    watchdog = None
+    if (
+        args.watchdog
+        or args.profile_cpu
+        or args.profile_memory
+        or os.environ.get("LINGUAGPT_WATCHDOG_MS")
+        or os.environ.get("LINGUAGPT_PROFILE")
+    ):
+        from app.diagnostics import configure
+
+        watchdog = configure(args.watchdog, args.profile_cpu, args.profile_memory, app)
+        if watchdog is not None:
+            app.aboutToQuit.connect(lambda: print(watchdog.report(), file=sys.stderr))
+            from app.scheduler import get_scheduler
+
+            app.aboutToQuit.connect(
+                lambda: print(get_scheduler().report(), file=sys.stderr)
+            )
 
     translator = GPTTranslator()
+    trace.mark("main window")
+
+    if instance_server is not None:
+        instance_server.message_received.connect(translator.handle_instance_message)
+
+    if trace.enabled:
+
+        def on_first_paint():
+            trace.mark("first paint")
+            if args.quit_after_paint:
+                # benchmarks/bench_launch.py stops its clock here
+                print("window painted", file=sys.stderr, flush=True)
+            # Report after the window's deferred setup has run too
+            QTimer.singleShot(0, on_startup_done)
+
+        def on_startup_done():
+            if args.profile_startup:
+                trace.report()
+            if args.quit_after_paint:
+                app.quit()
+
+        watch_first_paint(translator, on_first_paint)
+
     translator.show()
+    if message["action"] != "show":
+        QTimer.singleShot(0, lambda: translator.handle_instance_message(message))
     sys.exit(app.exec())
 
 
 if __name__ == "__main__":
+    # Needed by the document processing pool in frozen builds
+    multiprocessing.freeze_support()
     main()